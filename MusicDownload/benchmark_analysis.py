@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# benchmark_analysis.py
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import soundfile as sf
+import librosa
+
+from music_download.analysis_engine import AnalysisPlan, Resampler, SpectralAnalysisEngine
+from music_download.decoders import decode_audio
+
+KEYS = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+def generate_synthetic_file(output_dir: Path, duration: float, sr: int, bpm: float) -> Path:
+    """Write a click track over an A major chord, so tempo and key are known"""
+    t = np.arange(int(duration * sr)) / sr
+    rng = np.random.default_rng(0)
+    y = sum(0.15 * np.sin(2 * np.pi * freq * t) for freq in (220.0, 277.18, 329.63))
+    clicks = librosa.clicks(times=np.arange(0, duration, 60.0 / bpm), sr=sr, length=len(t))
+    y = y + 0.6 * clicks + 0.01 * rng.standard_normal(len(t))
+    path = output_dir / f"synthetic_{bpm:.0f}bpm_A.wav"
+    sf.write(path, y.astype(np.float32), sr)
+    return path
+
+def analyze(y: np.ndarray, sr: int, plan: AnalysisPlan,
+            engine: SpectralAnalysisEngine) -> Dict[str, object]:
+    """Tempo, beats and chroma as FeatureExtractor computes them under a plan"""
+    resampler = Resampler(y, sr)
+    rhythm_sr = plan.rate("rhythm", sr)
+    harmonic_sr = plan.rate("harmonic", sr)
+
+    start = time.process_time()
+    rhythm = engine.rhythm(engine.magnitude_spectrogram(resampler.at(rhythm_sr)), rhythm_sr)
+    rhythm_cpu = time.process_time() - start
+
+    start = time.process_time()
+    chroma = np.mean(librosa.feature.chroma_cqt(y=resampler.at(harmonic_sr), sr=harmonic_sr), axis=1)
+    harmonic_cpu = time.process_time() - start
+
+    return {
+        "tempo": rhythm["tempo"],
+        "beats": np.asarray(rhythm["beats"]),
+        "chroma": chroma,
+        "rhythm_cpu": rhythm_cpu,
+        "harmonic_cpu": harmonic_cpu
+    }
+
+def beat_f_measure(reference: np.ndarray, estimated: np.ndarray, window: float = 0.07) -> float:
+    """F-measure of estimated beats within +-window seconds of reference beats"""
+    if len(reference) == 0 or len(estimated) == 0:
+        return float(len(reference) == len(estimated))
+    distances = np.abs(reference[:, np.newaxis] - estimated[np.newaxis, :])
+    hits, used = 0, set()
+    for i in range(len(reference)):
+        for j in np.argsort(distances[i]):
+            if distances[i, j] > window:
+                break
+            if j not in used:
+                used.add(j)
+                hits += 1
+                break
+    precision, recall = hits / len(estimated), hits / len(reference)
+    return 0.0 if hits == 0 else 2 * precision * recall / (precision + recall)
+
+def compare(audio_path: Path, plans: List[AnalysisPlan], repeats: int) -> List[Dict[str, float]]:
+    """Accuracy and CPU time of each plan against full-rate analysis of one file"""
+    y, sr = decode_audio(audio_path, sr=None)
+    engine = SpectralAnalysisEngine()
+
+    def best_of(plan: AnalysisPlan) -> Dict[str, object]:
+        runs = [analyze(y, sr, plan, engine) for _ in range(repeats)]
+        result = runs[0]
+        result["rhythm_cpu"] = min(run["rhythm_cpu"] for run in runs)
+        result["harmonic_cpu"] = min(run["harmonic_cpu"] for run in runs)
+        return result
+
+    reference = best_of(AnalysisPlan())
+    print(f"  {'plan':<24} {'beat cpu':>9} {'key cpu':>9} {'tempo':>7} {'beat F':>7} "
+          f"{'key':>4} {'chroma cos':>10}")
+    print(f"  {'full rate (' + str(sr) + ')':<24} {reference['rhythm_cpu'] * 1000:7.0f}ms "
+          f"{reference['harmonic_cpu'] * 1000:7.0f}ms {reference['tempo']:7.1f} {1.0:7.3f} "
+          f"{KEYS[int(np.argmax(reference['chroma']))]:>4} {1.0:10.4f}")
+
+    rows = []
+    for plan in plans:
+        result = best_of(plan)
+        cosine = float(
+            np.dot(result["chroma"], reference["chroma"])
+            / (np.linalg.norm(result["chroma"]) * np.linalg.norm(reference["chroma"]) + 1e-12)
+        )
+        row = {
+            "rhythm_sr": plan.rate("rhythm", sr),
+            "harmonic_sr": plan.rate("harmonic", sr),
+            "rhythm_speedup": reference["rhythm_cpu"] / max(result["rhythm_cpu"], 1e-9),
+            "harmonic_speedup": reference["harmonic_cpu"] / max(result["harmonic_cpu"], 1e-9),
+            "tempo_error": abs(result["tempo"] - reference["tempo"]),
+            "beat_f_measure": beat_f_measure(reference["beats"], result["beats"]),
+            "key_match": float(np.argmax(result["chroma"]) == np.argmax(reference["chroma"])),
+            "chroma_cosine": cosine
+        }
+        rows.append(row)
+        label = f"rhythm {row['rhythm_sr']} / key {row['harmonic_sr']}"
+        print(f"  {label:<24} {result['rhythm_cpu'] * 1000:7.0f}ms {result['harmonic_cpu'] * 1000:7.0f}ms "
+              f"{result['tempo']:7.1f} {row['beat_f_measure']:7.3f} "
+              f"{KEYS[int(np.argmax(result['chroma']))]:>4} {cosine:10.4f}   "
+              f"({row['rhythm_speedup']:.1f}x / {row['harmonic_speedup']:.1f}x faster)")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy and CPU cost of low-rate analysis plans against full-rate analysis"
+    )
+    parser.add_argument("files", nargs="*", type=Path,
+                        help="Audio files to compare on (default: synthetic click tracks)")
+    parser.add_argument("--rates", nargs="+", type=int, default=[22050, 11025],
+                        help="Analysis rates to try for rhythm and key")
+    parser.add_argument("--bpm", nargs="+", type=float, default=[90.0, 120.0, 140.0],
+                        help="Tempos of the synthetic tracks")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic track duration in seconds")
+    parser.add_argument("--sr", type=int, default=44100, help="Synthetic track sample rate")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per plan")
+
+    args = parser.parse_args()
+    plans = [AnalysisPlan(rhythm_sr=rate, harmonic_sr=rate) for rate in args.rates]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = args.files or [
+            generate_synthetic_file(Path(tmp_dir), args.duration, args.sr, bpm) for bpm in args.bpm
+        ]
+        summary: Dict[int, List[Dict[str, float]]] = {}
+        for audio_path in files:
+            print(f"\n{audio_path.name}")
+            for row in compare(audio_path, plans, args.repeats):
+                summary.setdefault(row["rhythm_sr"], []).append(row)
+
+    if len(files) > 1:
+        print(f"\nMean over {len(files)} files")
+        for rate, rows in sorted(summary.items(), reverse=True):
+            mean = {name: float(np.mean([row[name] for row in rows])) for name in rows[0]}
+            print(f"  {rate} Hz: beat {mean['rhythm_speedup']:.1f}x, key {mean['harmonic_speedup']:.1f}x faster, "
+                  f"tempo error {mean['tempo_error']:.2f} BPM, beat F {mean['beat_f_measure']:.3f}, "
+                  f"key agreement {mean['key_match']:.0%}, chroma cosine {mean['chroma_cosine']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# benchmark_decoders.py
+
+import argparse
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import soundfile as sf
+import librosa
+
+from music_download.decoders import DEFAULT_BACKENDS, decode_audio, get_decoders
+
+def generate_synthetic_files(output_dir: Path, duration: float, sr: int) -> List[Path]:
+    """Write a synthetic stereo track in every format this machine can encode"""
+    t = np.arange(int(duration * sr)) / sr
+    rng = np.random.default_rng(0)
+    left = 0.4 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    right = 0.4 * np.sin(2 * np.pi * 330 * t) + 0.05 * rng.standard_normal(len(t))
+    y = np.stack([left, right], axis=1).astype(np.float32)
+
+    files = []
+    wav_path = output_dir / "synthetic.wav"
+    sf.write(wav_path, y, sr)
+    files.append(wav_path)
+
+    flac_path = output_dir / "synthetic.flac"
+    sf.write(flac_path, y, sr)
+    files.append(flac_path)
+
+    mp3_path = output_dir / "synthetic.mp3"
+    if "MP3" in sf.available_formats():
+        sf.write(mp3_path, y, sr)
+        files.append(mp3_path)
+    elif shutil.which("ffmpeg"):
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", str(wav_path), str(mp3_path)],
+            check=True
+        )
+        files.append(mp3_path)
+
+    return files
+
+def benchmark_file(audio_path: Path, repeats: int, target_sr: int) -> Dict[str, float]:
+    """Decode throughput (audio seconds per wall second) for each backend"""
+    results = {}
+
+    candidates = [(decoder.name, [decoder.name]) for decoder in get_decoders(audio_path, DEFAULT_BACKENDS)]
+    candidates.append(("librosa.load", None))
+
+    for name, backends in candidates:
+        timings = []
+        try:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                if backends is None:
+                    y, sr = librosa.load(audio_path, sr=target_sr)
+                else:
+                    y, sr = decode_audio(audio_path, sr=target_sr, backends=backends)
+                timings.append(time.perf_counter() - start)
+        except Exception as e:
+            print(f"  {name:<14} failed: {e}")
+            continue
+
+        results[name] = (y.shape[-1] / sr) / min(timings)
+        print(f"  {name:<14} {min(timings) * 1000:8.1f} ms   {results[name]:8.1f}x realtime")
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare decode throughput across decoder backends")
+    parser.add_argument("--duration", type=float, default=60.0, help="Synthetic track duration in seconds")
+    parser.add_argument("--sr", type=int, default=44100, help="Synthetic track sample rate")
+    parser.add_argument("--target-sr", type=int, default=22050, help="Decode target sample rate")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed decodes per backend")
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = generate_synthetic_files(Path(tmp_dir), args.duration, args.sr)
+        for audio_path in files:
+            print(f"\n{audio_path.name} ({args.duration:.0f}s, {args.sr} Hz -> {args.target_sr} Hz)")
+            benchmark_file(audio_path, args.repeats, args.target_sr)
+
+if __name__ == "__main__":
+    main()
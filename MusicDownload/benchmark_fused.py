@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# benchmark_fused.py
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import librosa
+
+from music_download.decoders import decode_audio
+from music_download.feature_extractor import FeatureExtractor
+
+# Relative tolerance of the spectral and energy means, absolute tolerance of tempo and beat times
+MEAN_RTOL = 1e-5
+TEMPO_ATOL = 1e-6
+BEAT_ATOL = 1e-6
+
+def synthetic_signal(duration: float, sr: int, bpm: float) -> np.ndarray:
+    """Click track over a two-tone chord with a little noise"""
+    t = np.arange(int(duration * sr)) / sr
+    rng = np.random.default_rng(int(bpm))
+    y = 0.2 * np.sin(2 * np.pi * 220.0 * t) + 0.15 * np.sin(2 * np.pi * 329.63 * t)
+    clicks = librosa.clicks(times=np.arange(0, duration, 60.0 / bpm), sr=sr, length=len(t))
+    return (y + 0.6 * clicks + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+def compare(y: np.ndarray, sr: int, extractor: FeatureExtractor) -> Tuple[List[str], Dict[str, float]]:
+    """Mismatches between the fused engine and the per-feature reference, and CPU times"""
+    # Timed with chroma, as extract_features computes it next to the engine
+    start = time.process_time()
+    fused = extractor.engine.analyze(y, sr)
+    librosa.feature.chroma_cqt(y=y, sr=sr)
+    fused_cpu = time.process_time() - start
+
+    start = time.process_time()
+    reference = extractor.extract_features_per_feature(y, sr)
+    reference_cpu = time.process_time() - start
+
+    mismatches = []
+    for group in ("spectral_features", "energy_features"):
+        for name, expected in reference[group].items():
+            actual = fused[group][name]
+            if not np.isclose(actual, expected, rtol=MEAN_RTOL, atol=0.0):
+                mismatches.append(f"{name}: fused {actual!r} != per-feature {expected!r}")
+
+    actual, expected = fused["temporal_features"]["tempo"], reference["temporal_features"]["tempo"]
+    if abs(actual - expected) > TEMPO_ATOL:
+        mismatches.append(f"tempo: fused {actual!r} != per-feature {expected!r}")
+
+    actual, expected = fused["temporal_features"]["beats"], reference["temporal_features"]["beats"]
+    if len(actual) != len(expected) or not np.allclose(actual, expected, rtol=0.0, atol=BEAT_ATOL):
+        mismatches.append(f"beats: fused {len(actual)} beats != per-feature {len(expected)} beats")
+
+    return mismatches, {"fused_cpu": fused_cpu, "reference_cpu": reference_cpu}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parity and speed of the fused analysis engine against per-feature extraction"
+    )
+    parser.add_argument("files", nargs="*", type=Path,
+                        help="Audio files to compare on (default: synthetic click tracks)")
+    parser.add_argument("--bpm", nargs="+", type=float, default=[90.0, 128.0],
+                        help="Tempos of the synthetic tracks")
+    parser.add_argument("--rates", nargs="+", type=int, default=[22050, 44100],
+                        help="Sample rates of the synthetic tracks")
+    parser.add_argument("--duration", type=float, default=30.0, help="Synthetic track duration in seconds")
+
+    args = parser.parse_args()
+    extractor = FeatureExtractor()
+
+    cases = []
+    for audio_path in args.files:
+        y, sr = decode_audio(audio_path, sr=None)
+        cases.append((audio_path.name, y, sr))
+    if not args.files:
+        for sr in args.rates:
+            for bpm in args.bpm:
+                cases.append((f"synthetic {bpm:.0f} BPM @ {sr} Hz", synthetic_signal(args.duration, sr, bpm), sr))
+
+    # Leave librosa's JIT compilation out of the first timing
+    compare(synthetic_signal(10.0, 22050, 120.0), 22050, extractor)
+
+    failed = 0
+    for label, y, sr in cases:
+        mismatches, times = compare(y, sr, extractor)
+        status = "ok" if not mismatches else "MISMATCH"
+        print(f"{label:<32} fused {times['fused_cpu'] * 1000:7.0f} ms   "
+              f"per-feature {times['reference_cpu'] * 1000:7.0f} ms   {status}")
+        for mismatch in mismatches:
+            print(f"  - {mismatch}")
+        failed += bool(mismatches)
+
+    print(f"\n{len(cases) - failed}/{len(cases)} tracks match the per-feature results")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# benchmark_key.py
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import soundfile as sf
+import librosa
+
+from music_download.decoders import decode_audio
+from music_download.key_estimator import PITCH_CLASSES, KeyEstimator
+
+# Scale degrees (semitones above the tonic) of I-IV-V-I chord roots and chord qualities
+PROGRESSIONS = {
+    "major": [(0, (0, 4, 7)), (5, (0, 4, 7)), (7, (0, 4, 7)), (0, (0, 4, 7))],
+    "minor": [(0, (0, 3, 7)), (5, (0, 3, 7)), (7, (0, 4, 7)), (0, (0, 3, 7))]
+}
+
+def generate_synthetic_file(output_dir: Path, tonic: int, mode: str,
+                            duration: float, sr: int) -> Path:
+    """Write a repeated I-IV-V-I progression with a bass line in a known key"""
+    rng = np.random.default_rng(tonic)
+    chord_seconds = 2.0
+    t = np.arange(int(chord_seconds * sr)) / sr
+    envelope = np.exp(-t / chord_seconds)
+    chords = []
+    for root, quality in PROGRESSIONS[mode]:
+        base = 48 + tonic + root
+        notes = [base - 12] + [base + 12 + interval for interval in quality]
+        chord = sum(
+            0.2 * np.sin(2 * np.pi * harmonic * librosa.midi_to_hz(note) * t) / harmonic
+            for note in notes for harmonic in (1, 2, 3)
+        )
+        chords.append(chord * envelope)
+    y = np.tile(np.concatenate(chords), int(np.ceil(duration / (chord_seconds * 4))))[:int(duration * sr)]
+    y = y + 0.005 * rng.standard_normal(len(y))
+    path = output_dir / f"synthetic_{PITCH_CLASSES[tonic].replace('#', 's')}_{mode}.wav"
+    sf.write(path, (0.5 * y / np.max(np.abs(y))).astype(np.float32), sr)
+    return path
+
+def legacy_key(y: np.ndarray, sr: int) -> str:
+    """The former estimate: argmax of the mean full-rate CQT chroma, tonic only"""
+    return PITCH_CLASSES[int(np.argmax(np.mean(librosa.feature.chroma_cqt(y=y, sr=sr), axis=1)))]
+
+def timed(func, repeats: int) -> Tuple[object, float]:
+    """Result and best CPU time of a call"""
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.process_time()
+        result = func()
+        best = min(best, time.process_time() - start)
+    return result, best
+
+def benchmark_file(audio_path: Path, estimators: Dict[str, KeyEstimator], repeats: int,
+                   truth: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+    """Key, confidence and CPU time of every estimator, and of the former CQT argmax"""
+    y, sr = decode_audio(audio_path, sr=None)
+    results = {}
+
+    tonic, seconds = timed(lambda: legacy_key(y, sr), repeats)
+    results["legacy cqt argmax"] = {"label": tonic, "tonic": tonic, "confidence": None, "seconds": seconds}
+    for name, estimator in estimators.items():
+        estimate, seconds = timed(lambda: estimator.estimate(y, sr), repeats)
+        results[name] = {
+            "label": estimate.label, "tonic": estimate.tonic,
+            "confidence": estimate.confidence, "seconds": seconds
+        }
+
+    reference = results["cqt full track"]["label"]
+    for name, result in results.items():
+        agrees = result["label"] == reference or (result["confidence"] is None and result["tonic"] == reference.split()[0])
+        result["agrees"] = agrees
+        result["correct"] = None if truth is None else result["label"] == truth or (
+            result["confidence"] is None and result["tonic"] == truth.split()[0]
+        )
+        confidence = "" if result["confidence"] is None else f"{result['confidence']:.3f}"
+        correct = "" if result["correct"] is None else ("correct" if result["correct"] else "WRONG")
+        print(f"  {name:<20} {result['seconds'] * 1000:8.0f} ms   {result['label']:<9} "
+              f"conf {confidence:<6} {'agrees' if agrees else 'differs':<8} {correct}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Speed and agreement of STFT-chroma key estimation against the CQT path"
+    )
+    parser.add_argument("files", nargs="*", type=Path,
+                        help="Audio files to compare on (default: synthetic tracks in known keys)")
+    parser.add_argument("--duration", type=float, default=120.0, help="Synthetic track duration in seconds")
+    parser.add_argument("--sr", type=int, default=44100, help="Synthetic track sample rate")
+    parser.add_argument("--repeats", type=int, default=2, help="Timed runs per estimator")
+
+    args = parser.parse_args()
+    estimators = {
+        "cqt full track": KeyEstimator(mode="cqt", sr=22050, excerpt_seconds=None),
+        "stft full track": KeyEstimator(mode="stft", excerpt_seconds=None),
+        "stft excerpts": KeyEstimator(mode="stft")
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases: List[Tuple[Path, Optional[str]]] = [(path, None) for path in args.files]
+        if not cases:
+            for tonic, mode in ((0, "major"), (9, "minor"), (7, "major"), (4, "minor"), (2, "major"), (5, "minor")):
+                path = generate_synthetic_file(Path(tmp_dir), tonic, mode, args.duration, args.sr)
+                cases.append((path, f"{PITCH_CLASSES[tonic]} {mode}"))
+
+        totals: Dict[str, List[Dict[str, object]]] = {}
+        for audio_path, truth in cases:
+            print(f"\n{audio_path.name}" + (f" (truth: {truth})" if truth else ""))
+            for name, result in benchmark_file(audio_path, estimators, args.repeats, truth).items():
+                totals.setdefault(name, []).append(result)
+
+    reference_seconds = np.mean([result["seconds"] for result in totals["legacy cqt argmax"]])
+    print(f"\nSummary over {len(cases)} files")
+    for name, results in totals.items():
+        seconds = np.mean([result["seconds"] for result in results])
+        line = (f"  {name:<20} {seconds * 1000:8.0f} ms ({reference_seconds / seconds:5.1f}x vs legacy)   "
+                f"agreement with cqt {np.mean([result['agrees'] for result in results]):4.0%}")
+        if all(result["correct"] is not None for result in results):
+            line += f"   accuracy {np.mean([result['correct'] for result in results]):4.0%}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# check_ytdl_pool.py
+
+import sys
+import threading
+from typing import List
+
+import yt_dlp
+
+from music_download.downloader import YoutubeDLPool
+
+class SilentLogger:
+    """Keeps the expected download error off the output"""
+    def debug(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        pass
+
+def check(pool: YoutubeDLPool) -> List[str]:
+    """
+    Failures of the YoutubeDL internals the pool relies on: the output
+    template in params["outtmpl"]["default"], the sticky _download_retcode
+    and post-processors staying registered on a reused instance
+    """
+    opts = {"quiet": True, "ignoreerrors": True, "logger": SilentLogger()}
+    info = {"id": "abc", "title": "Song", "ext": "mp3"}
+    failures = []
+
+    ytdl = pool.get(opts, "first/%(title)s.%(ext)s")
+    if ytdl.prepare_filename(info) != "first/Song.mp3":
+        failures.append(f"outtmpl not applied: {ytdl.prepare_filename(info)!r}")
+    if pool.get(opts, "second/%(title)s.%(ext)s") is not ytdl:
+        failures.append("same options did not reuse the instance")
+    if ytdl.prepare_filename(info) != "second/Song.mp3":
+        failures.append(f"outtmpl not updated on reuse: {ytdl.prepare_filename(info)!r}")
+
+    # An unresolvable host fails the download, online or offline
+    retcode = ytdl.download(["https://invalid.invalid/song"])
+    if retcode == 0:
+        failures.append("failed download returned 0")
+    elif pool.get(opts)._download_retcode != 0:
+        failures.append("return code of a failed download not reset on reuse")
+
+    collector = pool.collector(ytdl)
+    collector.file_paths.append("stale")
+    if pool.collector(ytdl) is not collector or collector.file_paths:
+        failures.append("collector not reused and emptied")
+    if ytdl._pps["post_process"].count(collector) != 1:
+        failures.append("collector not registered exactly once")
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.get(opts)))
+    thread.start()
+    thread.join()
+    if other[0] is ytdl:
+        failures.append("instance shared between threads")
+
+    return failures
+
+def main():
+    pool = YoutubeDLPool()
+    try:
+        failures = check(pool)
+    finally:
+        pool.close()
+
+    for failure in failures:
+        print(f"  - {failure}")
+    print(f"yt-dlp {yt_dlp.version.__version__}: "
+          f"{'ok' if not failures else f'{len(failures)} checks failed'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# analysis_engine.py
+
+import librosa
+import numpy as np
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+from .audio_store import AudioStore
+from .decoders import resample
+
+@dataclass
+class AnalysisPlan:
+    """
+    Sample rates each group of descriptors is analyzed at.
+
+    Rhythm (onsets, tempo, beats) and harmonic (chroma, key) descriptors
+    only need content up to a few kHz, so they can run on a low-rate
+    resample at a fraction of the cost. Bandwidth-sensitive spectral
+    descriptors (centroid, bandwidth, rolloff) and energy always use the
+    native rate. None analyzes a group at the native rate too; a rate
+    above the native rate is capped at the native rate.
+    """
+    rhythm_sr: Optional[int] = None
+    harmonic_sr: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "AnalysisPlan":
+        """Plan from a config mapping such as {"rhythm_sr": 11025, "harmonic_sr": 22050}"""
+        config = config or {}
+        return cls(rhythm_sr=config.get('rhythm_sr'), harmonic_sr=config.get('harmonic_sr'))
+
+    def rate(self, group: str, native_sr: int) -> int:
+        """Analysis rate of "rhythm" or "harmonic" descriptors for a track"""
+        target = getattr(self, f"{group}_sr")
+        return native_sr if target is None else min(int(target), native_sr)
+
+    def as_dict(self) -> Dict[str, Optional[int]]:
+        return asdict(self)
+
+class Resampler:
+    """
+    Versions of one track at the rates an analysis plan asks for.
+
+    Each rate is produced once and shared by every descriptor that uses
+    it; with an audio store the resamples are also shared with other
+    processors working on the same track.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, audio_path: Optional[Path] = None,
+                 audio_store: Optional[AudioStore] = None):
+        """
+        Initialize resampler
+
+        Args:
+            y: Mono signal at its native rate
+            sr: Native sample rate
+            audio_path: Track the signal was loaded from, for the audio store
+            audio_store: Shared decoded-audio store
+        """
+        self.sr = sr
+        self.audio_path = audio_path
+        self.audio_store = audio_store
+        self._signals: Dict[int, np.ndarray] = {sr: y}
+
+    def at(self, sr: int) -> np.ndarray:
+        """The signal at the given rate"""
+        if sr not in self._signals:
+            if self.audio_store is not None and self.audio_path is not None:
+                self._signals[sr], _ = self.audio_store.load(self.audio_path, sr=sr)
+            else:
+                self._signals[sr] = resample(np.asarray(self._signals[self.sr]), self.sr, sr)
+        return self._signals[sr]
+
+class SpectralAnalysisEngine:
+    """
+    Fused spectral analysis for FeatureExtractor.
+
+    The magnitude spectrogram is computed once per track and the spectral
+    descriptors and the onset envelope used for beat tracking are all
+    derived from it, instead of every librosa feature running its own STFT.
+    Parameters match librosa's defaults so results equal the per-feature
+    calls.
+    """
+
+    def __init__(self, n_fft: int = 2048, hop_length: int = 512):
+        """
+        Initialize analysis engine
+
+        Args:
+            n_fft: FFT window size shared by all spectral descriptors
+            hop_length: Hop length shared by all frame-based descriptors
+        """
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+    def magnitude_spectrogram(self, y: np.ndarray) -> np.ndarray:
+        """Compute the shared magnitude spectrogram"""
+        return np.abs(librosa.stft(y=y, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    def onset_envelope(self, S: np.ndarray, sr: int) -> np.ndarray:
+        """Onset strength envelope from a magnitude spectrogram"""
+        mel = librosa.feature.melspectrogram(S=S ** 2, sr=sr)
+        return librosa.onset.onset_strength(
+            S=librosa.power_to_db(mel),
+            sr=sr,
+            hop_length=self.hop_length,
+            aggregate=np.median
+        )
+
+    def rhythm(self, S: np.ndarray, sr: int) -> Dict[str, Any]:
+        """Tempo and beat times from a magnitude spectrogram"""
+        onset_env = self.onset_envelope(S, sr)
+        tempo, beat_frames = librosa.beat.beat_track(
+            onset_envelope=onset_env,
+            sr=sr,
+            hop_length=self.hop_length
+        )
+        beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=self.hop_length)
+        return {
+            "tempo": float(np.atleast_1d(tempo)[0]),
+            "beats": beat_times.tolist()
+        }
+
+    def analyze(self, y: np.ndarray, sr: int, y_rhythm: Optional[np.ndarray] = None,
+                rhythm_sr: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Compute spectral, energy and rhythm descriptors from shared intermediates
+
+        Rhythm is derived from the shared spectrogram unless a separate
+        (usually lower-rate) rhythm signal is given.
+        """
+        S = self.magnitude_spectrogram(y)
+        freq = librosa.fft_frequencies(sr=sr, n_fft=self.n_fft)
+
+        # Rhythm from the shared onset envelope, or from the rhythm signal
+        if y_rhythm is None or rhythm_sr == sr:
+            temporal_features = self.rhythm(S, sr)
+        else:
+            temporal_features = self.rhythm(self.magnitude_spectrogram(y_rhythm), rhythm_sr)
+
+        # Spectral descriptors from the shared magnitude spectrogram
+        spectral_centroids = librosa.feature.spectral_centroid(S=S, sr=sr, freq=freq)[0]
+        spectral_bandwidths = librosa.feature.spectral_bandwidth(
+            S=S, sr=sr, freq=freq, centroid=spectral_centroids[np.newaxis, :]
+        )[0]
+        spectral_rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr, freq=freq)[0]
+
+        # Energy descriptors are time-domain and framed directly
+        frame_length = self.n_fft
+        rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=self.hop_length)[0]
+        zcr = librosa.feature.zero_crossing_rate(
+            y, frame_length=frame_length, hop_length=self.hop_length
+        )[0]
+
+        return {
+            "temporal_features": temporal_features,
+            "spectral_features": {
+                "spectral_centroid_mean": float(np.mean(spectral_centroids)),
+                "spectral_bandwidth_mean": float(np.mean(spectral_bandwidths)),
+                "spectral_rolloff_mean": float(np.mean(spectral_rolloff))
+            },
+            "energy_features": {
+                "rms_energy_mean": float(np.mean(rms)),
+                "zero_crossing_rate_mean": float(np.mean(zcr))
+            }
+        }
@@ -5,16 +5,18 @@ import librosa
 import numpy as np
 import soundfile as sf
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from scipy import signal
 from pydub import AudioSegment
+from .audio_store import AudioStore, load_audio
 
 class AudioPreprocessor:
     def __init__(self, 
                 target_sr: int = 44100,
                 target_db: float = -14.0,
                 min_duration: int = 60,
-                max_duration: int = 300):
+                max_duration: int = 300,
+                audio_store: Optional[AudioStore] = None):
         """
         Initialize audio preprocessor with target parameters
         
@@ -23,11 +25,13 @@ class AudioPreprocessor:
             target_db: Target loudness in dB LUFS
             min_duration: Minimum duration in seconds
             max_duration: Maximum duration in seconds
+            audio_store: Shared decoded-audio store (decodes directly if None)
         """
         self.target_sr = target_sr
         self.target_db = target_db
         self.min_duration = min_duration
         self.max_duration = max_duration
+        self.audio_store = audio_store
         
     def normalize_audio(self, y: np.ndarray) -> np.ndarray:
         """Normalize audio to target loudness"""
@@ -73,7 +77,7 @@ class AudioPreprocessor:
     def process_file(self, input_path: Path, output_path: Path) -> Dict[str, Any]:
         """Process a single audio file"""
         # Load audio
-        y, sr = librosa.load(input_path, sr=self.target_sr)
+        y, sr = load_audio(input_path, sr=self.target_sr, store=self.audio_store)
         
         # Store original properties
         original_duration = len(y) / sr
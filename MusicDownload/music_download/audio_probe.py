@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# audio_probe.py
+
+import mutagen
+import soundfile as sf
+from pathlib import Path
+from typing import Optional
+from dataclasses import dataclass
+
+@dataclass
+class AudioInfo:
+    duration: float
+    sample_rate: int
+    channels: int
+    bitrate: Optional[int]
+
+def probe_audio(audio_path: Path) -> AudioInfo:
+    """
+    Read duration, sample rate, channels and bitrate from file headers
+
+    Uses mutagen's container/frame header parsing and falls back to
+    libsndfile's info; neither decodes any audio.
+    """
+    audio_path = Path(audio_path)
+
+    try:
+        audio = mutagen.File(audio_path)
+    except Exception:
+        audio = None
+
+    if audio is not None and getattr(audio.info, "sample_rate", 0):
+        info = audio.info
+        return AudioInfo(
+            duration=float(info.length),
+            sample_rate=int(info.sample_rate),
+            channels=int(getattr(info, "channels", 0) or 0),
+            bitrate=int(info.bitrate) if getattr(info, "bitrate", 0) else None
+        )
+
+    info = sf.info(str(audio_path))
+    bitrate = None
+    if info.duration > 0:
+        bitrate = int(audio_path.stat().st_size * 8 / info.duration)
+    return AudioInfo(
+        duration=float(info.duration),
+        sample_rate=int(info.samplerate),
+        channels=int(info.channels),
+        bitrate=bitrate
+    )
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# audio_store.py
+
+import os
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from .decoders import decode_audio, resample
+from .hashing import HashService, get_hash_service
+
+class AudioStore:
+    """
+    Decoded-audio store shared by all processors.
+
+    Each track is decoded once at its native rate and layout; every
+    (sample rate, mono) variant requested afterwards is derived from that
+    decode and kept as a memory-mapped float32 .npy file keyed by content
+    hash. The store is bounded by `max_bytes` with least-recently-used
+    eviction.
+    """
+
+    def __init__(self, store_dir: Path, max_bytes: int = 4 * 1024 ** 3,
+                 backends: Optional[Sequence[str]] = None,
+                 hash_service: Optional[HashService] = None):
+        """
+        Initialize audio store
+
+        Args:
+            store_dir: Directory holding the decoded .npy files
+            max_bytes: Maximum total size of the store on disk
+            backends: Decoder backends in preference order (default order if None)
+            hash_service: Shared hash service (process-wide default if None)
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.backends = backends
+        self.hash_service = hash_service or get_hash_service()
+
+        self._setup()
+
+    def _setup(self):
+        """Create locks and indexes and load existing entries"""
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        self._native_sr: Dict[str, int] = {}
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._scan()
+
+    def __getstate__(self):
+        # Worker processes re-open the same store directory
+        return {
+            "store_dir": self.store_dir,
+            "max_bytes": self.max_bytes,
+            "backends": self.backends,
+            "hash_service": self.hash_service
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def _scan(self):
+        """Rebuild the LRU index from files already on disk"""
+        for tmp_path in self.store_dir.glob(".*.tmp"):
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+        files = sorted(self.store_dir.glob("*.npy"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            digest, sr, layout = path.stem.split("_")
+            if layout == "native":
+                self._native_sr[digest] = int(sr)
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._total_bytes += size
+
+    def _key_lock(self, key: Tuple) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _entry_name(self, digest: str, sr: int, layout: str) -> str:
+        return f"{digest}_{sr}_{layout}.npy"
+
+    def _read(self, name: str) -> Optional[np.ndarray]:
+        """Memory-map a stored entry and mark it as recently used"""
+        path = self.store_dir / name
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+            else:
+                # May have been written by another process sharing the store
+                try:
+                    size = path.stat().st_size
+                except FileNotFoundError:
+                    return None
+                self._entries[name] = size
+                self._total_bytes += size
+        try:
+            return np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+
+    def _write(self, name: str, y: np.ndarray) -> np.ndarray:
+        """Persist an entry atomically, evict old entries and memory-map it"""
+        path = self.store_dir / name
+        tmp_path = path.with_name(f".{name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(y, dtype=np.float32))
+        os.replace(tmp_path, path)
+
+        size = path.stat().st_size
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict(keep=name)
+        return np.load(path, mmap_mode='r')
+
+    def _evict(self, keep: str):
+        """Drop least-recently-used entries until the store fits (lock held)"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            if name == keep:
+                self._entries.move_to_end(name)
+                continue
+            self._total_bytes -= self._entries.pop(name)
+            digest, sr, layout = name[:-4].split("_")
+            if layout == "native":
+                self._native_sr.pop(digest, None)
+            try:
+                (self.store_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _native(self, audio_path: Path, digest: str) -> Tuple[np.ndarray, int]:
+        """Decode a file at its native rate and channel layout, once"""
+        with self._key_lock((digest, "native")):
+            sr = self._native_sr.get(digest)
+            if sr is None:
+                # Another process sharing the store may have decoded it
+                for path in self.store_dir.glob(f"{digest}_*_native.npy"):
+                    sr = int(path.stem.split("_")[1])
+            if sr is not None:
+                y = self._read(self._entry_name(digest, sr, "native"))
+                if y is not None:
+                    self._native_sr[digest] = sr
+                    return y, sr
+
+            y, sr = decode_audio(audio_path, sr=None, mono=False, backends=self.backends)
+            sr = int(sr)
+            y = self._write(self._entry_name(digest, sr, "native"), y)
+            self._native_sr[digest] = sr
+            return y, sr
+
+    def load(self, audio_path: Path, sr: Optional[int] = 22050,
+             mono: bool = True) -> Tuple[np.ndarray, int]:
+        """
+        Drop-in replacement for decode_audio backed by the store
+
+        Args:
+            audio_path: Path to the audio file
+            sr: Target sample rate, or None for the native rate
+            mono: Downmix to mono
+
+        Returns: (read-only float32 audio array, sample rate)
+        """
+        audio_path = Path(audio_path)
+        digest = self.hash_service.hash_file(audio_path)
+        native_sr = self._native_sr.get(digest)
+
+        if sr is None and not mono:
+            return self._native(audio_path, digest)
+
+        target_sr = int(sr) if sr is not None else native_sr
+        layout = "mono" if mono else "multi"
+        if target_sr is not None:
+            y = self._read(self._entry_name(digest, target_sr, layout))
+            if y is not None:
+                return y, target_sr
+
+        with self._key_lock((digest, sr, layout)):
+            y_native, native_sr = self._native(audio_path, digest)
+            target_sr = int(sr) if sr is not None else native_sr
+            name = self._entry_name(digest, target_sr, layout)
+            y = self._read(name)
+            if y is not None:
+                return y, target_sr
+
+            y = y_native
+            if mono and y.ndim > 1:
+                y = np.mean(y, axis=0)
+            if target_sr != native_sr:
+                y = resample(np.asarray(y), native_sr, target_sr)
+            if y is y_native:
+                return y_native, target_sr
+            return self._write(name, y), target_sr
+
+    def clear(self):
+        """Remove every entry from the store"""
+        with self._lock:
+            for name in list(self._entries):
+                try:
+                    (self.store_dir / name).unlink()
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._native_sr.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get store size statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+def load_audio(audio_path: Path, sr: Optional[int] = 22050, mono: bool = True,
+               store: Optional[AudioStore] = None) -> Tuple[np.ndarray, int]:
+    """Load audio through the shared store when one is configured"""
+    if store is not None:
+        return store.load(audio_path, sr=sr, mono=mono)
+    return decode_audio(audio_path, sr=sr, mono=mono)
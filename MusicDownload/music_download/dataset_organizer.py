@@ -1,89 +1,226 @@
 #!/usr/bin/env python3
 # dataset_organizer.py
 
+import os
 import h5py
 import json
 import shutil
 from pathlib import Path
-from typing import Dict, Any
-import numpy as np
+from typing import Dict, Any, Optional
+from .feature_store import FeatureStore
+from .hashing import HashService, get_hash_service
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# ioctl cloning a file's extents on copy-on-write filesystems (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Ways of storing an object. Both give the object its own inode, so rewriting
+# the source in place can never change content stored under its hash.
+LINK_MODES = ("reflink", "copy")
+
+def _reflink(src: Path, dst: Path):
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+    shutil.copystat(src, dst)
+
+_LINKERS = {
+    "reflink": _reflink,
+    "copy": shutil.copy2
+}
 
 class DatasetOrganizer:
-    def __init__(self, root_dir: Path):
+    def __init__(self, root_dir: Path, link_mode: str = "auto",
+                 hash_service: Optional[HashService] = None):
         """
         Initialize dataset organizer
         
         Args:
             root_dir: Root directory for organized dataset
+            link_mode: "reflink" or "copy" for storing audio objects; "auto"
+                reflinks where the filesystem supports it and copies otherwise
+            hash_service: Content hashing service (the shared one if None)
         """
+        if link_mode != "auto" and link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode}")
         self.root_dir = root_dir
         self.audio_dir = root_dir / "audio"
         self.features_dir = root_dir / "features"
         self.metadata_dir = root_dir / "metadata"
+        self.objects_dir = root_dir / "objects"
+        self.link_modes = LINK_MODES[LINK_MODES.index(link_mode) if link_mode != "auto" else 0:]
+        self.hash_service = hash_service or get_hash_service()
+        self.manifest_file = self.objects_dir / "manifest.json"
+        self._manifest: Dict[str, list] = {}
         
         # Create directory structure
         self.audio_dir.mkdir(parents=True, exist_ok=True)
         self.features_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_dir.mkdir(parents=True, exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _link(self, src: Path, dst: Path) -> str:
+        """Place src at dst with the first link mode that works; returns the mode used"""
+        tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+        for mode in self.link_modes:
+            try:
+                _LINKERS[mode](src, tmp_path)
+            except OSError:
+                tmp_path.unlink(missing_ok=True)
+                continue
+            os.replace(tmp_path, dst)
+            return mode
+        raise OSError(f"Could not place {src} at {dst}")
+    
+    def _object_path(self, digest: str, suffix: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}{suffix}"
+    
+    def _object_current(self, object_path: Path, digest: str, src: Path) -> bool:
+        """
+        Whether an object exists, holds the content its hash names and does
+        not share its inode with the source (as objects hard-linked by
+        earlier versions do). Objects whose stat signature changed since
+        they were recorded are hashed again.
+        """
+        try:
+            stat = object_path.stat()
+        except FileNotFoundError:
+            return False
+        if os.path.samefile(object_path, src):
+            return False
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        key = str(object_path.relative_to(self.root_dir))
+        if self._manifest.get(key) == signature + [digest]:
+            return True
+        if self.hash_service.hash_file(object_path) != digest:
+            return False
+        self._manifest[key] = signature + [digest]
+        return True
+    
+    def place_audio(self, src: Path, dst: Path) -> str:
+        """
+        Place an audio file in the dataset, storing each distinct content once
+        
+        The content goes to objects/<hash>, reflinked or copied from src so
+        the object never changes with it, and dst becomes a hard link to
+        that object, or a symlink if hard links are not possible. The
+        manifest records each entry's source size, mtime and inode and each
+        object's own signature, so entries whose source did not change are
+        skipped without hashing and re-organizing a dataset only touches
+        metadata. Returns "unchanged", "deduplicated" or the link mode used
+        for a new object.
+        """
+        stat = src.stat()
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        entry = str(dst.relative_to(self.root_dir))
+        recorded = self._manifest.get(entry)
+        if recorded is not None and recorded[:3] == signature and dst.exists():
+            object_path = self._object_path(recorded[3], src.suffix)
+            if self._object_current(object_path, recorded[3], src) and os.path.samefile(object_path, dst):
+                return "unchanged"
+        
+        digest = self.hash_service.hash_file(src)
+        object_path = self._object_path(digest, src.suffix)
+        result = "deduplicated"
+        if not self._object_current(object_path, digest, src):
+            # New content, or an object that no longer matches its hash
+            object_path.parent.mkdir(exist_ok=True)
+            result = self._link(src, object_path)
+            stat = object_path.stat()
+            self._manifest[str(object_path.relative_to(self.root_dir))] = [
+                stat.st_size, stat.st_mtime_ns, stat.st_ino, digest
+            ]
+        
+        # Renaming a hard link over another link to the same file is a no-op
+        if not (dst.exists() and os.path.samefile(object_path, dst)):
+            tmp_path = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+            try:
+                os.link(object_path, tmp_path)
+            except OSError:
+                os.symlink(os.path.abspath(object_path), tmp_path)
+            os.replace(tmp_path, dst)
+        self._manifest[entry] = signature + [digest]
+        return result
         
     def organize_dataset(self, 
                         source_dir: Path,
                         features: Dict[str, Any],
-                        metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Organize the dataset into a standard structure"""
+                        metadata: Dict[str, Any],
+                        version: str = "") -> Dict[str, Any]:
+        """
+        Organize the dataset into a standard structure
+        
+        Features are appended to features.h5 keyed by track id; tracks
+        already stored with the same version are left untouched.
+        """
         
         dataset_info = {
             "total_tracks": 0,
             "genres": {},
+            "audio_files": {},
             "features_file": str(self.features_dir / "features.h5"),
             "metadata_file": str(self.metadata_dir / "metadata.json")
         }
         
-        # Create HDF5 file for features
-        with h5py.File(self.features_dir / "features.h5", 'w') as f:
-            # Create groups for each feature type
-            audio_features = f.create_group("audio_features")
-            spectral_features = f.create_group("spectral_features")
-            temporal_features = f.create_group("temporal_features")
+        # Older datasets stored one HDF5 group per track; keep them aside
+        features_file = self.features_dir / "features.h5"
+        if features_file.exists():
+            with h5py.File(features_file, 'r') as f:
+                legacy = "audio_features" in f
+            if legacy:
+                features_file.rename(self.features_dir / "features.legacy.h5")
+        store = FeatureStore(features_file)
+        
+        if self.manifest_file.exists():
+            with open(self.manifest_file) as f:
+                self._manifest = json.load(f)
+        
+        # Process each audio file
+        for genre_dir in source_dir.iterdir():
+            if not genre_dir.is_dir():
+                continue
+            
+            genre = genre_dir.name
+            dataset_info["genres"][genre] = 0
+            
+            # Create genre directory in audio dir
+            genre_audio_dir = self.audio_dir / genre
+            genre_audio_dir.mkdir(exist_ok=True)
             
-            # Process each audio file
-            for genre_dir in source_dir.iterdir():
-                if not genre_dir.is_dir():
-                    continue
+            # Process each track
+            for audio_file in genre_dir.glob("*.wav"):
+                track_id = audio_file.stem
                 
-                genre = genre_dir.name
-                dataset_info["genres"][genre] = 0
+                # Link audio file, storing identical content once
+                result = self.place_audio(audio_file, genre_audio_dir / audio_file.name)
+                dataset_info["audio_files"][result] = dataset_info["audio_files"].get(result, 0) + 1
                 
-                # Create genre directory in audio dir
-                genre_audio_dir = self.audio_dir / genre
-                genre_audio_dir.mkdir(exist_ok=True)
+                # Store features
+                if track_id in features:
+                    store.upsert(
+                        track_id,
+                        {**features[track_id], "genre": genre},
+                        str(genre_audio_dir / audio_file.name),
+                        version
+                    )
                 
-                # Process each track
-                for audio_file in genre_dir.glob("*.wav"):
-                    track_id = audio_file.stem
-                    
-                    # Copy audio file
-                    shutil.copy2(audio_file, genre_audio_dir / audio_file.name)
-                    
-                    # Store features
-                    if track_id in features:
-                        track_features = features[track_id]
-                        
-                        # Create track group
-                        track_group = audio_features.create_group(track_id)
-                        
-                        # Store different feature types
-                        for feature_name, feature_data in track_features.items():
-                            if isinstance(feature_data, (list, np.ndarray)):
-                                track_group.create_dataset(
-                                    feature_name,
-                                    data=np.array(feature_data)
-                                )
-                            else:
-                                track_group.attrs[feature_name] = feature_data
-                    
-                    dataset_info["genres"][genre] += 1
-                    dataset_info["total_tracks"] += 1
+                dataset_info["genres"][genre] += 1
+                dataset_info["total_tracks"] += 1
+        
+        store.flush()
+        dataset_info["feature_tracks"] = len(store)
+        
+        with open(self.manifest_file, 'w') as f:
+            json.dump(self._manifest, f)
         
         # Save metadata
         with open(self.metadata_dir / "metadata.json", 'w') as f:
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# decoders.py
+
+import shutil
+import tempfile
+import itertools
+import subprocess
+import numpy as np
+import soundfile as sf
+import soxr
+import librosa
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from .audio_probe import probe_audio
+
+# Backends are tried in this order; the first one able to read a file wins
+DEFAULT_BACKENDS = ("sndfile", "ffmpeg", "audioread")
+
+class AudioDecoder:
+    """Base class for audio decoder backends"""
+    name = ""
+
+    def is_available(self) -> bool:
+        """Check whether the backend can be used on this machine"""
+        return True
+
+    def supports(self, audio_path: Path) -> bool:
+        """Check whether the backend can read this file format"""
+        return True
+
+    def read(self, audio_path: Path) -> Tuple[np.ndarray, int]:
+        """
+        Decode a whole file
+        Returns: (float32 array shaped (channels, samples), native sample rate)
+        """
+        raise NotImplementedError
+
+    def blocks(self, audio_path: Path, block_size: int) -> Tuple[int, Iterator[np.ndarray]]:
+        """
+        Decode a file incrementally
+        Returns: (native sample rate, iterator of float32 (samples, channels) blocks)
+        """
+        raise NotImplementedError
+
+class SndfileDecoder(AudioDecoder):
+    """Direct libsndfile decoding (WAV, FLAC, OGG and MP3 with libsndfile >= 1.1)"""
+    name = "sndfile"
+
+    def __init__(self):
+        self.formats = {fmt.lower() for fmt in sf.available_formats()}
+
+    def supports(self, audio_path: Path) -> bool:
+        return Path(audio_path).suffix[1:].lower() in self.formats
+
+    def read(self, audio_path: Path) -> Tuple[np.ndarray, int]:
+        y, sr = sf.read(str(audio_path), dtype='float32', always_2d=True)
+        return y.T, int(sr)
+
+    def blocks(self, audio_path: Path, block_size: int) -> Tuple[int, Iterator[np.ndarray]]:
+        sr = sf.info(str(audio_path)).samplerate
+
+        def generate():
+            with sf.SoundFile(str(audio_path)) as f:
+                yield from f.blocks(blocksize=block_size, dtype='float32', always_2d=True)
+
+        return int(sr), generate()
+
+class FFmpegDecoder(AudioDecoder):
+    """Raw float32 PCM piped from an ffmpeg process"""
+    name = "ffmpeg"
+
+    def is_available(self) -> bool:
+        return shutil.which("ffmpeg") is not None
+
+    def _command(self, audio_path: Path, sr: int, channels: int) -> List[str]:
+        return [
+            "ffmpeg", "-nostdin", "-v", "error",
+            "-i", str(audio_path),
+            "-f", "f32le", "-acodec", "pcm_f32le",
+            "-ac", str(channels), "-ar", str(sr),
+            "-"
+        ]
+
+    def read(self, audio_path: Path) -> Tuple[np.ndarray, int]:
+        info = probe_audio(audio_path)
+        result = subprocess.run(
+            self._command(audio_path, info.sample_rate, info.channels),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True
+        )
+        y = np.frombuffer(result.stdout, dtype='<f4').reshape(-1, info.channels)
+        return y.T, info.sample_rate
+
+    def blocks(self, audio_path: Path, block_size: int) -> Tuple[int, Iterator[np.ndarray]]:
+        info = probe_audio(audio_path)
+        frame_bytes = 4 * info.channels
+
+        def generate():
+            # stderr goes to a file so a chatty ffmpeg cannot block on a full pipe
+            with tempfile.TemporaryFile() as stderr:
+                process = subprocess.Popen(
+                    self._command(audio_path, info.sample_rate, info.channels),
+                    stdout=subprocess.PIPE,
+                    stderr=stderr
+                )
+                try:
+                    while True:
+                        data = process.stdout.read(block_size * frame_bytes)
+                        if not data:
+                            break
+                        usable = len(data) - len(data) % frame_bytes
+                        yield np.frombuffer(data[:usable], dtype='<f4').reshape(-1, info.channels)
+                    # A corrupt or truncated file ends the stream early; don't pass it off as complete
+                    if process.wait() != 0:
+                        stderr.seek(0)
+                        message = "; ".join(stderr.read().decode(errors="replace").splitlines())
+                        raise RuntimeError(
+                            f"ffmpeg exited with code {process.returncode}: {message or 'no error output'}"
+                        )
+                finally:
+                    process.stdout.close()
+                    if process.poll() is None:
+                        process.kill()
+                    process.wait()
+
+        return info.sample_rate, generate()
+
+class AudioreadDecoder(AudioDecoder):
+    """audioread fallback (GStreamer, Core Audio, MAD or ffmpeg subprocess)"""
+    name = "audioread"
+
+    def is_available(self) -> bool:
+        try:
+            import audioread
+        except ImportError:
+            return False
+        return True
+
+    def _buffers(self, audio_path: Path):
+        import audioread
+        f = audioread.audio_open(str(audio_path))
+        return f, int(f.samplerate), int(f.channels)
+
+    def read(self, audio_path: Path) -> Tuple[np.ndarray, int]:
+        f, sr, channels = self._buffers(audio_path)
+        with f:
+            y = [librosa.util.buf_to_float(buf, dtype=np.float32) for buf in f]
+        y = np.concatenate(y) if y else np.zeros(0, dtype=np.float32)
+        return y.reshape(-1, channels).T, sr
+
+    def blocks(self, audio_path: Path, block_size: int) -> Tuple[int, Iterator[np.ndarray]]:
+        f, sr, channels = self._buffers(audio_path)
+
+        def generate():
+            with f:
+                for buf in f:
+                    yield librosa.util.buf_to_float(buf, dtype=np.float32).reshape(-1, channels)
+
+        return sr, generate()
+
+_DECODERS: Dict[str, AudioDecoder] = {
+    decoder.name: decoder
+    for decoder in (SndfileDecoder(), FFmpegDecoder(), AudioreadDecoder())
+}
+
+def get_decoders(audio_path: Path,
+                 backends: Optional[Sequence[str]] = None) -> List[AudioDecoder]:
+    """Available decoders able to read a file, in preference order"""
+    decoders = []
+    for name in backends or DEFAULT_BACKENDS:
+        if name not in _DECODERS:
+            raise ValueError(f"Unknown decoder backend: {name}")
+        decoder = _DECODERS[name]
+        if decoder.is_available() and decoder.supports(audio_path):
+            decoders.append(decoder)
+    return decoders
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Resample along the last axis with soxr, matching librosa.resample lengths"""
+    if orig_sr == target_sr:
+        return y
+    n_samples = int(np.ceil(y.shape[-1] * float(target_sr) / orig_sr))
+    y_hat = soxr.resample(y.T, orig_sr, target_sr, quality='HQ').T
+    return np.ascontiguousarray(librosa.util.fix_length(y_hat, size=n_samples, axis=-1), dtype=np.float32)
+
+def decode_audio(audio_path: Path, sr: Optional[int] = 22050, mono: bool = True,
+                 backends: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, int]:
+    """
+    Decode a file with the first backend that can read it
+
+    Drop-in replacement for librosa.load: mono files and mono output are
+    returned as 1-D arrays, multichannel output as (channels, samples).
+    """
+    errors = []
+    for decoder in get_decoders(audio_path, backends):
+        try:
+            y, native_sr = decoder.read(audio_path)
+            break
+        except Exception as e:
+            errors.append(f"{decoder.name}: {e or type(e).__name__}")
+    else:
+        raise RuntimeError(f"No decoder could read {Path(audio_path).name}: {'; '.join(errors) or 'no backend available'}")
+
+    if mono or y.shape[0] == 1:
+        y = np.mean(y, axis=0) if y.shape[0] > 1 else y[0]
+    if sr is not None:
+        y = resample(y, native_sr, int(sr))
+        native_sr = int(sr)
+    return np.ascontiguousarray(y), native_sr
+
+def stream_audio(audio_path: Path, block_size: int,
+                 backends: Optional[Sequence[str]] = None) -> Tuple[int, Iterator[np.ndarray]]:
+    """
+    Open a block-wise decoder with the first backend that can read the file
+
+    The first block is decoded up front, so a backend that fails before
+    producing any audio falls back to the next one. Errors after that are
+    raised from the iterator, since blocks were already handed out.
+    Returns: (native sample rate, iterator of float32 (samples, channels) blocks)
+    """
+    errors = []
+    for decoder in get_decoders(audio_path, backends):
+        try:
+            sr, blocks = decoder.blocks(audio_path, block_size)
+            first = next(blocks, None)
+        except Exception as e:
+            errors.append(f"{decoder.name}: {e or type(e).__name__}")
+            continue
+        if first is None:
+            return sr, iter(())
+        return sr, itertools.chain((first,), blocks)
+    raise RuntimeError(f"No decoder could stream {Path(audio_path).name}: {'; '.join(errors) or 'no backend available'}")
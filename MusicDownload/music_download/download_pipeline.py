@@ -3,24 +3,28 @@
 
 import os
 import json
-import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional
 from .downloader import setup_config, generate_playlist
+from .hashing import HashService, get_hash_service
 
 class MusicDownloadPipeline:
-    def __init__(self, config_path: str, downloads_dir: Path = None):
+    def __init__(self, config_path: str, downloads_dir: Path = None,
+                 hash_service: Optional[HashService] = None):
         """
         Initialize the music download pipeline
         
         Args:
             config_path (str): Path to JSON config file containing playlist URLs and genres
             downloads_dir (Path): Directory for downloads
+            hash_service (HashService): Shared hash service (process-wide default if None)
         """
         self.config_path = config_path
         self.downloads_dir = Path(downloads_dir) if downloads_dir else Path("downloads")
         self.downloads_dir.mkdir(parents=True, exist_ok=True)
         self.state_file = self.downloads_dir / ".download_state.json"
+        self.hash_service = hash_service or get_hash_service()
         self.load_config()
         self.load_state()
 
@@ -55,12 +59,8 @@ class MusicDownloadPipeline:
             json.dump(self.state, f, indent=4)
 
     def get_file_hash(self, file_path: Path) -> str:
-        """Calculate file hash"""
-        hasher = hashlib.md5()
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+        """Calculate file hash through the shared hash service"""
+        return self.hash_service.hash_file(file_path)
 
     def needs_download(self, url: str, file_path: Path, check_modified: bool) -> bool:
         """Check if file needs to be downloaded"""
@@ -73,9 +73,29 @@ class MusicDownloadPipeline:
         current_hash = self.get_file_hash(file_path)
         return self.state["downloaded_files"].get(url) != current_hash
 
-    def run(self, skip_existing: bool = True, check_modified: bool = True) -> List[Path]:
-        """Run the download pipeline"""
+    def run(self, skip_existing: bool = True, check_modified: bool = True,
+            on_file: Optional[Callable[[Path], None]] = None) -> List[Path]:
+        """
+        Run the download pipeline
+        
+        Args:
+            skip_existing (bool): Skip files that are already downloaded and unchanged
+            check_modified (bool): Compare file hashes to detect modified files
+            on_file (Callable): Called with each new file as soon as it is
+                downloaded, so processing can start before the run finishes
+        """
         downloaded_files = []
+        emitted = set()
+        emit_lock = threading.Lock()
+        
+        def emit(file_path: Path):
+            # Download threads and the tracking loop below may both report a file
+            file_path = file_path.resolve()
+            with emit_lock:
+                if file_path in emitted:
+                    return
+                emitted.add(file_path)
+            on_file(file_path)
         
         for playlist in self.config["download_settings"]["playlists"]:
             genre = playlist["genre"]
@@ -104,7 +124,8 @@ class MusicDownloadPipeline:
                     "audio_codec": self.config["download_settings"]["audio_codec"],
                     "audio_quality": self.config["download_settings"]["audio_quality"],
                     "name_format": self.config["download_settings"]["name_format"],
-                    "include_metadata": self.config["download_settings"]["include_metadata"]
+                    "include_metadata": self.config["download_settings"]["include_metadata"],
+                    "info_cache_ttl": self.config["download_settings"].get("info_cache_ttl", 3600)
                 }
                 
                 # Generate playlist
@@ -116,18 +137,23 @@ class MusicDownloadPipeline:
                     regenerate_metadata=False,
                     single_playlist=True,
                     current_playlist_name=None,
-                    track_num_to_update=None
+                    track_num_to_update=None,
+                    on_downloaded=emit if on_file else None
                 )
                 
-                # Track downloaded files
+                # Track downloaded files, hashing them concurrently up front
                 audio_codec = self.config["download_settings"]["audio_codec"]
-                for file_path in genre_dir.glob(f"*.{audio_codec}"):
+                playlist_files = list(genre_dir.glob(f"*.{audio_codec}"))
+                self.hash_service.hash_files(playlist_files)
+                for file_path in playlist_files:
                     if skip_existing and not self.needs_download(playlist["url"], file_path, check_modified):
                         print(f"Skipping existing file: {file_path.name}")
                         continue
                         
                     downloaded_files.append(file_path)
                     self.state["downloaded_files"][playlist["url"]] = self.get_file_hash(file_path)
+                    if on_file:
+                        emit(file_path)
 
             finally:
                 os.chdir(original_dir)
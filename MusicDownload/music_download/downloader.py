@@ -9,6 +9,7 @@ import copy
 import json
 import time
 import requests
+import threading
 import subprocess
 import concurrent.futures
 from PIL import Image
@@ -34,11 +35,110 @@ class FilePathCollector(postprocessor.common.PostProcessor):
     def __init__(self):
         super(FilePathCollector, self).__init__(None)
         self.file_paths = []
+        self.info_dicts = []
 
     def run(self, information):
         self.file_paths.append(information['filepath'])
+        # Keep the info dict so metadata does not need another extract_info
+        self.info_dicts.append(information)
         return [], information
 
+class YoutubeDLPool:
+    # Configured YoutubeDL instances reused by each thread, keyed by their options.
+    # Building a YoutubeDL re-initializes its extractors, cookies and post-processors,
+    # which is a noticeable share of the per-track time when syncing large playlists.
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._instances = []
+        # FilePathCollector of each instance, keyed by id(ytdl)
+        self._collectors = {}
+
+    def get(self, ytdl_opts: dict, outtmpl=None):
+        # The output template changes with every track, so it is set on the
+        # reused instance rather than being part of the key
+        key = json.dumps(ytdl_opts, sort_keys=True, default=str)
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        ytdl = instances.get(key)
+        if ytdl is None:
+            ytdl = YoutubeDL(copy.deepcopy(ytdl_opts))
+            instances[key] = ytdl
+            with self._lock:
+                self._instances.append(ytdl)
+
+        if outtmpl is not None:
+            ytdl.params["outtmpl"]["default"] = outtmpl
+        # A failed download leaves the return code set for every later download
+        ytdl._download_retcode = 0
+        return ytdl
+
+    def collector(self, ytdl):
+        # Registered once per instance and emptied before each download
+        with self._lock:
+            collector = self._collectors.get(id(ytdl))
+            if collector is None:
+                collector = self._collectors[id(ytdl)] = FilePathCollector()
+                ytdl.add_post_processor(collector)
+        collector.file_paths = []
+        collector.info_dicts = []
+        return collector
+
+    def close(self):
+        # Save cookies and close connections of every instance
+        with self._lock:
+            instances, self._instances = self._instances, []
+            self._collectors = {}
+        self._local = threading.local()
+        for ytdl in instances:
+            ytdl.close()
+
+# Used when no pool is passed in
+default_ytdl_pool = YoutubeDLPool()
+
+class SongInfoCache:
+    # Info dicts of videos kept on disk for ttl seconds, so regenerating metadata
+    # does not query youtube again. Subtitle urls in the info dict expire, which
+    # is why entries are not kept indefinitely.
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, video_id):
+        return os.path.join(self.directory, f"{video_id}.json")
+
+    def get(self, video_id):
+        if self.ttl <= 0:
+            return None
+        path = self._path(video_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, video_id, info_dict):
+        if self.ttl <= 0:
+            return
+        info_dict = YoutubeDL.sanitize_info(info_dict)
+        info_dict = {key:value for key, value in info_dict.items() if not key.startswith("__") and key not in get_uncached_info_keys()}
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self._path(video_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(info_dict, f)
+        os.replace(tmp_path, self._path(video_id))
+
+def get_uncached_info_keys():
+    # Large info dict fields that metadata generation does not use
+    return ["formats", "requested_formats", "requested_downloads", "thumbnails", "automatic_captions", "heatmap"]
+
+def get_info_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "music_download", "info")
+
 class SongFileInfo:
     def __init__(self, video_id, name, file_name, file_path, track_num):
         self.video_id = video_id
@@ -143,7 +243,7 @@ def valid_metadata(config: dict, metadata_dict: dict):
     selected_tags = flatten([value for key, value in get_metadata_map().items() if include_metadata[key]])
     return all([value for tag, value in metadata_dict.items() if tag in selected_tags])
 
-def get_song_info_ytdl(track_num, config: dict):
+def get_song_info_ytdl(track_num, config: dict, ytdl_pool=None):
     # Get ytdl for song info
     name_format = config["name_format"]
     if config["track_num_in_name"]:
@@ -152,7 +252,6 @@ def get_song_info_ytdl(track_num, config: dict):
     ytdl_opts = {
         "quiet": True,
         "geo_bypass": True,
-        "outtmpl": name_format,
         "format": config["audio_format"],
         "cookiefile": None if config["cookie_file"] == "" else config["cookie_file"],
         "cookiesfrombrowser": None if config["cookies_from_browser"] == "" else tuple(config["cookies_from_browser"].split(":")),
@@ -165,18 +264,26 @@ def get_song_info_ytdl(track_num, config: dict):
         }]
     }
 
-    info_dict = {}
-    return YoutubeDL(ytdl_opts)
+    return (ytdl_pool or default_ytdl_pool).get(ytdl_opts, name_format)
+
+def get_song_info(track_num, link, config: dict, ytdl_pool=None, info_cache=None):
+    video_id = get_url_parameter(link, "v")
+    if info_cache is not None:
+        info_dict = info_cache.get(video_id)
+        if info_dict is not None:
+            return info_dict
 
-def get_song_info(track_num, link, config: dict):
     # Get song metadata from youtube
-    ytdl = get_song_info_ytdl(track_num, config)
-    return ytdl.extract_info(link, download=False)
+    ytdl = get_song_info_ytdl(track_num, config, ytdl_pool)
+    info_dict = ytdl.extract_info(link, download=False)
+    if info_cache is not None:
+        info_cache.put(video_id, info_dict)
+    return info_dict
 
 def get_subtitles_url(subtitles, lang):
     return next(sub for sub in subtitles[lang] if sub["ext"] == "json3")["url"]
 
-def generate_metadata(file_path, link, track_num, playlist_name, config: dict, regenerate_metadata: bool, force_update: bool):
+def generate_metadata(file_path, link, track_num, playlist_name, config: dict, regenerate_metadata: bool, force_update: bool, ytdl_pool=None, info_cache=None, info_dict=None):
     try:
         tags = ID3(file_path)
     except:
@@ -184,10 +291,11 @@ def generate_metadata(file_path, link, track_num, playlist_name, config: dict, r
         force_update_file_name = ""
         if force_update:
             try:
-                info_dict = get_song_info(track_num, link, config)
+                if info_dict is None:
+                    info_dict = get_song_info(track_num, link, config, ytdl_pool, info_cache)
                 info_dict_with_audio_ext = dict(info_dict)
                 info_dict_with_audio_ext["ext"] = config["audio_codec"]
-                force_update_file_name = get_song_info_ytdl(track_num, config).prepare_filename(info_dict_with_audio_ext)
+                force_update_file_name = get_song_info_ytdl(track_num, config, ytdl_pool).prepare_filename(info_dict_with_audio_ext)
             except Exception as e:
                 raise Exception(f"Failed to get information for updated file name - {e}")
         return force_update_file_name
@@ -205,12 +313,13 @@ def generate_metadata(file_path, link, track_num, playlist_name, config: dict, r
 
     if regenerate_metadata or force_update or not valid_metadata(config, metadata_dict):
         try:
-            info_dict = get_song_info(track_num, link, config)
+            if info_dict is None:
+                info_dict = get_song_info(track_num, link, config, ytdl_pool, info_cache)
 
             if force_update:
                 info_dict_with_audio_ext = dict(info_dict)
                 info_dict_with_audio_ext["ext"] = config["audio_codec"]
-                force_update_file_name = get_song_info_ytdl(track_num, config).prepare_filename(info_dict_with_audio_ext)
+                force_update_file_name = get_song_info_ytdl(track_num, config, ytdl_pool).prepare_filename(info_dict_with_audio_ext)
 
             thumbnail = info_dict.get("thumbnail")
             upload_date = info_dict.get("upload_date")
@@ -393,14 +502,13 @@ def generate_metadata(file_path, link, track_num, playlist_name, config: dict, r
 
     return force_update_file_name
 
-def download_song(link, playlist_name, track_num, config: dict):
+def download_song(link, playlist_name, track_num, config: dict, ytdl_pool=None):
     directory = os.path.join(os.getcwd(), playlist_name)
     name_format = config["name_format"]
     if config["track_num_in_name"]:
         name_format = f"{track_num}. {name_format}"
 
     ytdl_opts = {
-        "outtmpl": f"{directory}/{name_format}",
         "ignoreerrors": True,
         "format": config["audio_format"],
         "cookiefile": None if config["cookie_file"] == "" else config["cookie_file"],
@@ -417,38 +525,53 @@ def download_song(link, playlist_name, track_num, config: dict):
         ytdl_opts["quiet"] = True
         ytdl_opts["external_downloader_args"] = ["-loglevel", "panic"]
 
-    with YoutubeDL(ytdl_opts) as ytdl:
-        file_path_collector = FilePathCollector()
-        ytdl.add_post_processor(file_path_collector)
-        result = ytdl.download([link])
-        if len(file_path_collector.file_paths) == 0:
-            raise Exception("No file download path found, video may be unavailable")
-        file_path = file_path_collector.file_paths[0]
+    ytdl_pool = ytdl_pool or default_ytdl_pool
+    ytdl = ytdl_pool.get(ytdl_opts, f"{directory}/{name_format}")
+    file_path_collector = ytdl_pool.collector(ytdl)
 
-    return result, file_path
+    result = ytdl.download([link])
+    if len(file_path_collector.file_paths) == 0:
+        raise Exception("No file download path found, video may be unavailable")
+    file_path = file_path_collector.file_paths[0]
+    info_dict = file_path_collector.info_dicts[0]
 
-def download_song_and_update(video_info, playlist, link, playlist_name, track_num, config: dict):
+    # Subtitles are not written when downloading, so select them the way
+    # get_song_info_ytdl does with writesubtitles and allsubtitles
+    if info_dict.get("requested_subtitles") is None and info_dict.get("subtitles"):
+        info_dict["requested_subtitles"] = {lang:formats[-1] for lang, formats in info_dict["subtitles"].items() if formats}
+
+    return result, file_path, info_dict
+
+def download_song_and_update(video_info, playlist, link, playlist_name, track_num, config: dict, on_downloaded=None, ytdl_pool=None, info_cache=None):
     file_path = None
     try:
-        result, file_path = download_song(link, playlist_name, track_num, config)
+        result, file_path, info_dict = download_song(link, playlist_name, track_num, config, ytdl_pool)
 
         # Check download failed and video is unavailable
         if result != 0 and video_info["channel_id"] is None:
             # Video title indicates availability of video such as '[Private Video]'
             raise Exception(f"Video is unavailable - {video_info['title']}")
 
-        generate_metadata(file_path, link, track_num, playlist["title"], config, False, False)
+        if info_cache is not None:
+            info_cache.put(video_info["id"], info_dict)
+
+        # Reuse the info dict of the download instead of extracting it again
+        generate_metadata(file_path, link, track_num, playlist["title"], config, False, False, ytdl_pool, info_cache, info_dict)
     except Exception as e:
         error_message = f"Unable to download video number {track_num} '{link}': {e}"
         return error_message, track_num
+
+    # Hand the finished file to downstream processing right away
+    if on_downloaded is not None:
+        on_downloaded(Path(file_path))
     return None, track_num
 
-def update_song(video_info, song_file_info, file_path, link, track_num, playlist_name, config: dict, regenerate_metadata: bool, force_update: bool):
+def update_song(video_info, song_file_info, file_path, link, track_num, playlist_name, config: dict, regenerate_metadata: bool, force_update: bool, ytdl_pool=None, info_cache=None):
     # Generate metadata just in case it is missing
     video_unavailable = False
     error_message = []
     try:
-        force_update_file_name = generate_metadata(file_path, link, track_num, playlist_name, config, regenerate_metadata, force_update)
+        force_update_file_name = generate_metadata(file_path, link, track_num, playlist_name, config, regenerate_metadata, force_update, ytdl_pool, info_cache)
         if force_update:
             force_update_file_path = os.path.join(playlist_name, force_update_file_name)
             if file_path != force_update_file_path:
@@ -600,6 +723,7 @@ def setup_config(config: dict):
         "cookie_file": "",
         "cookies_from_browser": "",
         "verbose": False,
+        "info_cache_ttl": 3600,
         "include_metadata": setup_include_metadata_config()
     }
 
@@ -608,7 +732,7 @@ def setup_config(config: dict):
 
     # Create example song config override
     config_copy = copy.deepcopy(new_config)
-    excluded_override_keys = ["url", "reverse_playlist", "sync_folder_name", "use_threading", "thread_count", "overrides"]
+    excluded_override_keys = ["url", "reverse_playlist", "sync_folder_name", "use_threading", "thread_count", "info_cache_ttl", "overrides"]
     for excluded_override_key in excluded_override_keys:
         if excluded_override_key in config_copy:
             config_copy.pop(excluded_override_key)
@@ -639,7 +763,7 @@ def generate_default_config(config: dict, config_file_name: str):
 
     write_config(os.path.join(playlist_name, config_file_name), config)
 
-def generate_playlist(base_config: dict, config_file_name: str, update: bool, force_update: bool, regenerate_metadata: bool, single_playlist: bool, current_playlist_name=None, track_num_to_update=None):
+def generate_playlist(base_config: dict, config_file_name: str, update: bool, force_update: bool, regenerate_metadata: bool, single_playlist: bool, current_playlist_name=None, track_num_to_update=None, on_downloaded=None):
     # Get list of links in the playlist
     playlist = get_playlist_info(base_config)
     
@@ -713,127 +837,138 @@ def generate_playlist(base_config: dict, config_file_name: str, update: bool, fo
                         playlist_entries.append(None)
                 playlist_entries.insert(index, {"id": video_id, "channel_id": None, "title": None})
 
+    # YoutubeDL instances are reused by the main thread and each executor thread
+    ytdl_pool = YoutubeDLPool()
+    info_cache = SongInfoCache(get_info_cache_dir(), base_config["info_cache_ttl"])
+
     # Prepare threading executor
     download_executor = None
     update_executor = None
-    download_futures = []
-    update_futures = []
-    if base_config["use_threading"]:
-        thread_count = base_config["thread_count"]
-        if thread_count <= 0:
-            thread_count = None
-        download_executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_count)
-        update_executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_count)
-
-    # Download each item in the list
-    for i, video_info in enumerate(playlist_entries):
-        if video_info is None:
-            # Dummy spacer entry to retain index order
-            continue
+    try:
+        download_futures = []
+        update_futures = []
+        if base_config["use_threading"]:
+            thread_count = base_config["thread_count"]
+            if thread_count <= 0:
+                thread_count = None
+            download_executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_count)
+            update_executor = concurrent.futures.ThreadPoolExecutor(max_workers=thread_count)
+
+        # Download each item in the list
+        for i, video_info in enumerate(playlist_entries):
+            if video_info is None:
+                # Dummy spacer entry to retain index order
+                continue
 
-        track_num = i + 1 - skipped_videos
-        video_id = video_info["id"]
-        link = f"https://www.youtube.com/watch?v={video_id}"
-        song_file_info = song_file_infos.get(video_id)
+            track_num = i + 1 - skipped_videos
+            video_id = video_info["id"]
+            link = f"https://www.youtube.com/watch?v={video_id}"
+            song_file_info = song_file_infos.get(video_id)
 
-        # Song must be downloaded already and match the current track num when updating a single song
-        if track_num_to_update is not None and (song_file_info is None or song_file_info.track_num != track_num_to_update):
-            continue
+            # Song must be downloaded already and match the current track num when updating a single song
+            if track_num_to_update is not None and (song_file_info is None or song_file_info.track_num != track_num_to_update):
+                continue
 
-        config = get_override_config(video_id, base_config)
-        updated_video_ids.append(video_id)
+            config = get_override_config(video_id, base_config)
+            updated_video_ids.append(video_id)
 
-        # Update metadata for a single song
-        if track_num_to_update is not None:
-            if song_file_info is not None:
-                file_path = os.path.join(playlist_name, song_file_info.file_name)
-                try:
-                    # Update all metadata but do not update the track num to avoid resorting playlist
-                    force_update_file_name = generate_metadata(file_path, link, song_file_info.track_num, playlist["title"], config, regenerate_metadata, True)
-                    force_update_file_path = os.path.join(playlist_name, force_update_file_name)
-                    if file_path != force_update_file_path:
-                        # Track name needs updating to proper format
-                        print(f"Renaming incorrect file name from '{Path(file_path).stem}' to '{Path(force_update_file_path).stem}'")
-                        os.rename(file_path, force_update_file_path)
-                except Exception as e:
-                    print(f"Unable to update metadata: {e}")
-            else:
-                print(f"Unable to update metadata for '{link}': This song has not been downloaded yet, please update the playlist first")
+            # Update metadata for a single song
+            if track_num_to_update is not None:
+                if song_file_info is not None:
+                    file_path = os.path.join(playlist_name, song_file_info.file_name)
+                    try:
+                        # Update all metadata but do not update the track num to avoid resorting playlist
+                        force_update_file_name = generate_metadata(file_path, link, song_file_info.track_num, playlist["title"], config, regenerate_metadata, True, ytdl_pool, info_cache)
+                        force_update_file_path = os.path.join(playlist_name, force_update_file_name)
+                        if file_path != force_update_file_path:
+                            # Track name needs updating to proper format
+                            print(f"Renaming incorrect file name from '{Path(file_path).stem}' to '{Path(force_update_file_path).stem}'")
+                            os.rename(file_path, force_update_file_path)
+                    except Exception as e:
+                        print(f"Unable to update metadata: {e}")
+                else:
+                    print(f"Unable to update metadata for '{link}': This song has not been downloaded yet, please update the playlist first")
 
-            # Updating single song finished
-            return
+                # Updating single song finished
+                return
 
-        if song_file_info is None:
-            # Download audio if not downloaded
-            print(f"Downloading '{link}'... ({track_num}/{len(playlist_entries) - skipped_videos})")
-            
-            if base_config["use_threading"]:
-                download_futures.append(download_executor.submit(download_song_and_update, video_info, playlist, link, playlist_name, track_num, config))
+            if song_file_info is None:
+                # Download audio if not downloaded
+                print(f"Downloading '{link}'... ({track_num}/{len(playlist_entries) - skipped_videos})")
+                
+                if base_config["use_threading"]:
+                    download_futures.append(download_executor.submit(download_song_and_update, video_info, playlist, link, playlist_name, track_num, config, on_downloaded, ytdl_pool, info_cache))
+                else:
+                    error_message, _ = download_song_and_update(video_info, playlist, link, playlist_name, track_num, config, on_downloaded, ytdl_pool, info_cache)
+                    if error_message is not None:
+                        print(error_message)
+                        skipped_videos += 1
             else:
-                error_message, _ = download_song_and_update(video_info, playlist, link, playlist_name, track_num, config)
+                # Skip downloading audio if already downloaded
+                print(f"Skipped downloading '{link}' ({track_num}/{len(playlist_entries) - skipped_videos})")
+
+                if base_config["use_threading"]:
+                    # Defer updating track num when using threading
+                    file_path = os.path.join(playlist_name, song_file_info.file_name)
+                else:
+                    # Update track num and get file path
+                    file_path = update_file_order(playlist_name, song_file_info, track_num, config, False)
+
+                # Generate metadata just in case it is missing
+                if base_config["use_threading"]:
+                    update_futures.append(update_executor.submit(update_song, video_info, song_file_info, file_path, link, track_num, playlist["title"], config, regenerate_metadata, force_update, ytdl_pool, info_cache))
+                else:
+                    error_message = update_song(video_info, song_file_info, file_path, link, track_num, playlist["title"], config, regenerate_metadata, force_update, ytdl_pool, info_cache)
+                    if error_message is not None:
+                        print(error_message)
+
+        # Update track nums after download and update when using threading
+        if base_config["use_threading"]:
+            results = []
+
+            # Gather all results in order of submission
+            for index, task in enumerate(download_futures):
+                error_message, track_num = task.result()
+                results.append((error_message, track_num))
                 if error_message is not None:
                     print(error_message)
-                    skipped_videos += 1
-        else:
-            # Skip downloading audio if already downloaded
-            print(f"Skipped downloading '{link}' ({track_num}/{len(playlist_entries) - skipped_videos})")
-
-            if base_config["use_threading"]:
-                # Defer updating track num when using threading
-                file_path = os.path.join(playlist_name, song_file_info.file_name)
-            else:
-                # Update track num and get file path
-                file_path = update_file_order(playlist_name, song_file_info, track_num, config, False)
 
-            # Generate metadata just in case it is missing
-            if base_config["use_threading"]:
-                update_futures.append(update_executor.submit(update_song, video_info, song_file_info, file_path, link, track_num, playlist["title"], config, regenerate_metadata, force_update))
-            else:
-                error_message = update_song(video_info, song_file_info, file_path, link, track_num, playlist["title"], config, regenerate_metadata, force_update)
+            for index, task in enumerate(update_futures):
+                error_message = task.result()
                 if error_message is not None:
                     print(error_message)
 
-    # Update track nums after download and update when using threading
-    if base_config["use_threading"]:
-        results = []
-
-        # Gather all results in order of submission
-        for index, task in enumerate(download_futures):
-            error_message, track_num = task.result()
-            results.append((error_message, track_num))
-            if error_message is not None:
-                print(error_message)
-
-        for index, task in enumerate(update_futures):
-            error_message = task.result()
-            if error_message is not None:
-                print(error_message)
-
-        # Explicitly shutdown executors
-        download_executor.shutdown(wait=False)
-        update_executor.shutdown(wait=False)
-
-        # Get all new temporary song file infos for existing and newly downloaded songs and update
-        skipped_track_nums = [track_num for (error_message, track_num) in results if error_message is not None]
-        temp_song_file_infos = get_song_file_infos(playlist_name) # May raise exception for duplicate songs
-        for i, video_info in enumerate(playlist_entries):
-            if video_info is None:
-                # Dummy spacer entry to retain index order
-                continue
+            # Explicitly shutdown executors
+            download_executor.shutdown(wait=False)
+            update_executor.shutdown(wait=False)
 
-            # Skip videos that failed to download
-            original_track_num = i + 1
-            track_num = original_track_num - skipped_videos
-            if original_track_num in skipped_track_nums:
-                skipped_videos += 1
-                continue
+            # Get all new temporary song file infos for existing and newly downloaded songs and update
+            skipped_track_nums = [track_num for (error_message, track_num) in results if error_message is not None]
+            temp_song_file_infos = get_song_file_infos(playlist_name) # May raise exception for duplicate songs
+            for i, video_info in enumerate(playlist_entries):
+                if video_info is None:
+                    # Dummy spacer entry to retain index order
+                    continue
 
-            video_id = video_info["id"]
-            temp_song_file_info = temp_song_file_infos.get(video_id)
-            if temp_song_file_info is not None:
-                # Update file path and track num
-                config = get_override_config(video_id, base_config)
-                file_path = update_file_order(playlist_name, temp_song_file_info, track_num, config, False)
+                # Skip videos that failed to download
+                original_track_num = i + 1
+                track_num = original_track_num - skipped_videos
+                if original_track_num in skipped_track_nums:
+                    skipped_videos += 1
+                    continue
+
+                video_id = video_info["id"]
+                temp_song_file_info = temp_song_file_infos.get(video_id)
+                if temp_song_file_info is not None:
+                    # Update file path and track num
+                    config = get_override_config(video_id, base_config)
+                    file_path = update_file_order(playlist_name, temp_song_file_info, track_num, config, False)
+    finally:
+        # Let running downloads finish before their instances are closed
+        for executor in (download_executor, update_executor):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        ytdl_pool.close()
 
     # Song not found for single song update
     if track_num_to_update is not None:
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# feature_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+# Cache directory relative to the project root when cache.location is not set
+DEFAULT_CACHE_LOCATION = "cache"
+
+_SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+def parse_size(size: Union[int, float, str]) -> int:
+    """Bytes from a number of megabytes or a size string such as 500MB or 2GB"""
+    if isinstance(size, (int, float)):
+        return int(size * 1024 ** 2)
+    text = size.strip().upper()
+    for unit, factor in _SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(float(text.rstrip("B")))
+
+class FeatureCache:
+    """
+    Persistent feature cache keyed by content hash and extractor version.
+
+    Entries live in their own directory rather than temp_dir, so they
+    survive across runs and identically named tracks never collide. Any
+    change to the extractor's parameters or version changes the key, so
+    stale features are never returned. An SQLite index tracks entry sizes
+    and last access; entries older than ttl are dropped on access, and
+    once the cache outgrows max_bytes the least recently used entries are
+    evicted until it is back under cleanup_threshold * max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: Optional[int] = None,
+                 cleanup_threshold: float = 0.8, ttl: Optional[float] = None):
+        """
+        Initialize feature cache
+
+        Args:
+            cache_dir: Directory holding the entries and their index
+            max_bytes: Size limit in bytes (unbounded if None)
+            cleanup_threshold: Fraction of max_bytes eviction frees down to
+            ttl: Seconds after which an entry expires (never if None)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.cleanup_threshold = cleanup_threshold if cleanup_threshold <= 1 else cleanup_threshold / 100
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.cache_dir / "index.db"), timeout=30.0, check_same_thread=False
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(content_hash: str, version: str) -> str:
+        """Cache key of a file's features for one extractor version"""
+        return f"{content_hash}-{version}" if version else content_hash
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _drop(self, key: str):
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached features, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[0] > self.ttl:
+                self._drop(key)
+                self._conn.commit()
+                return None
+            try:
+                with open(self._path(key)) as f:
+                    features = json.load(f)
+            except (OSError, ValueError):
+                self._drop(key)
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return features
+
+    def put(self, key: str, features: Dict[str, Any]):
+        """Store features and evict old entries if over the size limit"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(features, f)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, path.stat().st_size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            expired = self._conn.execute(
+                "SELECT key FROM entries WHERE created < ?", (now - self.ttl,)
+            ).fetchall()
+            for (key,) in expired:
+                self._drop(key)
+
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * self.cleanup_threshold
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total <= target:
+                break
+            self._drop(key)
+            total -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Number of entries and their total size"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def close(self):
+        """Close the index"""
+        with self._lock:
+            self._conn.close()
@@ -4,9 +4,15 @@
 import librosa
 import numpy as np
 import json
+import hashlib
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
+from .audio_store import AudioStore, load_audio
+from .analysis_engine import AnalysisPlan, Resampler, SpectralAnalysisEngine
+
+# Bump whenever extract_features changes its output
+FEATURE_VERSION = 1
 
 @dataclass
 class AudioFeatures:
@@ -27,8 +33,31 @@ class AudioFeatures:
     zero_crossing_rate_mean: float
 
 class FeatureExtractor:
-    def __init__(self, frame_size: float = 0.05):
+    def __init__(self, frame_size: float = 0.05,
+                 audio_store: Optional[AudioStore] = None,
+                 fused: bool = True,
+                 analysis_plan: Optional[AnalysisPlan] = None):
         self.frame_size = frame_size
+        self.audio_store = audio_store
+        self.fused = fused
+        self.analysis_plan = analysis_plan or AnalysisPlan()
+        self.engine = SpectralAnalysisEngine()
+
+    @property
+    def cache_version(self) -> str:
+        """Hash of the extractor's version and parameters, part of feature cache keys"""
+        params = {
+            "version": FEATURE_VERSION,
+            "librosa": librosa.__version__,
+            "frame_size": self.frame_size,
+            "fused": self.fused,
+            "n_fft": self.engine.n_fft,
+            "hop_length": self.engine.hop_length
+        }
+        # Full-rate analysis keeps the keys features were cached under so far
+        if self.analysis_plan != AnalysisPlan():
+            params["analysis_plan"] = self.analysis_plan.as_dict()
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
         
     def convert_to_serializable(self, obj):
         """Convert numpy types to Python native types"""
@@ -47,8 +76,36 @@ class FeatureExtractor:
     def extract_features(self, audio_path: Path) -> Dict[str, Any]:
         """Extract all features from an audio file"""
         # Load audio
-        y, sr = librosa.load(audio_path, sr=None)
+        y, sr = load_audio(audio_path, sr=None, store=self.audio_store)
+        
+        if not self.fused:
+            return self.extract_features_per_feature(y, sr)
+        
+        # Rhythm and harmonic descriptors run at the plan's analysis rates
+        resampler = Resampler(y, sr, audio_path, self.audio_store)
+        rhythm_sr = self.analysis_plan.rate("rhythm", sr)
+        harmonic_sr = self.analysis_plan.rate("harmonic", sr)
+        
+        # Spectral and energy descriptors share one full-rate STFT
+        analysis = self.engine.analyze(y, sr, resampler.at(rhythm_sr), rhythm_sr)
+        
+        # Extract harmonic features
+        chromagram = librosa.feature.chroma_cqt(y=resampler.at(harmonic_sr), sr=harmonic_sr)
+        key_strengths = np.mean(chromagram, axis=1)
         
+        features = {
+            "temporal_features": analysis["temporal_features"],
+            "spectral_features": analysis["spectral_features"],
+            "harmonic_features": {
+                "key_strength": key_strengths.tolist()
+            },
+            "energy_features": analysis["energy_features"]
+        }
+        
+        return self.convert_to_serializable(features)
+    
+    def extract_features_per_feature(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
+        """Reference path computing every feature independently from the full-rate signal"""
         # Extract temporal features
         tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
         beat_times = librosa.frames_to_time(beat_frames, sr=sr)
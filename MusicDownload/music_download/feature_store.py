@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# feature_store.py
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import h5py
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 4096
+CHUNK_VALUES = 65536
+STRING_DTYPE = h5py.string_dtype()
+
+def flatten_features(features: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested feature dicts into dotted column names"""
+    flat = {}
+    for name, value in features.items():
+        if isinstance(value, dict):
+            flat.update(flatten_features(value, f"{prefix}{name}."))
+        else:
+            flat[f"{prefix}{name}"] = value
+    return flat
+
+def unflatten_features(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild nested feature dicts from dotted column names"""
+    features: Dict[str, Any] = {}
+    for name, value in flat.items():
+        node = features
+        parts = name.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return features
+
+class FeatureStore:
+    """
+    Append-only columnar feature store in a chunked, compressed HDF5 file.
+
+    There is one row per track, keyed by content hash or track id; /keys
+    is the index table mapping keys to rows. Numeric scalar features are
+    float64 columns under /scalars and strings are columns under /strings.
+    Arrays of a fixed length (chroma, key strengths) are contiguous 2D
+    float32 matrices under /matrices, one row per track, so they can be
+    read whole for training. Variable-length arrays (beat times) are
+    stored as one flat float32 values dataset plus an int64 offsets
+    dataset per feature under /arrays; a matrix feature whose length
+    turns out to vary is moved there. Upserting a key appends a new row and marks
+    the previous one dead in /live, so writes never rewrite existing
+    data; compact() drops dead rows. Rows are buffered and written in
+    batches of flush_every.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 256):
+        """
+        Initialize feature store
+
+        Args:
+            path: HDF5 file, created if missing
+            flush_every: Buffered rows written per batch
+        """
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._buffer: List[Tuple[str, str, str, Dict[str, Any]]] = []
+        self._index: Dict[str, Tuple[int, str]] = {}
+        self._load_index()
+
+    def _load_index(self):
+        """Map each live key to its row and extractor version"""
+        self._index = {}
+        if not self.path.exists():
+            return
+        with h5py.File(self.path, 'r') as f:
+            if "keys" not in f:
+                return
+            keys = f["keys"].asstr()[:]
+            versions = f["versions"].asstr()[:]
+            live = f["live"][:]
+        for row in np.flatnonzero(live):
+            self._index[keys[row]] = (int(row), versions[row])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index) + len({key for key, _, _, _ in self._buffer} - set(self._index))
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._index or any(item[0] == key for item in self._buffer)
+
+    def upsert(self, key: str, features: Dict[str, Any], path: str = "", version: str = "") -> bool:
+        """
+        Add or replace the features of a track
+        Returns False if the same key and version is already stored
+        """
+        with self._lock:
+            if key in self._index and self._index[key][1] == version:
+                return False
+            self._buffer.append((key, path, version, flatten_features(features)))
+            if len(self._buffer) >= self.flush_every:
+                self.flush()
+        return True
+
+    @staticmethod
+    def _create_column(group: h5py.Group, name: str, dtype, rows: int, fill) -> h5py.Dataset:
+        dataset = group.create_dataset(
+            name, shape=(rows,), maxshape=(None,), dtype=dtype,
+            chunks=(CHUNK_ROWS,), compression="gzip", shuffle=dtype != STRING_DTYPE
+        )
+        if rows:
+            dataset[:] = fill
+        return dataset
+
+    @staticmethod
+    def _append(dataset: h5py.Dataset, values) -> int:
+        start = dataset.shape[0]
+        dataset.resize((start + len(values),))
+        if len(values):
+            dataset[start:] = values
+        return start
+
+    def flush(self):
+        """Write buffered rows to disk"""
+        with self._lock:
+            if not self._buffer:
+                return
+            # Only the last upsert of a key in the batch is kept
+            batch = list({item[0]: item for item in self._buffer}.values())
+            self._buffer = []
+
+            with h5py.File(self.path, 'a') as f:
+                if "keys" not in f:
+                    for name, dtype in (("keys", STRING_DTYPE), ("paths", STRING_DTYPE),
+                                        ("versions", STRING_DTYPE), ("live", bool)):
+                        self._create_column(f, name, dtype, 0, None)
+                for group in ("scalars", "strings", "matrices", "arrays"):
+                    f.require_group(group)
+                rows = f["keys"].shape[0]
+
+                # Retire rows being replaced
+                for key, _, _, _ in batch:
+                    if key in self._index:
+                        f["live"][self._index[key][0]] = False
+
+                start = self._append(f["keys"], [item[0] for item in batch])
+                self._append(f["paths"], [item[1] for item in batch])
+                self._append(f["versions"], [item[2] for item in batch])
+                self._append(f["live"], np.ones(len(batch), dtype=bool))
+
+                names = set().union(*(item[3] for item in batch))
+                for name in names:
+                    values = [item[3][name] for item in batch if name in item[3]]
+                    if isinstance(values[0], str):
+                        if name not in f["strings"]:
+                            self._create_column(f["strings"], name, STRING_DTYPE, rows, "")
+                    elif not isinstance(values[0], (list, tuple, np.ndarray)):
+                        if name not in f["scalars"]:
+                            self._create_column(f["scalars"], name, np.float64, rows, np.nan)
+                    elif name not in f["arrays"]:
+                        widths = {np.size(value) for value in values}
+                        if name in f["matrices"]:
+                            widths.add(f["matrices"][name].shape[1])
+                        if len(widths) > 1 or 0 in widths:
+                            self._create_ragged(f, name, rows)
+                        elif name not in f["matrices"]:
+                            width = widths.pop()
+                            matrix = f["matrices"].create_dataset(
+                                name, shape=(rows, width), maxshape=(None, width),
+                                dtype=np.float32, chunks=(max(1, CHUNK_VALUES // width), width),
+                                compression="gzip", shuffle=True
+                            )
+                            if rows:
+                                matrix[:] = np.nan
+
+                for name, dataset in f["scalars"].items():
+                    self._append(dataset, np.array(
+                        [item[3].get(name, np.nan) for item in batch], dtype=np.float64
+                    ))
+                for name, dataset in f["strings"].items():
+                    self._append(dataset, [str(item[3].get(name, "")) for item in batch])
+                for name, matrix in f["matrices"].items():
+                    start = matrix.shape[0]
+                    matrix.resize((start + len(batch), matrix.shape[1]))
+                    matrix[start:] = np.stack([
+                        np.asarray(item[3].get(name, np.full(matrix.shape[1], np.nan)),
+                                   dtype=np.float32).ravel()
+                        for item in batch
+                    ])
+                for name, group in f["arrays"].items():
+                    arrays = [
+                        np.asarray(item[3].get(name, ()), dtype=np.float32).ravel()
+                        for item in batch
+                    ]
+                    offsets = group["offsets"]
+                    end = int(offsets[-1]) if offsets.shape[0] else 0
+                    if offsets.shape[0] == 0:
+                        self._append(offsets, [0])
+                    lengths = np.cumsum([len(array) for array in arrays], dtype=np.int64)
+                    self._append(offsets, end + lengths)
+                    self._append(group["values"], np.concatenate(arrays) if arrays else [])
+
+            for i, (key, _, version, _) in enumerate(batch):
+                self._index[key] = (start + i, version)
+
+    @staticmethod
+    def _create_ragged(f: h5py.File, name: str, rows: int):
+        """Create a values+offsets feature, moving an existing matrix feature into it"""
+        group = f["arrays"].create_group(name)
+        values = np.zeros(0, dtype=np.float32)
+        offsets = np.zeros(rows + 1, dtype=np.int64)
+        if name in f["matrices"]:
+            # Rows that never had the feature are all NaN and become empty
+            matrix = f["matrices"][name][:]
+            present = ~np.all(np.isnan(matrix), axis=1)
+            values = matrix[present].ravel()
+            offsets[1:] = np.cumsum(present * matrix.shape[1])
+            del f["matrices"][name]
+        group.create_dataset(
+            "values", data=values, maxshape=(None,),
+            chunks=(CHUNK_VALUES,), compression="gzip", shuffle=True
+        )
+        offsets_dataset = FeatureStore._create_column(group, "offsets", np.int64, rows + 1, 0)
+        offsets_dataset[:] = offsets
+
+    def _read_row(self, f: h5py.File, row: int) -> Dict[str, Any]:
+        flat: Dict[str, Any] = {}
+        for name, dataset in f["scalars"].items():
+            value = dataset[row]
+            if not np.isnan(value):
+                flat[name] = float(value)
+        for name, dataset in f["strings"].items():
+            value = dataset.asstr()[row]
+            if value:
+                flat[name] = value
+        for name, matrix in f.get("matrices", {}).items():
+            value = matrix[row]
+            if not np.all(np.isnan(value)):
+                flat[name] = value.tolist()
+        for name, group in f["arrays"].items():
+            start, end = group["offsets"][row:row + 2]
+            if end > start:
+                flat[name] = group["values"][start:end].tolist()
+        return unflatten_features(flat)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Features of one track by content hash, None if not stored"""
+        with self._lock:
+            self.flush()
+            if key not in self._index:
+                return None
+            with h5py.File(self.path, 'r') as f:
+                return self._read_row(f, self._index[key][0])
+
+    def items(self) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        """(key, path, version, features) of every stored track"""
+        with self._lock:
+            self.flush()
+            if not self._index:
+                return
+            with h5py.File(self.path, 'r') as f:
+                paths = f["paths"].asstr()
+                for key, (row, version) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                    yield key, paths[row], version, self._read_row(f, row)
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Scalar and string features of all tracks as a DataFrame indexed by key"""
+        with self._lock:
+            self.flush()
+            if not self._index:
+                return pd.DataFrame()
+            with h5py.File(self.path, 'r') as f:
+                live = f["live"][:]
+                data = {"path": f["paths"].asstr()[:][live]}
+                for group in ("scalars", "strings"):
+                    for name, dataset in f[group].items():
+                        if columns is None or name in columns:
+                            values = dataset.asstr()[:] if group == "strings" else dataset[:]
+                            data[name] = values[live]
+                keys = f["keys"].asstr()[:][live]
+        return pd.DataFrame(data, index=pd.Index(keys, name="key"))
+
+    def load_array(self, name: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Variable-length feature of all tracks as (keys, values, offsets)
+        Track i's array is values[offsets[i]:offsets[i + 1]]
+        """
+        with self._lock:
+            self.flush()
+            with h5py.File(self.path, 'r') as f:
+                live = np.flatnonzero(f["live"][:])
+                keys = f["keys"].asstr()[:][live]
+                if name in f.get("matrices", {}):
+                    matrix = f["matrices"][name][:][live]
+                    present = ~np.all(np.isnan(matrix), axis=1)
+                    offsets = np.concatenate([[0], np.cumsum(present * matrix.shape[1])])
+                    return keys, matrix[present].ravel(), offsets
+                group = f["arrays"][name]
+                all_offsets = group["offsets"][:]
+                values = group["values"][:]
+        starts, ends = all_offsets[live], all_offsets[live + 1]
+        offsets = np.concatenate([[0], np.cumsum(ends - starts)])
+        if len(live) and not np.all(starts[1:] == ends[:-1]):
+            values = np.concatenate([values[s:e] for s, e in zip(starts, ends)])
+        else:
+            values = values[starts[0]:ends[-1]] if len(live) else values[:0]
+        return keys, values, offsets
+
+    def load_matrix(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Fixed-length array feature of all tracks as (keys, 2D matrix)
+        Tracks without the feature have a row of NaN
+        """
+        with self._lock:
+            self.flush()
+            with h5py.File(self.path, 'r') as f:
+                if name in f.get("matrices", {}):
+                    live = f["live"][:]
+                    if live.all():
+                        return f["keys"].asstr()[:], f["matrices"][name][:]
+                    return f["keys"].asstr()[:][live], f["matrices"][name][:][live]
+        keys, values, offsets = self.load_array(name)
+        lengths = np.diff(offsets)
+        if len(lengths) and not np.all(lengths == lengths[0]):
+            raise ValueError(f"Feature {name} does not have the same length for every track")
+        width = int(lengths[0]) if len(lengths) else 0
+        return keys, values.reshape(len(keys), width)
+
+    def merge_from(self, other_path: Path) -> int:
+        """Upsert every track of another feature store; returns the number read"""
+        other = FeatureStore(other_path)
+        count = 0
+        for key, path, version, features in other.items():
+            self.upsert(key, features, path, version)
+            count += 1
+        self.flush()
+        return count
+
+    def compact(self):
+        """Rewrite the file without dead rows"""
+        with self._lock:
+            self.flush()
+            if not self.path.exists():
+                return
+            tmp_path = self.path.with_suffix(".compact.h5")
+            compacted = FeatureStore(tmp_path, flush_every=self.flush_every)
+            for key, path, version, features in self.items():
+                compacted.upsert(key, features, path, version)
+            compacted.flush()
+            tmp_path.replace(self.path)
+            self._load_index()
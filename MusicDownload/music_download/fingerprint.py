@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# fingerprint.py
+
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+from .state_store import StateStore
+from .hashing import HashService, get_hash_service
+
+def stat_signature(file_path: Path) -> Tuple[int, int, int]:
+    """(size, mtime_ns, inode) of a file"""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+def use_sampled(size: int, sample_threshold: Optional[int]) -> bool:
+    """Whether a file of this size is hashed in sampled mode"""
+    return sample_threshold is not None and size >= sample_threshold
+
+def content_hash(file_path: Path, sample_threshold: Optional[int] = None,
+                 hash_service: Optional[HashService] = None) -> str:
+    """Full hash, or sampled hash for files at or above sample_threshold bytes"""
+    hash_service = hash_service or get_hash_service()
+    sampled = use_sampled(os.path.getsize(file_path), sample_threshold)
+    return hash_service.hash_file(file_path, sampled=sampled)
+
+class FileFingerprinter:
+    """
+    Stat-based fingerprint cache in front of file hashing.
+
+    The hash of every file is recorded with its (size, mtime_ns, inode)
+    and only recomputed when that signature changes, so skip checks on an
+    unchanged library never read file contents.
+    """
+
+    def __init__(self, store: StateStore, sample_threshold: Optional[int] = None,
+                 hash_service: Optional[HashService] = None):
+        """
+        Initialize fingerprinter
+
+        Args:
+            store: State store holding the fingerprint table
+            sample_threshold: Size in bytes from which files are hashed in
+                sampled (head/middle/tail) mode; None always hashes fully
+            hash_service: Hash service (process-wide default if None)
+        """
+        self.store = store
+        self.sample_threshold = sample_threshold
+        self.hash_service = hash_service or get_hash_service()
+
+    def cached_hash(self, file_path: Path,
+                    signature: Optional[Tuple[int, int, int]] = None) -> Optional[str]:
+        """Recorded hash if the file's stat signature is unchanged, else None"""
+        if signature is None:
+            signature = stat_signature(file_path)
+        fingerprint = self.store.get_fingerprint(str(file_path))
+        if fingerprint is None:
+            return None
+        size, mtime_ns, inode, digest, sampled, algorithm = fingerprint
+        if (size, mtime_ns, inode) != signature:
+            return None
+        if sampled != use_sampled(size, self.sample_threshold):
+            return None
+        if algorithm != self.hash_service.algorithm:
+            return None
+        return digest
+
+    def record(self, file_path: Path, digest: str, signature: Tuple[int, int, int]):
+        """Record a hash computed for the given stat signature"""
+        size, mtime_ns, inode = signature
+        self.store.put_fingerprint(
+            str(file_path), size, mtime_ns, inode, digest,
+            use_sampled(size, self.sample_threshold),
+            self.hash_service.algorithm
+        )
+
+    def get_hash(self, file_path: Path) -> str:
+        """Hash of a file, recomputed only when its stat signature changed"""
+        signature = stat_signature(file_path)
+        digest = self.cached_hash(file_path, signature)
+        if digest is None:
+            digest = content_hash(file_path, self.sample_threshold, self.hash_service)
+            self.record(file_path, digest, signature)
+        return digest
+
+    def prefetch(self, file_paths: Iterable[Path]) -> int:
+        """
+        Hash every file whose stat signature changed, concurrently
+        Returns the number of files that were hashed
+        """
+        stale = {}
+        for file_path in file_paths:
+            try:
+                signature = stat_signature(file_path)
+            except OSError:
+                continue
+            if self.cached_hash(file_path, signature) is None:
+                stale[file_path] = signature
+
+        full = [p for p, sig in stale.items() if not use_sampled(sig[0], self.sample_threshold)]
+        sampled = [p for p, sig in stale.items() if use_sampled(sig[0], self.sample_threshold)]
+        digests = self.hash_service.hash_files(full)
+        digests.update(self.hash_service.hash_files(sampled, sampled=True))
+
+        for file_path, digest in digests.items():
+            if digest is not None:
+                self.record(file_path, digest, stale[file_path])
+        return len(digests)
@@ -5,9 +5,10 @@ import numpy as np
 import soundfile as sf
 import librosa
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from pydub import AudioSegment
 import json
+from .audio_store import AudioStore, load_audio
 
 class FormatStandardizer:
     def __init__(self,
@@ -15,7 +16,8 @@ class FormatStandardizer:
                 target_channels: int = 2,
                 target_format: str = 'wav',
                 target_subtype: str = 'PCM_16',
-                target_lufs: float = -14.0):
+                target_lufs: float = -14.0,
+                audio_store: Optional[AudioStore] = None):
         """
         Initialize format standardizer
         
@@ -25,19 +27,21 @@ class FormatStandardizer:
             target_format: Output format ('wav' or 'mp3')
             target_subtype: Bit depth format
             target_lufs: Target loudness (industry standard is -14 LUFS)
+            audio_store: Shared decoded-audio store (decodes directly if None)
         """
         self.target_sr = target_sr
         self.target_channels = target_channels
         self.target_format = target_format
         self.target_subtype = target_subtype
         self.target_lufs = target_lufs
+        self.audio_store = audio_store
         
     def standardize_audio(self, 
                          input_path: Path, 
                          output_path: Path) -> Dict[str, Any]:
         """Standardize a single audio file"""
         # Load audio with original sr
-        y, sr = librosa.load(input_path, sr=None, mono=False)
+        y, sr = load_audio(input_path, sr=None, mono=False, store=self.audio_store)
         
         # Convert to target sample rate
         if sr != self.target_sr:
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# hashing.py
+
+import os
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+SAMPLE_BLOCK_SIZE = 1024 * 1024
+
+class HashService:
+    """
+    Content hashing shared by every module in the pipeline.
+
+    Digests are memoized per (path, size, mtime_ns, inode), so a file is
+    hashed at most once per run no matter how many components ask for
+    it. Files are read with a large reusable buffer, and hash_files spreads
+    a batch over a thread pool (hashlib releases the GIL while hashing).
+    """
+
+    def __init__(self, algorithm: str = "md5", buffer_size: int = 4 * 1024 * 1024,
+                 max_workers: int = 8):
+        """
+        Initialize hash service
+
+        Args:
+            algorithm: Any hashlib algorithm name, e.g. "md5" or "blake2b"
+            buffer_size: Read buffer size in bytes
+            max_workers: Threads used by hash_files
+        """
+        hashlib.new(algorithm)
+        self.algorithm = algorithm
+        self.buffer_size = buffer_size
+        self.max_workers = max_workers
+        self._setup()
+
+    def _setup(self):
+        self._lock = threading.Lock()
+        self._memo: Dict[Tuple, str] = {}
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # Worker processes get their own memo and buffers
+        return {
+            "algorithm": self.algorithm,
+            "buffer_size": self.buffer_size,
+            "max_workers": self.max_workers
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def _buffer(self) -> memoryview:
+        """Per-thread reusable read buffer"""
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            buffer = memoryview(bytearray(self.buffer_size))
+            self._local.buffer = buffer
+        return buffer
+
+    def _full_digest(self, file_path: Path) -> str:
+        hasher = hashlib.new(self.algorithm)
+        buffer = self._buffer()
+        with open(file_path, 'rb', buffering=0) as f:
+            while n := f.readinto(buffer):
+                hasher.update(buffer[:n])
+        return hasher.hexdigest()
+
+    def _sampled_digest(self, file_path: Path, size: int) -> str:
+        hasher = hashlib.new(self.algorithm, str(size).encode())
+        with open(file_path, 'rb') as f:
+            for offset in (0, max(0, size // 2 - SAMPLE_BLOCK_SIZE // 2), max(0, size - SAMPLE_BLOCK_SIZE)):
+                f.seek(offset)
+                hasher.update(f.read(SAMPLE_BLOCK_SIZE))
+        return hasher.hexdigest()
+
+    def hash_file(self, file_path: Path, sampled: bool = False) -> str:
+        """
+        Digest of a file, computed once per run
+
+        Args:
+            file_path: File to hash
+            sampled: Hash only the size plus head, middle and tail blocks
+        """
+        stat = os.stat(file_path)
+        key = (str(file_path), stat.st_size, stat.st_mtime_ns, stat.st_ino, sampled)
+        with self._lock:
+            digest = self._memo.get(key)
+        if digest is None:
+            if sampled:
+                digest = self._sampled_digest(file_path, stat.st_size)
+            else:
+                digest = self._full_digest(file_path)
+            with self._lock:
+                self._memo[key] = digest
+        return digest
+
+    def hash_files(self, file_paths: Iterable[Path], sampled: bool = False) -> Dict[Path, Optional[str]]:
+        """Hash many files concurrently; unreadable files map to None"""
+        file_paths = list(file_paths)
+
+        def safe_hash(file_path: Path) -> Optional[str]:
+            try:
+                return self.hash_file(file_path, sampled)
+            except OSError:
+                return None
+
+        if len(file_paths) <= 1:
+            return {file_path: safe_hash(file_path) for file_path in file_paths}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(file_paths, executor.map(safe_hash, file_paths)))
+
+    def forget(self, file_path: Path):
+        """Drop memoized digests of a file"""
+        with self._lock:
+            for key in [key for key in self._memo if key[0] == str(file_path)]:
+                del self._memo[key]
+
+_default_service: Optional[HashService] = None
+_default_lock = threading.Lock()
+
+def get_hash_service() -> HashService:
+    """Process-wide hash service used when none is passed explicitly"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = HashService()
+        return _default_service
+
+def configure_hash_service(**kwargs) -> HashService:
+    """Replace the process-wide hash service, e.g. to select another algorithm"""
+    global _default_service
+    with _default_lock:
+        _default_service = HashService(**kwargs)
+        return _default_service
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# key_estimator.py
+
+import librosa
+import numpy as np
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+from .decoders import resample
+
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# Krumhansl-Kessler key profiles, tonic first
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+@dataclass
+class KeyEstimate:
+    tonic: str
+    mode: str
+    confidence: float
+    correlation: float
+
+    @property
+    def label(self) -> str:
+        return f"{self.tonic} {self.mode}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def _profile_matrix() -> np.ndarray:
+    """The 24 key profiles (12 major, then 12 minor) as zero-mean unit rows"""
+    profiles = np.array(
+        [np.roll(MAJOR_PROFILE, i) for i in range(12)] + [np.roll(MINOR_PROFILE, i) for i in range(12)]
+    )
+    profiles = profiles - profiles.mean(axis=1, keepdims=True)
+    return profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+
+class KeyEstimator:
+    """
+    Musical key estimation by key-profile correlation.
+
+    The mean chroma of a few evenly spaced excerpts is correlated with
+    the Krumhansl-Kessler major and minor profiles in all 12
+    transpositions and the best-matching key wins. Confidence is the gap
+    between the best and the runner-up correlation, so 0 means the two
+    most likely keys are indistinguishable. The "stft" mode computes
+    chroma from a short-time Fourier transform at a low sample rate,
+    which is much cheaper than the constant-Q transform of the "cqt" mode.
+    """
+
+    def __init__(self, mode: str = "stft", sr: int = 11025,
+                 excerpt_seconds: Optional[float] = 30.0, excerpts: int = 3):
+        """
+        Initialize key estimator
+
+        Args:
+            mode: Chroma computed by "stft" or "cqt"
+            sr: Analysis sample rate; higher-rate input is resampled
+            excerpt_seconds: Length of each excerpt (the whole track if None)
+            excerpts: Number of evenly spaced excerpts
+        """
+        if mode not in ("stft", "cqt"):
+            raise ValueError(f"Unknown key estimation mode: {mode}")
+        self.mode = mode
+        self.sr = sr
+        self.excerpt_seconds = excerpt_seconds
+        self.excerpts = excerpts
+        self._profiles = _profile_matrix()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "KeyEstimator":
+        """Estimator from a config mapping with the constructor's arguments"""
+        return cls(**(config or {}))
+
+    def excerpt(self, y: np.ndarray, sr: int) -> np.ndarray:
+        """Evenly spaced excerpts of a signal, concatenated"""
+        if self.excerpt_seconds is None:
+            return y
+        length = int(self.excerpt_seconds * sr)
+        if length * self.excerpts >= len(y):
+            return y
+        starts = np.linspace(0, len(y) - length, self.excerpts).astype(int)
+        return np.concatenate([y[start:start + length] for start in starts])
+
+    def chroma(self, y: np.ndarray, sr: int) -> np.ndarray:
+        """Mean 12-bin chroma of the excerpts at the analysis rate"""
+        y = np.asarray(self.excerpt(y, sr), dtype=np.float32)
+        if sr > self.sr:
+            y, sr = resample(y, sr, self.sr), self.sr
+        if self.mode == "stft":
+            # ~2.7 Hz bins at 11025 Hz resolve semitones down to about 50 Hz
+            n_fft = 1 << int(np.ceil(np.log2(sr * 0.37)))
+            chroma = librosa.feature.chroma_stft(y=y, sr=sr, n_fft=n_fft, hop_length=n_fft // 4)
+        else:
+            chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
+        return np.mean(chroma, axis=1)
+
+    def correlate(self, chroma: np.ndarray) -> np.ndarray:
+        """Correlation of a chroma vector with the 24 key profiles"""
+        centered = chroma - chroma.mean()
+        norm = np.linalg.norm(centered)
+        if norm == 0:
+            raise ValueError("Chroma is flat; the audio has no pitched content")
+        return self._profiles @ (centered / norm)
+
+    def estimate(self, y: np.ndarray, sr: int) -> KeyEstimate:
+        """Estimate the key of a mono signal"""
+        correlations = self.correlate(self.chroma(y, sr))
+        best, runner_up = np.argsort(correlations)[::-1][:2]
+        return KeyEstimate(
+            tonic=PITCH_CLASSES[best % 12],
+            mode="major" if best < 12 else "minor",
+            confidence=float(correlations[best] - correlations[runner_up]),
+            correlation=float(correlations[best])
+        )
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# metadata_index.py
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+COLUMNS = (
+    "path", "hash", "genre", "filename", "duration", "sample_rate", "channels",
+    "tempo", "key", "size_bytes", "processed_date", "metadata", "key_mode",
+    "mtime_ns", "inode"
+)
+
+# Columns added after the first release, created on open if missing
+ADDED_COLUMNS = (("key_mode", "TEXT"), ("mtime_ns", "INTEGER"), ("inode", "INTEGER"))
+
+class MetadataIndex:
+    """
+    Consolidated, queryable index of track metadata in SQLite.
+
+    One row per track keyed by its path, with the columns used for
+    filtering (genre, tempo, key and mode, duration) indexed and the
+    complete metadata kept as JSON alongside. Tags are stored one row per
+    (track, tag) so any tag can be queried. The file's (size, mtime_ns,
+    inode) is kept with its hash, so unchanged tracks are recognized
+    without reading them. Every upsert is its own
+    transaction, so the index never holds a half-written track, and
+    dataset summaries are aggregate queries rather than rescans.
+    """
+
+    def __init__(self, db_path: Path):
+        """
+        Initialize metadata index
+
+        Args:
+            db_path: Path to the SQLite database
+        """
+        self.db_path = Path(db_path)
+        self._setup()
+
+    def __getstate__(self):
+        # Worker processes open their own connection to the same database
+        return {"db_path": self.db_path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def _setup(self):
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    path TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    genre TEXT,
+                    filename TEXT,
+                    duration REAL,
+                    sample_rate INTEGER,
+                    channels INTEGER,
+                    tempo REAL,
+                    key TEXT,
+                    size_bytes INTEGER,
+                    processed_date TEXT,
+                    metadata TEXT NOT NULL,
+                    key_mode TEXT,
+                    mtime_ns INTEGER,
+                    inode INTEGER
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tracks)")}
+            for column, column_type in ADDED_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE tracks ADD COLUMN {column} {column_type}")
+            for column in ("hash", "genre", "tempo", "key", "key_mode", "duration"):
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_tracks_{column} ON tracks ({column})"
+                )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS track_tags (
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (path, name)
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_track_tags_value ON track_tags (name, value)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    @staticmethod
+    def _row(metadata: Dict[str, Any]) -> Tuple:
+        file_info = metadata.get("file_info", {})
+        audio_info = metadata.get("audio_info", {})
+        musical_info = metadata.get("musical_info", {})
+        return (
+            file_info["path"],
+            file_info["hash"],
+            file_info.get("genre"),
+            file_info.get("filename"),
+            audio_info.get("duration"),
+            audio_info.get("sample_rate"),
+            audio_info.get("channels"),
+            musical_info.get("tempo"),
+            musical_info.get("estimated_key"),
+            file_info.get("size_bytes"),
+            metadata.get("processing_info", {}).get("processed_date"),
+            json.dumps(metadata),
+            musical_info.get("key_mode"),
+            file_info.get("mtime_ns"),
+            file_info.get("inode")
+        )
+
+    def upsert(self, metadata: Dict[str, Any]):
+        """Add or replace a track's metadata in one transaction"""
+        self.upsert_many([metadata])
+
+    def upsert_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        """Add or replace the metadata of several tracks in one transaction"""
+        items = list(items)
+        with self._lock, self._conn:
+            for metadata in items:
+                row = self._row(metadata)
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO tracks ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(row))})", row
+                )
+                self._conn.execute("DELETE FROM track_tags WHERE path = ?", (row[0],))
+                self._conn.executemany(
+                    "INSERT INTO track_tags (path, name, value) VALUES (?, ?, ?)",
+                    [(row[0], name, str(value))
+                     for name, value in metadata.get("tags", {}).items() if value]
+                )
+        return len(items)
+
+    def remove(self, path: str):
+        """Drop a track from the index"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tracks WHERE path = ?", (path,))
+            self._conn.execute("DELETE FROM track_tags WHERE path = ?", (path,))
+
+    def is_current(self, path: str, file_hash: str) -> bool:
+        """Whether a track is indexed with the given content hash"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tracks WHERE path = ? AND hash = ?", (path, file_hash)
+            ).fetchone()
+        return row is not None
+
+    def has_signature(self, path: str, signature: Tuple[int, int, int]) -> bool:
+        """Whether a track is indexed with the given (size, mtime_ns, inode)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM tracks WHERE path = ? AND size_bytes = ? AND mtime_ns = ? AND inode = ?",
+                (path, *signature)
+            ).fetchone()
+        return row is not None
+
+    def set_signature(self, path: str, signature: Tuple[int, int, int]):
+        """Record a new (size, mtime_ns, inode) for a track whose content is unchanged"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE tracks SET size_bytes = ?, mtime_ns = ?, inode = ? WHERE path = ?",
+                (*signature, path)
+            )
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Metadata of one track, None if not indexed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT metadata FROM tracks WHERE path = ?", (path,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, genre: Optional[str] = None,
+              tempo_range: Optional[Tuple[float, float]] = None,
+              key: Optional[str] = None,
+              key_mode: Optional[str] = None,
+              duration_range: Optional[Tuple[float, float]] = None,
+              tags: Optional[Dict[str, str]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Metadata of the tracks matching all given filters
+
+        Args:
+            genre: Genre (download directory) of the track
+            tempo_range: Inclusive (min, max) tempo in BPM
+            key: Estimated key tonic, e.g. "C"
+            key_mode: Estimated key mode, "major" or "minor"
+            duration_range: Inclusive (min, max) duration in seconds
+            tags: Tag values that must match exactly, e.g. {"artist": "..."}
+            limit: Maximum number of tracks returned
+        """
+        conditions, params = [], []
+        if genre is not None:
+            conditions.append("genre = ?")
+            params.append(genre)
+        if tempo_range is not None:
+            conditions.append("tempo BETWEEN ? AND ?")
+            params.extend(tempo_range)
+        if key is not None:
+            conditions.append("key = ?")
+            params.append(key)
+        if key_mode is not None:
+            conditions.append("key_mode = ?")
+            params.append(key_mode)
+        if duration_range is not None:
+            conditions.append("duration BETWEEN ? AND ?")
+            params.extend(duration_range)
+        for name, value in (tags or {}).items():
+            conditions.append(
+                "path IN (SELECT path FROM track_tags WHERE name = ? AND value = ?)"
+            )
+            params.extend((name, value))
+
+        sql = "SELECT metadata FROM tracks"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY path"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def summary(self) -> Dict[str, Any]:
+        """Track count, total duration, average tempo and genre distribution"""
+        with self._lock:
+            total, duration, tempo = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(duration), 0), COALESCE(AVG(tempo), 0) FROM tracks"
+            ).fetchone()
+            genres = self._conn.execute(
+                "SELECT genre, COUNT(*) FROM tracks GROUP BY genre ORDER BY genre"
+            ).fetchall()
+        return {
+            "total_tracks": total,
+            "total_duration": duration,
+            "average_tempo": tempo,
+            "genre_distribution": {genre or "": count for genre, count in genres}
+        }
+
+    def migrate_from_json(self, json_files: Iterable[Path]) -> int:
+        """Import per-track metadata JSON files; returns the number imported"""
+        items = []
+        for json_file in json_files:
+            try:
+                with open(json_file) as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if "error" not in metadata and "hash" in metadata.get("file_info", {}):
+                metadata["file_info"].setdefault("genre", Path(metadata["file_info"]["path"]).parent.name)
+                items.append(metadata)
+        return self.upsert_many(items)
+
+    def merge_from(self, db_path: Path) -> int:
+        """
+        Merge the tracks of another metadata index; the most recently
+        processed metadata of a track wins
+        Returns the number of tracks read from the other index
+        """
+        with self._lock:
+            self._conn.execute("ATTACH DATABASE ? AS other", (str(db_path),))
+            try:
+                with self._conn:
+                    count = self._conn.execute("SELECT COUNT(*) FROM other.tracks").fetchone()[0]
+                    updates = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+                    self._conn.execute(f"""
+                        INSERT INTO tracks ({', '.join(COLUMNS)})
+                        SELECT {', '.join(COLUMNS)} FROM other.tracks WHERE true
+                        ON CONFLICT(path) DO UPDATE SET {updates}
+                        WHERE excluded.processed_date > tracks.processed_date
+                    """)
+                    # Tags follow whichever metadata won
+                    merged = """
+                        SELECT path FROM other.tracks o
+                        WHERE o.processed_date = (SELECT processed_date FROM tracks t WHERE t.path = o.path)
+                    """
+                    self._conn.execute(f"DELETE FROM track_tags WHERE path IN ({merged})")
+                    self._conn.execute(f"""
+                        INSERT INTO track_tags SELECT * FROM other.track_tags
+                        WHERE path IN ({merged})
+                    """)
+            finally:
+                self._conn.execute("DETACH DATABASE other")
+        return count
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
@@ -9,8 +9,14 @@ from pathlib import Path
 from typing import Dict, Any, Optional
 from mutagen.id3 import ID3
 from datetime import datetime
-from dataclasses import dataclass, asdict
-import hashlib
+from dataclasses import dataclass
+from .audio_store import AudioStore, load_audio
+from .audio_probe import probe_audio
+from .hashing import HashService, get_hash_service
+from .fingerprint import stat_signature
+from .metadata_index import MetadataIndex
+from .analysis_engine import AnalysisPlan, Resampler
+from .key_estimator import KeyEstimate, KeyEstimator
 
 @dataclass
 class TrackMetadata:
@@ -26,36 +32,68 @@ class TrackMetadata:
     zero_crossing_rate: float
     spectral_centroid: float
     spectral_bandwidth: float
+    key_mode: Optional[str] = None
+    key_confidence: float = 0.0
 
 class MetadataProcessor:
-    def __init__(self, dataset_dir: Path):
-        """Initialize metadata processor"""
+    def __init__(self, dataset_dir: Path, audio_store: Optional[AudioStore] = None,
+                 hash_service: Optional[HashService] = None,
+                 index_path: Optional[Path] = None,
+                 analysis_plan: Optional[AnalysisPlan] = None,
+                 key_estimator: Optional[KeyEstimator] = None):
+        """
+        Initialize metadata processor
+        
+        Args:
+            dataset_dir: Dataset directory holding the metadata
+            audio_store: Shared decoded-audio store
+            hash_service: Content hashing service (the shared one if None)
+            index_path: Metadata index database (metadata/metadata_index.db if None)
+            analysis_plan: Sample rates for tempo and key analysis (native if None)
+            key_estimator: Key estimation engine (STFT chroma on excerpts if None)
+        """
         self.dataset_dir = Path(dataset_dir)
         self.metadata_dir = self.dataset_dir / "metadata"
         self.metadata_file = self.metadata_dir / "dataset_metadata.json"
         self.downloads_dir = dataset_dir.parent / "downloads"  # Add this line
         self.metadata_dir.mkdir(parents=True, exist_ok=True)
+        self.audio_store = audio_store
+        self.hash_service = hash_service or get_hash_service()
+        self.analysis_plan = analysis_plan or AnalysisPlan()
+        self.key_estimator = key_estimator or KeyEstimator()
+        
+        # Consolidated index replacing the per-track <stem>_metadata.json files
+        self.index = MetadataIndex(index_path or self.metadata_dir / "metadata_index.db")
+        if len(self.index) == 0:
+            imported = self.index.migrate_from_json(self.metadata_dir.glob("*_metadata.json"))
+            if imported:
+                print(f"Imported {imported} per-track metadata files into {self.index.db_path.name}")
         
     def _hash_file(self, file_path: Path) -> str:
-        """Calculate file hash"""
-        import hashlib
-        hasher = hashlib.md5()
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+        """Calculate file hash through the shared hash service"""
+        return self.hash_service.hash_file(file_path)
         
     def process_file(self, audio_path: Path) -> Dict[str, Any]:
         """Process a single audio file and extract metadata"""
         try:
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=None)
+            y, sr = load_audio(audio_path, sr=None, store=self.audio_store)
             
-            # Extract basic metadata
-            duration = librosa.get_duration(y=y, sr=sr)
+            # Extract basic metadata from headers, falling back to the decode
+            try:
+                info = probe_audio(audio_path)
+                duration, sample_rate, channels = info.duration, info.sample_rate, info.channels
+            except Exception:
+                duration = librosa.get_duration(y=y, sr=sr)
+                sample_rate = sr
+                channels = len(y.shape) if len(y.shape) > 1 else 1
             
-            # Extract musical features
-            tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
+            # Extract musical features at the plan's analysis rates
+            resampler = Resampler(y, sr, audio_path, self.audio_store)
+            rhythm_sr = self.analysis_plan.rate("rhythm", sr)
+            harmonic_sr = self.analysis_plan.rate("harmonic", sr)
+            tempo, beats = librosa.beat.beat_track(y=resampler.at(rhythm_sr), sr=rhythm_sr)
+            key = self._estimate_key(resampler.at(harmonic_sr), harmonic_sr, audio_path)
             
             # Get ID3 tags if available
             tags = {}
@@ -71,7 +109,8 @@ class MetadataProcessor:
             except Exception as e:
                 print(f"Warning: Could not read ID3 tags from {audio_path.name}: {e}")
             
-            # Calculate file hash
+            # Calculate file hash, with the stat signature it belongs to
+            size_bytes, mtime_ns, inode = stat_signature(audio_path)
             file_hash = self._hash_file(audio_path)
             
             # Extract audio features
@@ -79,19 +118,25 @@ class MetadataProcessor:
                 "file_info": {
                     "filename": audio_path.name,
                     "path": str(audio_path),
-                    "size_bytes": audio_path.stat().st_size,
+                    "size_bytes": size_bytes,
+                    "mtime_ns": mtime_ns,
+                    "inode": inode,
                     "format": audio_path.suffix[1:],
-                    "hash": file_hash
+                    "hash": file_hash,
+                    "genre": audio_path.parent.name
                 },
                 "audio_info": {
                     "duration": float(duration),
-                    "sample_rate": int(sr),
-                    "channels": len(y.shape) if len(y.shape) > 1 else 1,
+                    "sample_rate": int(sample_rate),
+                    "channels": int(channels),
                 },
                 "musical_info": {
-                    "tempo": float(tempo),
+                    "tempo": float(np.atleast_1d(tempo)[0]),
                     "beat_frames": beats.tolist() if len(beats) > 0 else [],
-                    "estimated_key": self._estimate_key(y, sr)
+                    "beat_sample_rate": int(rhythm_sr),
+                    "estimated_key": key.tonic if key else None,
+                    "key_mode": key.mode if key else None,
+                    "key_confidence": key.confidence if key else 0.0
                 },
                 "tags": tags,
                 "processing_info": {
@@ -100,10 +145,8 @@ class MetadataProcessor:
                 }
             }
             
-            # Save individual metadata file
-            metadata_file = self.metadata_dir / f"{audio_path.stem}_metadata.json"
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=4)
+            # Index the track in one transaction
+            self.index.upsert(self.convert_to_serializable(metadata))
                 
             print(f"Processed metadata for: {audio_path.name}")
             return metadata
@@ -119,21 +162,19 @@ class MetadataProcessor:
                 "error": str(e)
             }
     
-    def _estimate_key(self, y, sr) -> Optional[str]:
-        """Estimate musical key of the audio"""
+    def _estimate_key(self, y, sr, audio_path: Optional[Path] = None) -> Optional[KeyEstimate]:
+        """Estimate musical key of the audio; None with a warning if it cannot be estimated"""
         try:
-            chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-            key_indices = np.mean(chroma, axis=1)
-            key_index = np.argmax(key_indices)
-            keys = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-            return keys[key_index]
-        except:
+            return self.key_estimator.estimate(y, sr)
+        except Exception as e:
+            name = audio_path.name if audio_path else "audio"
+            print(f"Warning: Could not estimate key of {name}: {e}")
             return None
 
     def get_state(self) -> Dict[str, Any]:
         """Get current processing state"""
         return {
-            "total_files_processed": len(list(self.metadata_dir.glob("*.json"))),
+            "total_files_processed": len(self.index),
             "last_update": datetime.now().isoformat()
         }
         
@@ -153,15 +194,18 @@ class MetadataProcessor:
 
     def process_audio_file(self, audio_path: Path, genre: str) -> TrackMetadata:
         """Extract audio features and metadata from a single track"""
-        # Load audio file with a standard sample rate
-        y, sr = librosa.load(audio_path, sr=22050)  # Fixed sample rate for consistency
+        # Load audio file at its native rate; tempo and key use the plan's rates
+        y, sr = load_audio(audio_path, sr=None, store=self.audio_store)
+        resampler = Resampler(y, sr, audio_path, self.audio_store)
+        rhythm_sr = self.analysis_plan.rate("rhythm", sr)
+        harmonic_sr = self.analysis_plan.rate("harmonic", sr)
         
         # Extract basic metadata
         duration = float(librosa.get_duration(y=y, sr=sr))
         
         # Extract musical features
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        key = self.estimate_key(y, sr)
+        tempo, _ = librosa.beat.beat_track(y=resampler.at(rhythm_sr), sr=rhythm_sr)
+        key = self._estimate_key(resampler.at(harmonic_sr), harmonic_sr, audio_path)
         
         # Extract audio characteristics
         mean_amplitude = float(np.mean(np.abs(y)))
@@ -178,59 +222,46 @@ class MetadataProcessor:
             title=audio_path.stem,
             duration=duration,
             sample_rate=int(sr),
-            tempo=float(tempo),
-            key=key,
+            tempo=float(np.atleast_1d(tempo)[0]),
+            key=key.tonic if key else None,
             mean_amplitude=mean_amplitude,
             rms_energy=rms_energy,
             zero_crossing_rate=zero_crossing_rate,
             spectral_centroid=float(np.mean(spectral_centroids)),
-            spectral_bandwidth=float(np.mean(spectral_bandwidth))
+            spectral_bandwidth=float(np.mean(spectral_bandwidth)),
+            key_mode=key.mode if key else None,
+            key_confidence=key.confidence if key else 0.0
         )
     
     def process_all_tracks(self) -> Dict[str, Any]:
-        """Process all downloaded tracks and generate metadata"""
-        metadata = {
-            "tracks": [],
-            "statistics": {
-                "total_tracks": 0,
-                "total_duration": 0,
-                "average_tempo": 0,
-                "genre_distribution": {}
-            }
-        }
-        
-        all_tempos = []
-        
+        """
+        Index downloaded tracks that are new or changed, then build the
+        dataset metadata from the index
+        """
         # Process each genre directory
         for genre_dir in self.downloads_dir.iterdir():
             if not genre_dir.is_dir():
                 continue
                 
             print(f"\nProcessing {genre_dir.name} tracks...")
-            genre_count = 0
             
-            # Process each audio file in the genre directory
+            # Only tracks missing from the index or changed since are decoded;
+            # files are only read to hash them when their stat signature changed
             for audio_file in genre_dir.glob("*.mp3"):
-                try:
-                    track_metadata = self.process_audio_file(audio_file, genre_dir.name)
-                    metadata["tracks"].append(asdict(track_metadata))
-                    print(f"Processed: {audio_file.name}")
-                    
-                    # Update statistics
-                    metadata["statistics"]["total_duration"] += track_metadata.duration
-                    all_tempos.append(track_metadata.tempo)
-                    genre_count += 1
-                    
-                except Exception as e:
-                    print(f"Error processing {audio_file.name}: {str(e)}")
-            
-            metadata["statistics"]["genre_distribution"][genre_dir.name] = genre_count
+                signature = stat_signature(audio_file)
+                if self.index.has_signature(str(audio_file), signature):
+                    continue
+                if self.index.is_current(str(audio_file), self._hash_file(audio_file)):
+                    # Touched or copied back without a content change
+                    self.index.set_signature(str(audio_file), signature)
+                    continue
+                self.process_file(audio_file)
+        
+        metadata = {
+            "tracks": self.index.query(),
+            "statistics": self.index.summary()
+        }
         
-        # Calculate final statistics
-        metadata["statistics"]["total_tracks"] = len(metadata["tracks"])
-        if all_tempos:
-            metadata["statistics"]["average_tempo"] = float(np.mean(all_tempos))
-            
         # Convert all numpy types to Python native types
         metadata = self.convert_to_serializable(metadata)
         
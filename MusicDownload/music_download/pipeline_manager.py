@@ -2,34 +2,106 @@
 # pipeline_manager.py
 
 import os
-import json
 import time
-import hashlib
+import pickle
 from pathlib import Path
 from typing import Dict, Any, Optional
 import shutil
-from tqdm import tqdm
 from datetime import datetime
 import logging
-from dataclasses import dataclass
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait
+)
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import threading
+from .state_store import FileState, StateStore
+from .fingerprint import FileFingerprinter, content_hash, stat_signature
+from .hashing import HashService
+from .progress import ProgressTracker, audio_seconds
+from .scheduler import AdaptiveScheduler, estimate_decoded_bytes
+from .feature_cache import DEFAULT_CACHE_LOCATION, FeatureCache
 
-@dataclass
-class FileState:
-    hash: str
-    last_processed: float
-    features_extracted: bool
-    standardized: bool
-    validated: bool
-    metadata_extracted: bool
+# Phase names used by callers mapped to FileState fields
+PHASE_FIELDS = {
+    "features": "features_extracted",
+    "standardized": "standardized",
+    "validated": "validated",
+    "validation": "validated",
+    "metadata": "metadata_extracted"
+}
+
+EXECUTOR_BACKENDS = ("thread", "process", "hybrid")
+
+# Consecutive process pool restarts, with no file completed in between,
+# after which a batch falls back to threads
+MAX_POOL_RESTARTS = 3
+
+# Processor and hash service owned by a worker process, set once by _init_worker
+_worker_processor = None
+_worker_hash_service = None
+
+def _init_worker(processor: Any, hash_service: HashService):
+    """Process pool initializer: keep one processor per worker process"""
+    global _worker_processor, _worker_hash_service
+    _worker_processor = processor
+    _worker_hash_service = hash_service
+
+def _worker_process_file(file_path: Path, output_path: Optional[Path],
+                         state_hash: Optional[str], phase_done: bool,
+                         fingerprint: Optional[tuple], sample_threshold: Optional[int]):
+    """
+    Run the worker's processor on one file inside a worker process
+
+    `fingerprint` is the parent's (stat signature, hash) for the file, if
+    known; the hash is reused as long as the signature still matches.
+
+    Returns (status, file hash, stat signature, error, latency, audio
+    seconds) where status is "processed", "skipped", "missing" or "error".
+    State is never written here; the parent records the result.
+    """
+    try:
+        if not file_path.exists():
+            return "missing", None, None, None, 0.0, 0.0
+        signature = stat_signature(file_path)
+        if fingerprint is not None and fingerprint[0] == signature:
+            digest = fingerprint[1]
+        else:
+            digest = content_hash(file_path, sample_threshold, _worker_hash_service)
+        if phase_done and digest == state_hash:
+            return "skipped", digest, signature, None, 0.0, 0.0
+        start_time = time.time()
+        if output_path:
+            _worker_processor.process_file(file_path, output_path)
+        else:
+            _worker_processor.process_file(file_path)
+        latency = time.time() - start_time
+        after = stat_signature(file_path)
+        if after != signature:
+            digest, signature = content_hash(file_path, sample_threshold, _worker_hash_service), after
+        return "processed", digest, signature, None, latency, audio_seconds(file_path)
+    except Exception as e:
+        return "error", None, None, str(e), 0.0, 0.0
 
 class PipelineManager:
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, fast_hash_threshold: Optional[int] = None,
+                 hash_service: Optional[HashService] = None,
+                 instance: Optional[str] = None,
+                 feature_cache: Optional[FeatureCache] = None):
         self.project_root = project_root
         self.dataset_dir = project_root / "dataset"
         self.state_file = project_root / "pipeline_state.json"
+        self.state_db = project_root / "pipeline_state.db"
         self.temp_dir = project_root / "temp"
+        # Kept outside temp_dir so cached features survive across runs; the
+        # default is the same directory OptimizedPipeline uses
+        self.feature_cache = feature_cache or FeatureCache(project_root / DEFAULT_CACHE_LOCATION)
+        self.instance = instance
+        canonical_db = self.state_db
+        if instance is not None:
+            # Parallel instances (shards, queue workers) write their own
+            # state; merge_shards combines them
+            self.state_db = project_root / f"pipeline_state.{instance}.db"
         
         # Create directory structure
         self.dataset_dir.mkdir(parents=True, exist_ok=True)
@@ -38,20 +110,32 @@ class PipelineManager:
         # Setup logging
         self._setup_logging()
         
-        # Initialize state with validation
-        state = self._load_state()
-        if not self._validate_state(state):
-            self.logger.warning("Invalid state detected, starting fresh")
-            state = {}
-        self.state = state
+        # Initialize state store, importing the legacy JSON state once
+        self.state = StateStore(self.state_db)
+        migrated = self.state.migrate_from_json(self.state_file)
+        if migrated:
+            self.logger.info(f"Migrated {migrated} entries from {self.state_file.name}")
+        if instance is not None and canonical_db.exists():
+            # Start from the merged state so finished work is not redone
+            self.state.merge_from(canonical_db)
+        
+        # Hashes are only recomputed when a file's (size, mtime, inode) changes
+        self.fingerprints = FileFingerprinter(
+            self.state,
+            sample_threshold=fast_hash_threshold,
+            hash_service=hash_service
+        )
         
         # Thread-safe progress tracking
+        self._state_lock = threading.Lock()
         self._progress_lock = threading.Lock()
         self.progress = {
             "total_files": 0,
             "processed_files": 0,
             "current_phase": ""
         }
+        self._tracker: Optional[ProgressTracker] = None
+        self.phase_stats: Dict[str, Dict[str, Any]] = {}
 
     def _setup_logging(self):
         """Setup logging configuration"""
@@ -65,133 +149,319 @@ class PipelineManager:
         )
         self.logger = logging.getLogger(__name__)
 
-    def _load_state(self) -> Dict[str, FileState]:
-        """Load pipeline state from disk"""
-        if self.state_file.exists():
-            with open(self.state_file) as f:
-                state_dict = json.load(f)
-                return {
-                    path: FileState(**state)
-                    for path, state in state_dict.items()
-                }
-        return {}
-
     def _save_state(self):
-        """Save pipeline state to disk"""
-        state_dict = {
-            path: {
-                "hash": state.hash,
-                "last_processed": state.last_processed,
-                "features_extracted": state.features_extracted,
-                "standardized": state.standardized,
-                "validated": state.validated,
-                "metadata_extracted": state.metadata_extracted
-            }
-            for path, state in self.state.items()
-        }
-        
-        with open(self.state_file, 'w') as f:
-            json.dump(state_dict, f, indent=4)
+        """Commit pending state upserts to disk"""
+        self.state.commit()
 
     def needs_processing(self, file_path: Path, phase: str) -> bool:
         """Check if file needs processing for given phase"""
-        if str(file_path) not in self.state:
+        state = self.state.get(str(file_path))
+        if state is None:
             return True
             
-        state = self.state[str(file_path)]
         current_hash = self.get_file_hash(file_path)
         
         if current_hash != state.hash:
             return True
             
-        return not getattr(state, f"{phase}_extracted")
+        return not self._phase_done(state, phase)
+
+    def _phase_done(self, state: FileState, phase: str) -> bool:
+        """Check whether a phase is recorded as done in a file state"""
+        return bool(getattr(state, PHASE_FIELDS.get(phase, f"{phase}_extracted")))
 
     def get_file_hash(self, file_path: Path) -> str:
-        """Calculate file hash"""
-        hasher = hashlib.md5()
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(8192):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+        """Calculate file hash, reusing the fingerprint cache for unchanged files"""
+        return self.fingerprints.get_hash(file_path)
+
+    def _record_result(self, file_path: Path, digest: str, phase: str,
+                       latency: float = 0.0, audio_secs: float = 0.0):
+        """Mark a phase as done for a file and persist the state"""
+        file_key = str(file_path)
+        field = PHASE_FIELDS.get(phase)
+        with self._state_lock:
+            previous = self.state.get(file_key)
+            flags = {
+                name: field == name or (previous is not None and getattr(previous, name))
+                for name in ("features_extracted", "standardized", "validated", "metadata_extracted")
+            }
+            self.state[file_key] = FileState(
+                hash=digest,
+                last_processed=time.time(),
+                **flags
+            )
+        
+        # Update progress
+        with self._progress_lock:
+            self.progress["processed_files"] += 1
+        if self._tracker is not None:
+            self._tracker.record(latency, audio_secs)
 
     def process_file(self, processor: Any, file_path: Path, 
-                    output_path: Optional[Path] = None, phase: str = "") -> bool:
-        """Process a single file with tracking"""
+                    output_path: Optional[Path] = None, phase: str = "",
+                    raise_errors: bool = False) -> bool:
+        """
+        Process a single file with tracking; errors are logged unless
+        raise_errors, which also raises for processors that report a failure
+        by returning a result with an "error" key
+        """
         try:
             if not file_path.exists():
                 self.logger.warning(f"File not found: {file_path}")
                 return False
                 
-            file_key = str(file_path)
             if not self.needs_processing(file_path, phase):
                 self.logger.info(f"Skipping {file_path.name} - already processed")
                 return False
                 
             # Process file
+            start_time = time.time()
             if output_path:
                 result = processor.process_file(file_path, output_path)
             else:
                 result = processor.process_file(file_path)
+            latency = time.time() - start_time
+            if raise_errors and isinstance(result, dict) and "error" in result:
+                # Leave the phase unrecorded so the file is retried
+                raise RuntimeError(result["error"])
             
-            # Update state with FileState dataclass
-            self.state[file_key] = FileState(
-                hash=self.get_file_hash(file_path),
-                last_processed=time.time(),
-                features_extracted=phase == "features" or (file_key in self.state and self.state[file_key].features_extracted),
-                standardized=phase == "standardized" or (file_key in self.state and self.state[file_key].standardized),
-                validated=phase == "validated" or (file_key in self.state and self.state[file_key].validated),
-                metadata_extracted=phase == "metadata" or (file_key in self.state and self.state[file_key].metadata_extracted)
+            self._record_result(
+                file_path, self.get_file_hash(file_path), phase,
+                latency, audio_seconds(file_path)
             )
-            
-            self._save_state()
-            
-            # Update progress
-            with self._progress_lock:
-                self.progress["processed_files"] += 1
-            
             return True
             
         except Exception as e:
+            if raise_errors:
+                raise
             self.logger.error(f"Error processing {file_path.name}: {str(e)}")
             return False
 
+    def _process_file_remote(self, pool: ProcessPoolExecutor, file_path: Path,
+                             output_path: Optional[Path] = None, phase: str = "",
+                             check_state: bool = True):
+        """Submit a file to a worker process and record its result on completion"""
+        state_hash, phase_done = None, False
+        state = self.state.get(str(file_path))
+        if check_state and state is not None:
+            state_hash, phase_done = state.hash, self._phase_done(state, phase)
+        
+        fingerprint = None
+        try:
+            signature = stat_signature(file_path)
+            cached = self.fingerprints.cached_hash(file_path, signature)
+            if cached is not None:
+                fingerprint = (signature, cached)
+        except FileNotFoundError:
+            pass
+        
+        if fingerprint is not None and phase_done and fingerprint[1] == state_hash:
+            # Unchanged file with the phase done: skip without a worker round-trip
+            future = Future()
+            future.set_result(("skipped", state_hash, None, None, 0.0, 0.0))
+        else:
+            future = pool.submit(
+                _worker_process_file, file_path, output_path, state_hash, phase_done,
+                fingerprint, self.fingerprints.sample_threshold
+            )
+        
+        def on_done(f):
+            if f.cancelled() or f.exception() is not None:
+                # A dead worker or pickling error; process_batch reports it
+                return
+            status, new_hash, signature, error, latency, audio_secs = f.result()
+            if signature is not None:
+                self.fingerprints.record(file_path, new_hash, signature)
+            if status == "processed":
+                self._record_result(file_path, new_hash, phase, latency, audio_secs)
+            elif status == "skipped":
+                self.logger.info(f"Skipping {file_path.name} - already processed")
+            elif status == "missing":
+                self.logger.warning(f"File not found: {file_path}")
+            else:
+                self.logger.error(f"Error processing {file_path.name}: {error}")
+        
+        future.add_done_callback(on_done)
+        return future
+
+    def _process_file_hybrid(self, pool: ProcessPoolExecutor, file_path: Path,
+                             output_path: Optional[Path] = None, phase: str = "") -> bool:
+        """Check a file in a parent thread, then run the processor in a worker process"""
+        if not file_path.exists():
+            self.logger.warning(f"File not found: {file_path}")
+            return False
+        if not self.needs_processing(file_path, phase):
+            self.logger.info(f"Skipping {file_path.name} - already processed")
+            return False
+        
+        future = self._process_file_remote(pool, file_path, output_path, phase, check_state=False)
+        status = future.result()[0]
+        return status == "processed"
+
+    def _create_process_pool(self, processor: Any, max_workers: int) -> ProcessPoolExecutor:
+        """Process pool whose workers each hold their own copy of the processor"""
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(processor, self.fingerprints.hash_service)
+        )
+
+    def _submit(self, thread_pool: ThreadPoolExecutor, pool: Optional[ProcessPoolExecutor],
+                processor: Any, file_path: Path, output_path: Optional[Path],
+                phase: str, executor: str) -> Future:
+        """Submit one file to the backend selected for the batch"""
+        if executor == "process":
+            return self._process_file_remote(pool, file_path, output_path, phase)
+        if executor == "hybrid":
+            return thread_pool.submit(
+                self._process_file_hybrid, pool, file_path, output_path, phase
+            )
+        return thread_pool.submit(
+            self.process_file, processor, file_path, output_path, phase
+        )
+
     def process_batch(self, file_paths: list, processor: Any, 
                      output_dir: Optional[Path] = None, 
-                     phase: str = "", max_workers: int = 4):
-        """Process a batch of files with parallel processing"""
+                     phase: str = "", max_workers: Optional[int] = None,
+                     executor: str = "thread", min_workers: int = 1,
+                     autoscale: bool = True):
+        """
+        Process a batch of files with parallel processing
+        
+        At most as many files as there are workers are in flight at any
+        time, so pending work never piles up in memory. With autoscale the
+        worker count is adjusted while the batch runs from CPU utilization,
+        I/O wait and the estimated decoded-audio memory per file, between
+        min_workers and max_workers; otherwise max_workers is used as is.
+        
+        Args:
+            max_workers: Upper bound on workers (2x cores if None)
+            executor: "thread" runs everything in a thread pool; "process"
+                runs each file in a worker process holding its own processor;
+                "hybrid" does hashing and skip checks in parent threads and
+                runs the processor in worker processes. Pipeline state is
+                only ever written by this (parent) process.
+            min_workers: Lower bound on workers when autoscaling
+            autoscale: Adapt the worker count to the machine's load
+        """
+        if executor not in EXECUTOR_BACKENDS:
+            raise ValueError(f"Unknown executor backend: {executor}")
+        
         self.progress["total_files"] = len(file_paths)
         self.progress["processed_files"] = 0
         self.progress["current_phase"] = phase
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for file_path in file_paths:
-                output_path = None
-                if output_dir:
-                    output_path = output_dir / file_path.name
-                    
-                futures.append(
-                    executor.submit(
-                        self.process_file,
-                        processor,
-                        file_path,
-                        output_path,
-                        phase
-                    )
+        # Hash new and changed files concurrently up front
+        self.fingerprints.prefetch(file_paths)
+        
+        self._tracker = ProgressTracker(phase, len(file_paths))
+        
+        if autoscale:
+            scheduler = AdaptiveScheduler(min_workers=min_workers, max_workers=max_workers)
+            pool_size = scheduler.max_workers
+        else:
+            scheduler = None
+            pool_size = max_workers or 4
+        workers = scheduler.workers if scheduler else pool_size
+        
+        pool = None
+        if executor != "thread":
+            try:
+                pickle.dumps(processor)
+            except Exception as e:
+                self.logger.error(f"Processor cannot be sent to worker processes ({e}); using threads")
+                executor = "thread"
+            else:
+                pool = self._create_process_pool(processor, pool_size)
+        
+        results = [False] * len(file_paths)
+        estimated_bytes = 0
+        restarts = 0
+        retry = []
+        retried = set()
+        with ThreadPoolExecutor(max_workers=pool_size) as thread_pool:
+            pending = {}
+            next_index = 0
+            while next_index < len(file_paths) or pending or retry:
+                # Files in flight when a worker died are retried one at a time,
+                # so a file that kills its worker cannot take others down again
+                isolating = retry or any(index in retried for index, _, _ in pending.values())
+                window = 1 if isolating else workers
+                
+                # Keep the submission window filled up to the worker count
+                while (retry or next_index < len(file_paths)) and len(pending) < window:
+                    if retry:
+                        index = retry.pop()
+                    else:
+                        index = next_index
+                        next_index += 1
+                        if scheduler:
+                            estimated_bytes += estimate_decoded_bytes(file_paths[index])
+                    file_path = file_paths[index]
+                    output_path = output_dir / file_path.name if output_dir else None
+                    try:
+                        future = self._submit(
+                            thread_pool, pool, processor, file_path, output_path, phase, executor
+                        )
+                    except Exception as e:
+                        # e.g. the pool broke before a failed future showed it
+                        future = Future()
+                        future.set_exception(e)
+                    pending[future] = (index, pool, executor)
+                
+                done, _ = wait(
+                    pending,
+                    timeout=scheduler.interval if scheduler else None,
+                    return_when=FIRST_COMPLETED
                 )
-            
-            # Monitor progress with tqdm
-            with tqdm(total=len(file_paths), desc=f"Processing {phase}") as pbar:
-                last_processed = 0
-                while not all(f.done() for f in futures):
-                    current_processed = self.progress["processed_files"]
-                    if current_processed > last_processed:
-                        pbar.update(current_processed - last_processed)
-                        last_processed = current_processed
-                    time.sleep(0.1)
-                    
+                for future in done:
+                    index, submitted_pool, backend = pending.pop(future)
+                    file_path = file_paths[index]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        # A worker process died (e.g. killed while decoding), failing
+                        # every file in flight on its pool
+                        if submitted_pool is pool:
+                            pool.shutdown(wait=False, cancel_futures=True)
+                            restarts += 1
+                            if restarts > MAX_POOL_RESTARTS:
+                                self.logger.error(
+                                    "Worker processes keep dying; processing the rest of the batch in threads"
+                                )
+                                pool, executor = None, "thread"
+                            else:
+                                self.logger.warning("Worker process died; restarting the process pool")
+                                pool = self._create_process_pool(processor, pool_size)
+                        if index not in retried:
+                            retried.add(index)
+                            retry.append(index)
+                            continue
+                        self.logger.error(f"Error processing {file_path.name}: {e}")
+                        results[index] = False
+                    except Exception as e:
+                        self.logger.error(f"Error processing {file_path.name}: {e}")
+                        results[index] = False
+                    else:
+                        results[index] = result[0] == "processed" if backend == "process" else result
+                        if submitted_pool is pool:
+                            restarts = 0
+                    self._tracker.advance()
+                
+                if scheduler:
+                    workers = scheduler.update(estimated_bytes // max(next_index, 1))
+        
+        if pool is not None:
+            pool.shutdown()
+        
+        self.phase_stats[phase] = self._tracker.close()
+        self.phase_stats[phase]["workers"] = scheduler.workers if scheduler else pool_size
+        self.phase_stats[phase]["peak_workers"] = scheduler.peak_workers if scheduler else pool_size
+        self._tracker = None
+        
         self._save_state()
-        return [f.result() for f in futures]
+        return results
 
     def clean_temp_files(self):
         """Clean temporary files"""
@@ -199,39 +469,16 @@ class PipelineManager:
             shutil.rmtree(self.temp_dir)
             self.temp_dir.mkdir()
 
-    def get_cached_features(self, file_path: Path) -> Optional[Dict]:
-        """Get cached features if available"""
-        cache_path = self.temp_dir / f"{file_path.stem}_features.json"
-        if cache_path.exists():
-            with open(cache_path) as f:
-                return json.load(f)
-        return None
-
-    def cache_features(self, file_path: Path, features: Dict):
-        """Cache extracted features"""
-        cache_path = self.temp_dir / f"{file_path.stem}_features.json"
-        with open(cache_path, 'w') as f:
-            json.dump(features, f)
-
-    def _validate_state(self, state: Dict[str, Any]) -> bool:
-        """Validate state data"""
-        required_fields = {'hash', 'last_processed', 'features_extracted', 
-                         'standardized', 'validated', 'metadata_extracted'}
-        try:
-            for file_state in state.values():
-                if not all(hasattr(file_state, field) for field in required_fields):
-                    return False
-            return True
-        except:
-            return False
+    def get_cached_features(self, file_path: Path, version: str = "") -> Optional[Dict]:
+        """Get cached features of a file's current content for an extractor version"""
+        key = FeatureCache.make_key(self.get_file_hash(file_path), version)
+        return self.feature_cache.get(key)
+
+    def cache_features(self, file_path: Path, features: Dict, version: str = ""):
+        """Cache extracted features under the file's content hash"""
+        key = FeatureCache.make_key(self.get_file_hash(file_path), version)
+        self.feature_cache.put(key, features)
 
     def get_processing_stats(self) -> Dict[str, Any]:
         """Get processing statistics"""
-        stats = {
-            "total_files": len(self.state),
-            "features_extracted": sum(1 for s in self.state.values() if s.features_extracted),
-            "standardized": sum(1 for s in self.state.values() if s.standardized),
-            "validated": sum(1 for s in self.state.values() if s.validated),
-            "metadata_extracted": sum(1 for s in self.state.values() if s.metadata_extracted)
-        }
-        return stats
\ No newline at end of file
+        return self.state.count_by_phase()
\ No newline at end of file
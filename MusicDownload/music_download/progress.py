@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# progress.py
+
+import time
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Optional
+from tqdm import tqdm
+from .audio_probe import probe_audio
+
+def audio_seconds(file_path: Path) -> float:
+    """Duration of a file from its headers, 0 if unknown"""
+    try:
+        return probe_audio(file_path).duration
+    except Exception:
+        return 0.0
+
+class ProgressTracker:
+    """
+    Completion-driven progress and throughput for one pipeline phase.
+
+    Callers report every finished task through advance() and every
+    processed file's latency and audio duration through record(); the
+    progress bar shows live files/sec, audio-seconds/sec and ETA. The
+    total may be unknown (None) for streaming stages, in which case no
+    ETA is given.
+    """
+
+    def __init__(self, phase: str, total: Optional[int] = None,
+                 position: Optional[int] = None):
+        self.phase = phase
+        self.total = total
+        self.start_time = time.time()
+        self.completed = 0
+        self.processed = 0
+        self.audio_seconds = 0.0
+        self.latencies = []
+        self._lock = threading.Lock()
+        self.pbar = tqdm(total=total, desc=f"Processing {phase}", position=position)
+
+    def record(self, latency: float, audio_seconds: float = 0.0):
+        """Record a processed file"""
+        with self._lock:
+            self.processed += 1
+            self.latencies.append(latency)
+            self.audio_seconds += audio_seconds
+
+    def advance(self, n: int = 1):
+        """Mark tasks as finished (processed, skipped or failed)"""
+        with self._lock:
+            self.completed += n
+            rates = self._rates()
+        postfix = {
+            "files/s": f"{rates['files_per_sec']:.2f}",
+            "audio s/s": f"{rates['audio_seconds_per_sec']:.1f}"
+        }
+        if rates['eta_seconds'] is not None:
+            postfix["eta"] = f"{rates['eta_seconds']:.0f}s"
+        self.pbar.set_postfix(postfix, refresh=False)
+        self.pbar.update(n)
+
+    def _rates(self) -> Dict[str, Any]:
+        # Constant time, as it runs on every completion
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        files_per_sec = self.completed / elapsed
+        return {
+            "total_files": self.total,
+            "completed_files": self.completed,
+            "processed_files": self.processed,
+            "duration": elapsed,
+            "files_per_sec": files_per_sec,
+            "audio_seconds": self.audio_seconds,
+            "audio_seconds_per_sec": self.audio_seconds / elapsed,
+            "eta_seconds": self._eta(files_per_sec)
+        }
+
+    def _snapshot(self) -> Dict[str, Any]:
+        snapshot = self._rates()
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        snapshot["latency_p50"] = float(np.percentile(latencies, 50))
+        snapshot["latency_p95"] = float(np.percentile(latencies, 95))
+        return snapshot
+
+    def _eta(self, files_per_sec: float) -> Optional[float]:
+        if self.total is None:
+            return None
+        remaining = self.total - self.completed
+        return remaining / files_per_sec if files_per_sec > 0 else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current throughput and latency statistics"""
+        with self._lock:
+            return self._snapshot()
+
+    def close(self) -> Dict[str, Any]:
+        """Close the progress bar and return the final statistics"""
+        self.pbar.close()
+        return self.snapshot()
@@ -4,8 +4,11 @@
 import librosa
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
-import datetime
+from typing import Dict, List, Sequence, Tuple, Any, Optional
+from datetime import datetime
+from .audio_store import AudioStore, load_audio
+from .audio_probe import probe_audio
+from .decoders import stream_audio
 
 class AudioQualityValidator:
     def __init__(self, 
@@ -13,12 +16,27 @@ class AudioQualityValidator:
                  min_sample_rate: int = 44100,
                  min_bit_depth: int = 16,
                  min_dynamic_range: float = 10.0,
-                 max_clipping_ratio: float = 0.01):
+                 max_clipping_ratio: float = 0.01,
+                 audio_store: Optional[AudioStore] = None,
+                 streaming: bool = False,
+                 header_check: bool = True,
+                 block_size: int = 262144,
+                 frame_length: int = 2048,
+                 hop_length: int = 512,
+                 backends: Optional[Sequence[str]] = None):
         self.min_duration = min_duration
         self.min_sample_rate = min_sample_rate
         self.min_bit_depth = min_bit_depth
         self.min_dynamic_range = min_dynamic_range
         self.max_clipping_ratio = max_clipping_ratio
+        self.audio_store = audio_store
+        self.streaming = streaming
+        self.header_check = header_check
+        self.block_size = block_size
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # Decoder backend order for streaming, the same one AudioStore uses
+        self.backends = backends
     
     def convert_to_serializable(self, obj):
         """Convert numpy types to Python native types"""
@@ -34,48 +52,51 @@ class AudioQualityValidator:
             return [self.convert_to_serializable(item) for item in obj]
         return obj
         
-    def check_audio_quality(self, audio_path: Path) -> Tuple[bool, List[str], Dict[str, float]]:
+    def check_audio_quality(self, audio_path: Path,
+                            raise_errors: bool = False) -> Tuple[bool, List[str], Dict[str, float]]:
         """
-        Validate audio file quality
+        Validate audio file quality; files that cannot be analyzed fail with
+        an issue unless raise_errors
         Returns: (passed, list of issues, metrics)
         """
+        # Cheap header checks reject files before any decode
+        if self.header_check:
+            passed, issues, metrics = self.check_headers(audio_path)
+            if not passed:
+                return passed, issues, metrics
+        
         issues = []
         metrics = {}
         
         try:
-            # Load audio file
-            y, sr = librosa.load(audio_path, sr=None)
+            if self.streaming:
+                metrics = self.compute_metrics_streaming(audio_path)
+            else:
+                metrics = self.compute_metrics(audio_path)
             
             # Check duration
-            duration = librosa.get_duration(y=y, sr=sr)
-            metrics['duration'] = float(duration)
+            duration = metrics['duration']
             if duration < self.min_duration:
                 issues.append(f"Duration too short: {duration:.1f}s < {self.min_duration}s")
             
             # Check sample rate
-            metrics['sample_rate'] = int(sr)
+            sr = metrics['sample_rate']
             if sr < self.min_sample_rate:
                 issues.append(f"Sample rate too low: {sr} < {self.min_sample_rate}")
             
             # Check for clipping
-            clipping_samples = np.sum(np.abs(y) >= 0.99)
-            clipping_ratio = float(clipping_samples / len(y))
-            metrics['clipping_ratio'] = clipping_ratio
+            clipping_ratio = metrics['clipping_ratio']
             if clipping_ratio > self.max_clipping_ratio:
                 issues.append(f"Excessive clipping: {clipping_ratio*100:.1f}% of samples")
             
             # Check dynamic range
-            dynamic_range = float(20 * np.log10(np.max(np.abs(y)) / (np.mean(np.abs(y)) + 1e-6)))
-            metrics['dynamic_range'] = dynamic_range
+            dynamic_range = metrics['dynamic_range']
             if dynamic_range < self.min_dynamic_range:
                 issues.append(f"Low dynamic range: {dynamic_range:.1f}dB")
             
-            # Calculate RMS energy
-            rms = librosa.feature.rms(y=y)[0]
-            metrics['rms_mean'] = float(np.mean(rms))
-            metrics['rms_std'] = float(np.std(rms))
-            
         except Exception as e:
+            if raise_errors:
+                raise
             issues.append(f"Error analyzing file: {str(e)}")
         
         # Convert all metrics to serializable types
@@ -83,13 +104,142 @@ class AudioQualityValidator:
         
         return len(issues) == 0, issues, metrics
     
+    def check_headers(self, audio_path: Path) -> Tuple[bool, List[str], Dict[str, float]]:
+        """
+        Check duration and sample rate from file headers without decoding
+        Returns: (passed, list of issues, metrics)
+        """
+        issues = []
+        
+        try:
+            info = probe_audio(audio_path)
+        except Exception:
+            # Unreadable headers are left for the decoding checks to report
+            return True, [], {}
+        
+        metrics = {
+            'duration': info.duration,
+            'sample_rate': info.sample_rate,
+            'channels': info.channels,
+            'bitrate': info.bitrate
+        }
+        
+        if info.duration < self.min_duration:
+            issues.append(f"Duration too short: {info.duration:.1f}s < {self.min_duration}s")
+        if info.sample_rate < self.min_sample_rate:
+            issues.append(f"Sample rate too low: {info.sample_rate} < {self.min_sample_rate}")
+        
+        return len(issues) == 0, issues, metrics
+    
+    def triage_files(self, file_paths: List[Path]) -> Tuple[List[Path], List[Path]]:
+        """
+        Split files into (passed, rejected) using header checks only
+        """
+        passed, rejected = [], []
+        for file_path in file_paths:
+            ok, issues, _ = self.check_headers(file_path)
+            if ok:
+                passed.append(file_path)
+            else:
+                rejected.append(file_path)
+                print(f"✗ Rejected {file_path.name}: {'; '.join(issues)}")
+        return passed, rejected
+    
+    def compute_metrics(self, audio_path: Path) -> Dict[str, float]:
+        """Compute quality metrics from the fully decoded file"""
+        metrics = {}
+        
+        # Load audio file
+        y, sr = load_audio(audio_path, sr=None, store=self.audio_store)
+        
+        metrics['duration'] = float(librosa.get_duration(y=y, sr=sr))
+        metrics['sample_rate'] = int(sr)
+        
+        # Clipping
+        clipping_samples = np.sum(np.abs(y) >= 0.99)
+        metrics['clipping_ratio'] = float(clipping_samples / len(y))
+        
+        # Dynamic range
+        metrics['dynamic_range'] = float(20 * np.log10(np.max(np.abs(y)) / (np.mean(np.abs(y)) + 1e-6)))
+        
+        # RMS energy
+        rms = librosa.feature.rms(y=y, frame_length=self.frame_length, hop_length=self.hop_length)[0]
+        metrics['rms_mean'] = float(np.mean(rms))
+        metrics['rms_std'] = float(np.std(rms))
+        
+        return metrics
+    
+    def compute_metrics_streaming(self, audio_path: Path) -> Dict[str, float]:
+        """
+        Compute quality metrics block by block with bounded memory
+        
+        Reads fixed-size blocks from a block-wise decoder and accumulates clip counts, peak, sum of
+        |x| and frame RMS moments. Frames are centered the same way as
+        librosa.feature.rms, so results match compute_metrics.
+        """
+        half_frame = self.frame_length // 2
+        n_samples = 0
+        clip_count = 0
+        peak = 0.0
+        abs_sum = 0.0
+        n_frames = 0
+        rms_sum = 0.0
+        rms_sq_sum = 0.0
+        
+        # Carry over samples that belong to frames spanning two blocks
+        carry = np.zeros(half_frame, dtype=np.float32)
+        
+        def consume_frames(buffer: np.ndarray) -> np.ndarray:
+            nonlocal n_frames, rms_sum, rms_sq_sum
+            if len(buffer) < self.frame_length:
+                return buffer
+            rms = librosa.feature.rms(
+                y=buffer,
+                frame_length=self.frame_length,
+                hop_length=self.hop_length,
+                center=False
+            )[0].astype(np.float64)
+            n_frames += len(rms)
+            rms_sum += float(np.sum(rms))
+            rms_sq_sum += float(np.sum(rms ** 2))
+            return buffer[len(rms) * self.hop_length:]
+        
+        sr, blocks = stream_audio(audio_path, self.block_size, self.backends)
+        for block in blocks:
+            # Downmix the same way decode_audio(mono=True) does
+            y = np.mean(block, axis=1) if block.shape[1] > 1 else block[:, 0]
+            y_abs = np.abs(y)
+            
+            n_samples += len(y)
+            clip_count += int(np.sum(y_abs >= 0.99))
+            abs_sum += float(np.sum(y_abs, dtype=np.float64))
+            if len(y):
+                peak = max(peak, float(np.max(y_abs)))
+            
+            carry = consume_frames(np.concatenate((carry, y)))
+        
+        if n_samples == 0:
+            raise ValueError("No audio samples decoded")
+        
+        consume_frames(np.concatenate((carry, np.zeros(half_frame, dtype=np.float32))))
+        
+        rms_mean = rms_sum / n_frames
+        return {
+            'duration': float(n_samples / sr),
+            'sample_rate': int(sr),
+            'clipping_ratio': float(clip_count / n_samples),
+            'dynamic_range': float(20 * np.log10(peak / (abs_sum / n_samples + 1e-6))),
+            'rms_mean': float(rms_mean),
+            'rms_std': float(np.sqrt(max(rms_sq_sum / n_frames - rms_mean ** 2, 0.0)))
+        }
+    
     def process_file(self, audio_path: Path) -> Dict[str, Any]:
         """
         Process and validate a single audio file
         Returns validation results and metrics
         """
         try:
-            passed, issues, metrics = self.check_audio_quality(audio_path)
+            passed, issues, metrics = self.check_audio_quality(audio_path, raise_errors=True)
             
             validation_result = {
                 "passed": passed,
@@ -116,7 +266,8 @@ class AudioQualityValidator:
                 "issues": [error_msg],
                 "metrics": {},
                 "timestamp": datetime.now().isoformat(),
-                "filename": audio_path.name
+                "filename": audio_path.name,
+                "error": str(e)
             }
     
     def validate_dataset(self, downloads_dir: Path) -> Dict[str, Dict]:
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# scheduler.py
+
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+from .audio_probe import probe_audio
+
+# Decoded samples are float32; processors typically hold a resampled or
+# mono copy next to the decode, so budget for twice the raw size
+BYTES_PER_SAMPLE = 4
+DECODE_OVERHEAD = 2.0
+
+def estimate_decoded_bytes(file_path: Path) -> int:
+    """Approximate memory needed to hold a file's decoded audio, 0 if unknown"""
+    try:
+        info = probe_audio(file_path)
+    except Exception:
+        return 0
+    samples = info.duration * info.sample_rate * max(info.channels, 1)
+    return int(samples * BYTES_PER_SAMPLE * DECODE_OVERHEAD)
+
+class SystemMonitor:
+    """
+    Machine-wide CPU utilization, I/O wait and available memory.
+
+    Reads /proc on Linux; elsewhere CPU utilization falls back to the
+    load average and I/O wait and available memory are unknown.
+    """
+
+    def __init__(self):
+        self._last = self._read_cpu_times()
+
+    def _read_cpu_times(self) -> Optional[Tuple[int, int, int]]:
+        """(busy, iowait, total) jiffies since boot"""
+        try:
+            with open("/proc/stat") as f:
+                fields = [int(x) for x in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        idle, iowait = fields[3], fields[4]
+        total = sum(fields[:8])
+        return total - idle - iowait, iowait, total
+
+    def sample(self) -> Tuple[float, float]:
+        """(cpu utilization, iowait fraction) since the previous sample, 0..1"""
+        current = self._read_cpu_times()
+        if current is None or self._last is None:
+            try:
+                load = os.getloadavg()[0] / (os.cpu_count() or 1)
+            except OSError:
+                load = 0.0
+            return min(load, 1.0), 0.0
+
+        busy = current[0] - self._last[0]
+        iowait = current[1] - self._last[1]
+        total = current[2] - self._last[2]
+        self._last = current
+        if total <= 0:
+            return 0.0, 0.0
+        return busy / total, iowait / total
+
+    def available_memory(self) -> Optional[int]:
+        """Available memory in bytes, None if unknown"""
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+class AdaptiveScheduler:
+    """
+    Worker count controller for batch phases.
+
+    Starts at one worker per core and re-evaluates every interval: the
+    count grows while the CPUs are under-used or waiting on I/O, shrinks
+    when the CPUs are saturated by more workers than cores, and is always
+    capped so the estimated decoded audio of all in-flight tasks fits in
+    a fraction of available memory.
+    """
+
+    def __init__(self, min_workers: int = 1, max_workers: Optional[int] = None,
+                 memory_fraction: float = 0.5, interval: float = 1.0,
+                 cpu_low: float = 0.7, cpu_high: float = 0.9, iowait_high: float = 0.2,
+                 monitor: Optional[SystemMonitor] = None):
+        """
+        Initialize scheduler
+
+        Args:
+            min_workers: Lower bound on the worker count
+            max_workers: Upper bound on the worker count (2x cores if None)
+            memory_fraction: Share of available memory in-flight tasks may use
+            interval: Seconds between adjustments
+            cpu_low: Utilization below which workers are added
+            cpu_high: Utilization above which workers are removed
+            iowait_high: I/O wait share above which workers are added
+            monitor: System monitor (a new one if None)
+        """
+        self.cpu_count = os.cpu_count() or 1
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers or 2 * self.cpu_count)
+        self.memory_fraction = memory_fraction
+        self.interval = interval
+        self.cpu_low = cpu_low
+        self.cpu_high = cpu_high
+        self.iowait_high = iowait_high
+        self.monitor = monitor or SystemMonitor()
+        self.workers = self._clamp(self.cpu_count)
+        self.peak_workers = self.workers
+        self._last_adjust = time.time()
+
+    def _clamp(self, workers: int, bytes_per_task: int = 0) -> int:
+        upper = self.max_workers
+        available = self.monitor.available_memory()
+        if bytes_per_task > 0 and available is not None:
+            upper = min(upper, int(available * self.memory_fraction // bytes_per_task))
+        return max(self.min_workers, min(workers, upper))
+
+    def update(self, bytes_per_task: int = 0) -> int:
+        """
+        Re-evaluate the worker count if the interval has passed
+        Returns the current worker count
+        """
+        now = time.time()
+        if now - self._last_adjust < self.interval:
+            return self.workers
+        self._last_adjust = now
+
+        cpu, iowait = self.monitor.sample()
+        workers = self.workers
+        if cpu >= self.cpu_high and workers > self.cpu_count:
+            workers -= 1
+        elif cpu < self.cpu_low or iowait >= self.iowait_high:
+            workers += 1
+
+        self.workers = self._clamp(workers, bytes_per_task)
+        self.peak_workers = max(self.peak_workers, self.workers)
+        return self.workers
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# sharding.py
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from .state_store import StateStore
+from .feature_store import FeatureStore
+from .metadata_index import MetadataIndex
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse an "i/N" shard spec, 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard spec '{spec}', expected i/N")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec '{spec}', need 0 <= i < N")
+    return index, count
+
+def shard_suffix(shard: Tuple[int, int]) -> str:
+    """File name suffix of a shard's outputs"""
+    return f"shard-{shard[0]}-of-{shard[1]}"
+
+def shard_of(digest: str, count: int) -> int:
+    """Shard a file belongs to, from its content hash"""
+    return int(digest[:16], 16) % count
+
+def merge_shards(project_root: Path, features_dir: Path,
+                 metadata_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Combine the outputs of all shard runs and queue workers into the
+    canonical outputs
+
+    Their state databases (pipeline_state.<instance>.db) are merged into
+    pipeline_state.db (the most recently processed state of a file wins)
+    and exported to pipeline_state.json; their feature stores
+    (features.<instance>.h5) are merged into features.h5 and, given
+    metadata_dir, their metadata indexes (metadata_index.<instance>.db)
+    into metadata_index.db.
+    """
+    project_root = Path(project_root)
+    features_dir = Path(features_dir)
+
+    state_dbs = sorted(project_root.glob("pipeline_state.*.db"))
+    store = StateStore(project_root / "pipeline_state.db")
+    try:
+        for db_path in state_dbs:
+            read = store.merge_from(db_path)
+            print(f"Merged {read} file states from {db_path.name}")
+        store.export_json(project_root / "pipeline_state.json")
+        total_files = len(store)
+    finally:
+        store.close()
+
+    feature_files = sorted(features_dir.glob("features.*.h5"))
+    feature_store = FeatureStore(features_dir / "features.h5")
+    for features_file in feature_files:
+        read = feature_store.merge_from(features_file)
+        print(f"Merged {read} tracks from {features_file.name}")
+
+    metadata_dbs = sorted(Path(metadata_dir).glob("metadata_index.*.db")) if metadata_dir else []
+    tracks = 0
+    if metadata_dir:
+        index = MetadataIndex(Path(metadata_dir) / "metadata_index.db")
+        try:
+            for db_path in metadata_dbs:
+                read = index.merge_from(db_path)
+                print(f"Merged {read} track metadata entries from {db_path.name}")
+            tracks = len(index)
+        finally:
+            index.close()
+
+    return {
+        "state_files": len(state_dbs),
+        "total_files": total_files,
+        "feature_files": len(feature_files),
+        "features": len(feature_store),
+        "metadata_files": len(metadata_dbs),
+        "tracks": tracks
+    }
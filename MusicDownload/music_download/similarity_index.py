@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# similarity_index.py
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from scipy.spatial import cKDTree
+from .feature_store import FeatureStore
+
+SCALAR_FEATURES = [
+    "spectral_features.spectral_centroid_mean",
+    "spectral_features.spectral_bandwidth_mean",
+    "spectral_features.spectral_rolloff_mean",
+    "temporal_features.tempo",
+    "energy_features.rms_energy_mean",
+    "energy_features.zero_crossing_rate_mean"
+]
+CHROMA_FEATURE = "harmonic_features.key_strength"
+CHROMA_BINS = 12
+
+class SimilarityIndex:
+    """
+    Nearest-neighbour index over track feature vectors.
+
+    Each vector holds the spectral means, tempo and energy features and
+    the 12 key_strength chroma bins, standardized per dimension over the
+    indexed tracks. Queries run either as an exact vectorized scan
+    ("exact") or against a k-d tree ("tree"), which returns approximate
+    neighbours when eps > 0. The raw vectors are persisted to an .npz
+    file and updated incrementally from a FeatureStore; the tree is
+    rebuilt lazily after updates.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Initialize similarity index
+
+        Args:
+            path: .npz file holding the index, loaded if it exists
+        """
+        self.path = Path(path)
+        self.dims = SCALAR_FEATURES + [f"{CHROMA_FEATURE}.{i}" for i in range(CHROMA_BINS)]
+        self._lock = threading.RLock()
+        self.keys = np.zeros(0, dtype=object)
+        self.paths = np.zeros(0, dtype=object)
+        self._raw = np.zeros((0, len(self.dims)), dtype=np.float32)
+        self._rows: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._tree: Optional[cKDTree] = None
+        if self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            self.keys = data["keys"].astype(object)
+            self.paths = data["paths"].astype(object)
+            self._raw = data["vectors"]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._invalidate()
+
+    def save(self):
+        """Write the index atomically"""
+        with self._lock:
+            tmp_path = self.path.with_name(f".{self.path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(
+                tmp_path,
+                keys=self.keys.astype(str),
+                paths=self.paths.astype(str),
+                vectors=self._raw
+            )
+            os.replace(tmp_path, self.path)
+
+    def _invalidate(self):
+        self._vectors = None
+        self._tree = None
+
+    def update_from_store(self, store: FeatureStore) -> int:
+        """
+        Add new tracks from a feature store and refresh re-extracted ones
+        Returns the number of added or updated tracks
+        """
+        frame = store.load(SCALAR_FEATURES)
+        if frame.empty:
+            return 0
+        raw = np.full((len(frame), len(self.dims)), np.nan, dtype=np.float32)
+        for i, name in enumerate(SCALAR_FEATURES):
+            if name in frame:
+                raw[:, i] = frame[name].to_numpy(dtype=np.float32)
+        keys = frame.index.to_numpy(dtype=object)
+        try:
+            chroma_keys, chroma = store.load_matrix(CHROMA_FEATURE)
+        except (KeyError, ValueError):
+            chroma_keys, chroma = keys[:0], None
+        if chroma is not None and chroma.shape[1] == CHROMA_BINS and np.array_equal(chroma_keys, keys):
+            raw[:, len(SCALAR_FEATURES):] = chroma
+        paths = frame["path"].to_numpy(dtype=object)
+        return self.add(keys, raw, paths)
+
+    def add(self, keys, vectors: np.ndarray, paths=None) -> int:
+        """Add or replace raw (unstandardized) vectors; returns the number changed"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), len(self.dims))
+        paths = paths if paths is not None else [""] * len(keys)
+        with self._lock:
+            new_keys, new_paths, new_rows = [], [], []
+            changed = 0
+            for key, vector, path in zip(keys, vectors, paths):
+                row = self._rows.get(key)
+                if row is None:
+                    self._rows[key] = len(self.keys) + len(new_keys)
+                    new_keys.append(key)
+                    new_paths.append(path)
+                    new_rows.append(vector)
+                    changed += 1
+                elif not np.array_equal(self._raw[row], vector, equal_nan=True):
+                    self._raw[row] = vector
+                    self.paths[row] = path
+                    changed += 1
+            if new_keys:
+                self.keys = np.concatenate([self.keys, np.array(new_keys, dtype=object)])
+                self.paths = np.concatenate([self.paths, np.array(new_paths, dtype=object)])
+                self._raw = np.vstack([self._raw, np.stack(new_rows)])
+            if changed:
+                self._invalidate()
+        return changed
+
+    def _standardized(self) -> np.ndarray:
+        """Indexed vectors with zero mean and unit variance per dimension, NaN as 0"""
+        if self._vectors is None:
+            self._mean = np.nanmean(self._raw, axis=0) if len(self._raw) else np.zeros(len(self.dims))
+            self._mean = np.nan_to_num(self._mean)
+            std = np.nanstd(self._raw, axis=0) if len(self._raw) else np.ones(len(self.dims))
+            self._std = np.where(np.nan_to_num(std) > 0, np.nan_to_num(std), 1.0)
+            self._vectors = self.standardize(self._raw)
+            self._sq_norms = np.einsum("ij,ij->i", self._vectors, self._vectors)
+        return self._vectors
+
+    def standardize(self, raw: np.ndarray) -> np.ndarray:
+        """Standardize raw vectors with the index's current statistics"""
+        vectors = (np.asarray(raw, dtype=np.float32) - self._mean) / self._std
+        return np.nan_to_num(vectors).astype(np.float32)
+
+    def query(self, query: Union[str, np.ndarray], k: int = 10, mode: str = "exact",
+              eps: float = 0.0) -> List[Tuple[str, str, float]]:
+        """
+        Tracks most similar to a track key or a raw feature vector
+
+        Args:
+            query: Key of an indexed track, or a raw vector of len(dims)
+            k: Number of neighbours; the query track itself is left out
+            mode: "exact" scan or "tree" (k-d tree)
+            eps: Allowed relative error of tree queries (0 is exact)
+
+        Returns:
+            (key, path, distance) of the neighbours, nearest first
+        """
+        with self._lock:
+            vectors = self._standardized()
+            exclude = None
+            if isinstance(query, str):
+                if query not in self._rows:
+                    raise KeyError(f"Track not in index: {query}")
+                exclude = self._rows[query]
+                q = vectors[exclude]
+            else:
+                q = self.standardize(np.asarray(query).reshape(len(self.dims)))
+            wanted = min(k + (exclude is not None), len(vectors))
+            if wanted == 0:
+                return []
+
+            if mode == "tree":
+                if self._tree is None:
+                    self._tree = cKDTree(vectors)
+                distances, rows = self._tree.query(q, k=wanted, eps=eps)
+                distances, rows = np.atleast_1d(distances), np.atleast_1d(rows)
+            elif mode == "exact":
+                sq = self._sq_norms - 2.0 * (vectors @ q) + float(q @ q)
+                rows = np.argpartition(sq, wanted - 1)[:wanted]
+                rows = rows[np.argsort(sq[rows])]
+                distances = np.sqrt(np.maximum(sq[rows], 0.0))
+            else:
+                raise ValueError(f"Unknown query mode: {mode}")
+
+            return [
+                (self.keys[row], self.paths[row], float(distance))
+                for row, distance in zip(rows, distances)
+                if row != exclude
+            ][:k]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# stage_graph.py
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from .progress import ProgressTracker, audio_seconds
+
+_STOP = object()
+
+class Stage:
+    """
+    One step of a streaming pipeline.
+
+    Items are taken from a bounded input queue by a fixed number of worker
+    threads and passed to func. When func returns a truthy value the item
+    is forwarded to every downstream stage, otherwise it stops here. A
+    full downstream queue blocks the forwarding worker, so a slow stage
+    throttles the stages feeding it instead of buffering without limit.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = 32):
+        """
+        Initialize stage
+
+        Args:
+            name: Stage name used for progress and statistics
+            func: Called once per item; a truthy result forwards the item
+            workers: Number of worker threads
+            queue_size: Maximum number of items waiting in the input queue
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.downstream: List["Stage"] = []
+        self.tracker: Optional[ProgressTracker] = None
+        self._threads: List[threading.Thread] = []
+
+    def connect(self, *stages: "Stage") -> "Stage":
+        """Forward items that pass this stage to the given stages"""
+        self.downstream.extend(stages)
+        return self
+
+    def start(self, position: Optional[int] = None):
+        """Start the worker threads"""
+        self.tracker = ProgressTracker(self.name, position=position)
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"{self.name}-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+
+            start_time = time.time()
+            try:
+                forward = self.func(item)
+            except Exception as e:
+                print(f"Error in {self.name} stage for {item}: {str(e)}")
+                forward = False
+
+            if forward:
+                secs = audio_seconds(item) if isinstance(item, Path) else 0.0
+                self.tracker.record(time.time() - start_time, secs)
+                for stage in self.downstream:
+                    stage.queue.put(item)
+            self.tracker.advance()
+
+    def stop(self) -> Dict[str, Any]:
+        """Let the workers drain the queue, wait for them and return statistics"""
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        return self.tracker.close()
+
+class StageGraph:
+    """
+    Stages connected by bounded queues, each with its own worker threads.
+
+    Items submitted to the graph enter the first stage and flow through
+    the connected stages as soon as each one is done with them, so
+    network-bound downloads, validation and feature extraction overlap
+    instead of running one phase after the other.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        """
+        Initialize stage graph
+
+        Args:
+            stages: Stages in topological order; the first one receives
+                submitted items
+        """
+        self.stages = stages
+
+    def start(self):
+        """Start every stage"""
+        for position, stage in enumerate(self.stages):
+            stage.start(position=position)
+
+    def submit(self, item: Any):
+        """Feed an item into the first stage; blocks while its queue is full"""
+        self.stages[0].queue.put(item)
+
+    def close(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait until every submitted item went through the graph
+        Returns per-stage throughput statistics
+        """
+        # Stages are stopped in order, so upstream stages have forwarded
+        # everything before a downstream stage is told to finish
+        return {stage.name: stage.stop() for stage in self.stages}
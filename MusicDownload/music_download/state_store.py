@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# state_store.py
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass, astuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+@dataclass
+class FileState:
+    hash: str
+    last_processed: float
+    features_extracted: bool
+    standardized: bool
+    validated: bool
+    metadata_extracted: bool
+
+PHASE_COLUMNS = ("features_extracted", "standardized", "validated", "metadata_extracted")
+
+class StateStore:
+    """
+    SQLite-backed pipeline state with a dict-like interface.
+
+    Each file is upserted individually and writes are committed in
+    batches. The database runs in WAL mode so readers never block the
+    writer, and every phase flag is indexed.
+    """
+
+    def __init__(self, db_path: Path, commit_every: int = 200):
+        """
+        Initialize state store
+
+        Args:
+            db_path: Path to the SQLite database
+            commit_every: Number of upserts per committed batch
+        """
+        self.db_path = Path(db_path)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_state (
+                    path TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    last_processed REAL NOT NULL,
+                    features_extracted INTEGER NOT NULL DEFAULT 0,
+                    standardized INTEGER NOT NULL DEFAULT 0,
+                    validated INTEGER NOT NULL DEFAULT 0,
+                    metadata_extracted INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            for column in PHASE_COLUMNS:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_file_state_{column} ON file_state ({column})"
+                )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    sampled INTEGER NOT NULL DEFAULT 0,
+                    algorithm TEXT NOT NULL DEFAULT 'md5'
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_index (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(fingerprints)")}
+            if "algorithm" not in columns:
+                self._conn.execute(
+                    "ALTER TABLE fingerprints ADD COLUMN algorithm TEXT NOT NULL DEFAULT 'md5'"
+                )
+            self._conn.commit()
+
+    def _row_to_state(self, row: Tuple) -> FileState:
+        return FileState(
+            hash=row[0],
+            last_processed=row[1],
+            features_extracted=bool(row[2]),
+            standardized=bool(row[3]),
+            validated=bool(row[4]),
+            metadata_extracted=bool(row[5])
+        )
+
+    def get(self, path: str, default: Optional[FileState] = None) -> Optional[FileState]:
+        """Get the state of one file"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash, last_processed, features_extracted, standardized, "
+                "validated, metadata_extracted FROM file_state WHERE path = ?",
+                (path,)
+            ).fetchone()
+        return self._row_to_state(row) if row else default
+
+    def __getitem__(self, path: str) -> FileState:
+        state = self.get(path)
+        if state is None:
+            raise KeyError(path)
+        return state
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM file_state WHERE path = ?", (path,)
+            ).fetchone() is not None
+
+    def __setitem__(self, path: str, state: FileState):
+        self.upsert(path, state)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM file_state").fetchone()[0]
+
+    def upsert(self, path: str, state: FileState):
+        """Insert or replace the state of one file; committed in batches"""
+        self.upsert_many([(path, state)])
+
+    def upsert_many(self, items: List[Tuple[str, FileState]]):
+        """Insert or replace the state of several files"""
+        rows = [
+            (path, s.hash, s.last_processed, int(s.features_extracted), int(s.standardized),
+             int(s.validated), int(s.metadata_extracted))
+            for path, s in items
+        ]
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO file_state (path, hash, last_processed, features_extracted,
+                                        standardized, validated, metadata_extracted)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    hash = excluded.hash,
+                    last_processed = excluded.last_processed,
+                    features_extracted = excluded.features_extracted,
+                    standardized = excluded.standardized,
+                    validated = excluded.validated,
+                    metadata_extracted = excluded.metadata_extracted
+            """, rows)
+            self._pending += len(rows)
+            if self._pending >= self.commit_every:
+                self.commit()
+
+    def commit(self):
+        """Commit pending upserts"""
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def get_fingerprint(self, path: str) -> Optional[Tuple[int, int, int, str, bool, str]]:
+        """Get the recorded (size, mtime_ns, inode, hash, sampled, algorithm) of a file"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, hash, sampled, algorithm FROM fingerprints WHERE path = ?",
+                (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], row[2], row[3], bool(row[4]), row[5]
+
+    def put_fingerprint(self, path: str, size: int, mtime_ns: int, inode: int,
+                        digest: str, sampled: bool, algorithm: str = "md5"):
+        """Record the hash of a file together with its stat signature"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fingerprints "
+                "(path, size, mtime_ns, inode, hash, sampled, algorithm) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, inode, digest, int(sampled), algorithm)
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.commit()
+
+    def indexed_files(self) -> Dict[str, Tuple[int, int]]:
+        """Every file in the watch index with its (size, mtime_ns)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, size, mtime_ns FROM file_index").fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def index_file(self, path: str, size: int, mtime_ns: int):
+        """Add or update a file in the watch index"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_index (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, size, mtime_ns)
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.commit()
+
+    def unindex_file(self, path: str):
+        """Remove a file from the watch index"""
+        with self._lock:
+            self._conn.execute("DELETE FROM file_index WHERE path = ?", (path,))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.commit()
+
+    def items(self) -> Iterator[Tuple[str, FileState]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, hash, last_processed, features_extracted, standardized, "
+                "validated, metadata_extracted FROM file_state"
+            ).fetchall()
+        for row in rows:
+            yield row[0], self._row_to_state(row[1:])
+
+    def values(self) -> Iterator[FileState]:
+        for _, state in self.items():
+            yield state
+
+    def keys(self) -> Iterator[str]:
+        for path, _ in self.items():
+            yield path
+
+    def paths_with_phase(self, column: str, done: bool = True) -> List[str]:
+        """Paths whose phase flag is set (or unset), using the flag index"""
+        if column not in PHASE_COLUMNS:
+            raise ValueError(f"Unknown phase column: {column}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT path FROM file_state WHERE {column} = ?", (int(done),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count_by_phase(self) -> Dict[str, int]:
+        """Total files and number of files per completed phase"""
+        columns = ", ".join(f"COALESCE(SUM({column}), 0)" for column in PHASE_COLUMNS)
+        with self._lock:
+            row = self._conn.execute(f"SELECT COUNT(*), {columns} FROM file_state").fetchone()
+        stats = {"total_files": row[0]}
+        stats.update(dict(zip(PHASE_COLUMNS, row[1:])))
+        return stats
+
+    def migrate_from_json(self, json_path: Path) -> int:
+        """
+        Import a legacy pipeline_state.json once
+        Returns the number of imported entries (0 if already migrated)
+        """
+        json_path = Path(json_path)
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM store_meta WHERE key = 'migrated_from_json'"
+            ).fetchone()
+            if done or not json_path.exists():
+                return 0
+
+            with open(json_path) as f:
+                state_dict = json.load(f)
+
+            items = []
+            for path, state in state_dict.items():
+                try:
+                    items.append((path, FileState(**state)))
+                except TypeError:
+                    continue
+            self.upsert_many(items)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(json_path),)
+            )
+            self.commit()
+        return len(items)
+
+    def merge_from(self, db_path: Path) -> int:
+        """
+        Merge the file states and fingerprints of another state database
+        
+        For a file present in both with the same hash, the phases done in
+        either are combined; if the hashes differ, the state processed
+        last wins. Returns the number of file states read from the other
+        database
+        """
+        newer = "excluded.last_processed > file_state.last_processed"
+        same = "excluded.hash = file_state.hash"
+        flags = ",\n".join(
+            f"{column} = CASE WHEN {same} THEN MAX(file_state.{column}, excluded.{column}) "
+            f"WHEN {newer} THEN excluded.{column} ELSE file_state.{column} END"
+            for column in PHASE_COLUMNS
+        )
+        with self._lock:
+            self.commit()
+            self._conn.execute("ATTACH DATABASE ? AS other", (str(db_path),))
+            try:
+                count = self._conn.execute("SELECT COUNT(*) FROM other.file_state").fetchone()[0]
+                self._conn.execute(f"""
+                    INSERT INTO file_state (path, hash, last_processed, features_extracted,
+                                            standardized, validated, metadata_extracted)
+                    SELECT path, hash, last_processed, features_extracted,
+                           standardized, validated, metadata_extracted
+                    FROM other.file_state WHERE true
+                    ON CONFLICT(path) DO UPDATE SET
+                        hash = CASE WHEN {newer} THEN excluded.hash ELSE file_state.hash END,
+                        last_processed = MAX(file_state.last_processed, excluded.last_processed),
+                        {flags}
+                """)
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO fingerprints
+                        (path, size, mtime_ns, inode, hash, sampled, algorithm)
+                    SELECT path, size, mtime_ns, inode, hash, sampled, algorithm
+                    FROM other.fingerprints
+                """)
+                self._conn.commit()
+            finally:
+                self._conn.execute("DETACH DATABASE other")
+        return count
+
+    def export_json(self, json_path: Path):
+        """Write the state in the legacy pipeline_state.json format"""
+        state_dict = {
+            path: dict(zip(("hash", "last_processed") + PHASE_COLUMNS, astuple(state)))
+            for path, state in self.items()
+        }
+        with open(json_path, 'w') as f:
+            json.dump(state_dict, f, indent=4)
+
+    def close(self):
+        """Commit and close the database"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# watcher.py
+
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from watchfiles import watch
+from .state_store import StateStore
+
+class LibraryWatcher:
+    """
+    Reports new and changed audio files under a directory tree.
+
+    Files are discovered from filesystem events rather than rescans and
+    kept in a persistent index (path, size, mtime_ns) in the state store.
+    A file is only handed on once its size and mtime have not changed for
+    settle_seconds, so tracks still being written by yt-dlp or ffmpeg are
+    not picked up half-finished.
+    """
+
+    def __init__(self, root: Path, store: StateStore, on_file: Callable[[Path], None],
+                 extensions: Iterable[str] = (".mp3",), settle_seconds: float = 5.0,
+                 poll_interval: float = 1.0):
+        """
+        Initialize watcher
+
+        Args:
+            root: Directory tree to watch
+            store: State store holding the file index
+            on_file: Called with each new or changed file once it settled
+            extensions: Audio file extensions to watch
+            settle_seconds: Time a file must stay unchanged before it is reported
+            poll_interval: Seconds between checks of files waiting to settle
+        """
+        self.root = Path(root)
+        self.store = store
+        self.on_file = on_file
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        # path -> (time of last change, (size, mtime_ns))
+        self._waiting: Dict[str, Tuple[float, Tuple[int, int]]] = {}
+        self._index = store.indexed_files()
+
+    def _is_audio(self, path: str) -> bool:
+        return path.lower().endswith(self.extensions)
+
+    def _stat(self, path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _note(self, path: str):
+        """Start or restart the settle timer of a file"""
+        signature = self._stat(path)
+        if signature is None:
+            self._forget(path)
+        elif path in self._waiting:
+            if self._waiting[path][1] != signature:
+                self._waiting[path] = (time.time(), signature)
+        elif signature != self._index.get(path) or path not in self.store:
+            self._waiting[path] = (time.time(), signature)
+
+    def _forget(self, path: str):
+        self._waiting.pop(path, None)
+        if self._index.pop(path, None) is not None:
+            self.store.unindex_file(path)
+
+    def catch_up(self) -> int:
+        """
+        Queue files that changed while nobody was watching
+        Returns the number of queued files
+        """
+        seen = set()
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if self._is_audio(path):
+                    seen.add(path)
+                    self._note(path)
+        for path in set(self._index) - seen:
+            self._forget(path)
+        return len(self._waiting)
+
+    def flush(self) -> int:
+        """
+        Report files that have settled
+        Returns the number of reported files
+        """
+        now = time.time()
+        settled = []
+        for path, (changed_at, signature) in list(self._waiting.items()):
+            current = self._stat(path)
+            if current is None:
+                self._forget(path)
+            elif current != signature:
+                self._waiting[path] = (now, current)
+            elif now - changed_at >= self.settle_seconds:
+                settled.append((path, current))
+
+        for path, signature in settled:
+            del self._waiting[path]
+            self._index[path] = signature
+            self.store.index_file(path, *signature)
+            self.on_file(Path(path))
+        if settled:
+            self.store.commit()
+        return len(settled)
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """Watch until interrupted or stop_event is set"""
+        self.catch_up()
+        self.flush()
+        for changes in watch(
+            self.root,
+            watch_filter=lambda change, path: self._is_audio(path),
+            rust_timeout=int(self.poll_interval * 1000),
+            yield_on_timeout=True,
+            stop_event=stop_event
+        ):
+            # A set may hold both a deletion and a re-creation of the same
+            # path, so the file's current stat decides rather than the event
+            for _, path in changes:
+                self._note(path)
+            self.flush()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# work_queue.py
+
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+@dataclass
+class Job:
+    id: int
+    path: str
+    phase: str
+    attempts: int
+
+class WorkQueue:
+    """
+    File-backed queue of (file, phase) jobs with leases.
+
+    A worker leases a job for lease_seconds and keeps extending the lease
+    with heartbeats while it works. Leases that run out (the worker died
+    or lost its host) are put back in the queue, so any other worker can
+    pick the job up. Jobs failing max_attempts times are marked failed.
+
+    The database uses a rollback journal rather than WAL, which needs
+    shared memory, so workers on other hosts can use it over shared
+    storage that supports file locking.
+    """
+
+    def __init__(self, db_path: Path, lease_seconds: float = 60.0, max_attempts: int = 3):
+        """
+        Initialize work queue
+
+        Args:
+            db_path: Path to the SQLite database
+            lease_seconds: Lease duration renewed by each heartbeat
+            max_attempts: Attempts before a job is marked failed
+        """
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.RLock()
+
+        self._conn = sqlite3.connect(
+            str(self.db_path), timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                phase TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_expires REAL,
+                finished_at REAL,
+                error TEXT,
+                UNIQUE (path, phase)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, phase)")
+
+    def enqueue(self, paths: Iterable[Path], phase: str) -> int:
+        """
+        Queue a phase for files; finished or failed jobs are queued again
+        Returns the number of files queued
+        """
+        rows = [(str(path), phase) for path in paths]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("""
+                    INSERT INTO jobs (path, phase) VALUES (?, ?)
+                    ON CONFLICT(path, phase) DO UPDATE SET
+                        status = 'queued', attempts = 0, worker = NULL,
+                        lease_expires = NULL, error = NULL
+                    WHERE jobs.status IN ('done', 'failed')
+                """, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _requeue_expired(self, now: float) -> int:
+        cursor = self._conn.execute("""
+            UPDATE jobs SET
+                status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                worker = NULL, lease_expires = NULL,
+                error = COALESCE(error, 'lease expired')
+            WHERE status = 'leased' AND lease_expires < ?
+        """, (self.max_attempts, now))
+        return cursor.rowcount
+
+    def lease(self, worker_id: str, phases: Optional[List[str]] = None) -> Optional[Job]:
+        """Lease the oldest queued job, optionally of the given phases only"""
+        now = time.time()
+        query = "SELECT id, path, phase, attempts FROM jobs WHERE status = 'queued'"
+        params: list = []
+        if phases:
+            query += f" AND phase IN ({', '.join('?' * len(phases))})"
+            params.extend(phases)
+        query += " ORDER BY id LIMIT 1"
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(now)
+                row = self._conn.execute(query, params).fetchone()
+                if row is not None:
+                    self._conn.execute("""
+                        UPDATE jobs SET status = 'leased', worker = ?,
+                            lease_expires = ?, attempts = attempts + 1
+                        WHERE id = ?
+                    """, (worker_id, now + self.lease_seconds, row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return Job(id=row[0], path=row[1], phase=row[2], attempts=row[3] + 1)
+
+    def heartbeat(self, job: Job, worker_id: str) -> bool:
+        """Extend a lease; False if the lease was lost to another worker"""
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE jobs SET lease_expires = ?
+                WHERE id = ? AND worker = ? AND status = 'leased'
+            """, (time.time() + self.lease_seconds, job.id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, worker_id: str):
+        """Mark a leased job as done"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE jobs SET status = 'done', lease_expires = NULL,
+                    finished_at = ?, error = NULL
+                WHERE id = ? AND worker = ?
+            """, (time.time(), job.id, worker_id))
+
+    def fail(self, job: Job, worker_id: str, error: str):
+        """Give a leased job back to the queue, or mark it failed after max_attempts"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE jobs SET
+                    status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                    worker = NULL, lease_expires = NULL, error = ?
+                WHERE id = ? AND worker = ?
+            """, (self.max_attempts, error, job.id, worker_id))
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def keep_alive(self, job: Job, worker_id: str) -> "Heartbeat":
+        """Context manager sending heartbeats for a job while it runs"""
+        return Heartbeat(self, job, worker_id)
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
+
+class Heartbeat:
+    """Background thread renewing a job's lease every third of its duration"""
+
+    def __init__(self, queue: WorkQueue, job: Job, worker_id: str):
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(self.job, self.worker_id):
+                self.lost = True
+                break
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
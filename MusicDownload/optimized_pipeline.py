@@ -2,23 +2,47 @@
 # optimized_pipeline.py
 
 import argparse
+import os
 import time
+import socket
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import json
 import sys
 
 from music_download.pipeline_manager import PipelineManager
 from music_download.audio_preprocessor import AudioPreprocessor
 from music_download.feature_extractor import FeatureExtractor
+from music_download.analysis_engine import AnalysisPlan
+from music_download.key_estimator import KeyEstimator
 from music_download.metadata_processor import MetadataProcessor
 from music_download.quality_validator import AudioQualityValidator
 from music_download.download_pipeline import MusicDownloadPipeline
+from music_download.audio_store import AudioStore
+from music_download.hashing import configure_hash_service
+from music_download.stage_graph import Stage, StageGraph
+from music_download.watcher import LibraryWatcher
+from music_download.sharding import merge_shards, parse_shard, shard_of, shard_suffix
+from music_download.work_queue import WorkQueue
+from music_download.feature_cache import DEFAULT_CACHE_LOCATION, FeatureCache, parse_size
+from music_download.feature_store import FeatureStore
+from music_download.similarity_index import SimilarityIndex
 
 class OptimizedPipeline:
-    def __init__(self, config_path: str, project_root: Path):
+    def __init__(self, config_path: str, project_root: Path,
+                 shard: Optional[Tuple[int, int]] = None,
+                 worker_id: Optional[str] = None):
         self.project_root = Path(project_root)
         self.config_path = Path(config_path)
+        self.shard = shard
+        self.worker_id = worker_id
+        
+        # Shards and queue workers write their own state and outputs
+        self.instance = None
+        if shard:
+            self.instance = shard_suffix(shard)
+        elif worker_id:
+            self.instance = f"worker-{worker_id}"
         
         if not self.config_path.exists():
             raise FileNotFoundError(f"Config file not found at: {self.config_path}")
@@ -31,14 +55,81 @@ class OptimizedPipeline:
         self.paths = {}
         self.setup_directories()
         
+        # Shared hash service used by every component
+        self.hash_service = configure_hash_service(
+            algorithm=self.config.get('processing', {}).get('hash_algorithm', 'md5')
+        )
+        
+        # Persistent feature cache keyed by content hash and extractor version
+        cache_config = self.config.get('cache', {})
+        max_size = cache_config.get('max_size')
+        self.feature_cache = FeatureCache(
+            self.project_root / cache_config.get('location', DEFAULT_CACHE_LOCATION),
+            max_bytes=parse_size(max_size) if max_size else None,
+            cleanup_threshold=cache_config.get('cleanup_threshold', 0.8),
+            ttl=cache_config.get('feature_cache_ttl')
+        )
+        self.use_feature_cache = cache_config.get('enabled', True)
+        
         # Initialize pipeline manager
-        self.pipeline_manager = PipelineManager(self.project_root)
+        fast_hash_mb = self.config.get('processing', {}).get('fast_hash_threshold_mb')
+        self.pipeline_manager = PipelineManager(
+            self.project_root,
+            fast_hash_threshold=fast_hash_mb * 1024 * 1024 if fast_hash_mb else None,
+            hash_service=self.hash_service,
+            instance=self.instance,
+            feature_cache=self.feature_cache
+        )
+        
+        # merge_shards combines the outputs of parallel instances
+        suffix = f".{self.instance}" if self.instance else ""
+        self.feature_store = FeatureStore(
+            self.paths['features_dir'] / f"features{suffix}.h5",
+            flush_every=self.config.get('processing', {}).get('feature_flush_rows', 256)
+        )
+        self.stats_file = self.project_root / f"pipeline_stats{suffix}.json"
             
+        # Shared decoded-audio store so each track is decoded once per run
+        store_size_mb = self.config.get('processing', {}).get('audio_store_size_mb', 4096)
+        self.audio_store = AudioStore(
+            self.paths['temp_dir'] / 'audio_store',
+            max_bytes=store_size_mb * 1024 * 1024,
+            backends=self.config.get('processing', {}).get('decoder_backends'),
+            hash_service=self.hash_service
+        )
+        
         # Initialize components
-        self.preprocessor = AudioPreprocessor()
-        self.feature_extractor = FeatureExtractor()
-        self.metadata_processor = MetadataProcessor(self.paths['dataset_dir'])
-        self.quality_validator = AudioQualityValidator()
+        self.preprocessor = AudioPreprocessor(audio_store=self.audio_store)
+        analysis_plan = AnalysisPlan.from_config(
+            self.config.get('processing', {}).get('analysis_plan')
+        )
+        self.feature_extractor = FeatureExtractor(
+            audio_store=self.audio_store,
+            analysis_plan=analysis_plan
+        )
+        self.metadata_processor = MetadataProcessor(
+            self.paths['dataset_dir'],
+            audio_store=self.audio_store,
+            hash_service=self.hash_service,
+            analysis_plan=analysis_plan,
+            key_estimator=KeyEstimator.from_config(
+                self.config.get('processing', {}).get('key_estimation')
+            ),
+            index_path=self.paths['dataset_dir'] / "metadata" / f"metadata_index{suffix}.db"
+        )
+        self.quality_validator = AudioQualityValidator(
+            audio_store=self.audio_store,
+            streaming=self.config.get('processing', {}).get('streaming_validation', False),
+            backends=self.config.get('processing', {}).get('decoder_backends')
+        )
+        
+        # Executor backend for batch phases: thread, process or hybrid
+        self.executor = self.config.get('processing', {}).get('executor', 'thread')
+        
+        # Worker bounds for batch phases; the count adapts in between
+        self.max_workers = self.config.get('processing', {}).get('max_workers')
+        self.min_workers = self.config.get('processing', {}).get('min_workers', 1)
+        self.autoscale = self.config.get('processing', {}).get('autoscale_workers', True)
         
         # Statistics
         self.stats = {
@@ -74,7 +165,8 @@ class OptimizedPipeline:
         try:
             download_pipeline = MusicDownloadPipeline(
                 self.config_path,
-                downloads_dir=self.paths['downloads_dir']
+                downloads_dir=self.paths['downloads_dir'],
+                hash_service=self.hash_service
             )
             start_time = time.time()
             
@@ -86,20 +178,26 @@ class OptimizedPipeline:
             # If no new files were tracked, scan the downloads directory
             if not downloaded_files:
                 print("Scanning downloads directory for unprocessed files...")
-                downloaded_files = []
-                for genre_dir in self.paths['downloads_dir'].iterdir():
-                    if genre_dir.is_dir():
-                        for audio_file in genre_dir.rglob("*.mp3"):
-                            downloaded_files.append(audio_file)
+                downloaded_files = self.scan_downloads()
                 print(f"Found {len(downloaded_files)} existing files")
             
+            if downloaded_files:
+                # Reject files failing header checks before any decode
+                downloaded_files, rejected = self.quality_validator.triage_files(downloaded_files)
+                if rejected:
+                    print(f"Rejected {len(rejected)} files on header checks")
+                
             if downloaded_files:
                 # Validate new downloads
                 print(f"Validating {len(downloaded_files)} files...")
                 self.pipeline_manager.process_batch(
                     downloaded_files,
                     self.quality_validator,
-                    phase="validation"
+                    phase="validation",
+                    executor=self.executor,
+                    max_workers=self.max_workers,
+                    min_workers=self.min_workers,
+                    autoscale=self.autoscale
                 )
             
             self.stats["phases"]["download"] = {
@@ -125,27 +223,12 @@ class OptimizedPipeline:
             processed_files = []
             for file_path in files:
                 try:
-                    # Check cache first
-                    cached_features = self.pipeline_manager.get_cached_features(file_path)
-                    if cached_features:
-                        processed_files.append(cached_features)
-                        print(f"Using cached features for {file_path.name}")
-                        continue
-                    
-                    # Extract and cache features
-                    print(f"Extracting features from {file_path.name}")
-                    features = self.feature_extractor.extract_features(file_path)
-                    self.pipeline_manager.cache_features(file_path, features)
-                    processed_files.append(features)
-                    
+                    processed_files.append(self.extract_file_features(file_path))
                 except Exception as e:
                     print(f"Error processing {file_path.name}: {str(e)}")
                     continue
             
-            # Save all features
-            features_file = self.paths['features_dir'] / 'features.json'
-            with open(features_file, 'w') as f:
-                json.dump(processed_files, f, indent=4)
+            self.save_features()
             
             self.stats["phases"]["feature_extraction"] = {
                 "duration": time.time() - start_time,
@@ -158,6 +241,314 @@ class OptimizedPipeline:
             self.stats["errors"].append(f"Feature extraction error: {str(e)}")
             raise
 
+    def extract_file_features(self, file_path: Path) -> Dict[str, Any]:
+        """Extract features of one file, using the feature cache, and add them to the feature store"""
+        version = self.feature_extractor.cache_version
+        
+        # Check cache first
+        features = None
+        if self.use_feature_cache:
+            features = self.pipeline_manager.get_cached_features(file_path, version)
+            if features:
+                print(f"Using cached features for {file_path.name}")
+        
+        # Extract and cache features
+        if not features:
+            print(f"Extracting features from {file_path.name}")
+            features = self.feature_extractor.extract_features(file_path)
+            if self.use_feature_cache:
+                self.pipeline_manager.cache_features(file_path, features, version)
+        
+        self.feature_store.upsert(
+            self.pipeline_manager.get_file_hash(file_path), features, str(file_path), version
+        )
+        return features
+
+    def save_features(self):
+        """Write buffered features to the feature store and index new tracks"""
+        self.feature_store.flush()
+        # Instances only write their own store; the index follows the merged one
+        if self.instance is None and self.config.get('processing', {}).get('similarity_index', True):
+            self.update_similarity_index()
+
+    def update_similarity_index(self, feature_store: Optional[FeatureStore] = None) -> SimilarityIndex:
+        """Add new and re-extracted tracks to the persisted similarity index"""
+        index = SimilarityIndex(self.paths['features_dir'] / "similarity_index.npz")
+        updated = index.update_from_store(feature_store or self.feature_store)
+        if updated:
+            index.save()
+            print(f"Similarity index: {updated} tracks added or updated, {len(index)} total")
+        return index
+
+    def find_similar(self, track: str, k: int = 10, mode: str = "exact") -> list:
+        """Tracks most similar to an audio file or a content hash"""
+        index = self.update_similarity_index()
+        key = track
+        if Path(track).exists():
+            key = self.pipeline_manager.get_file_hash(Path(track))
+        return index.query(key, k=k, mode=mode)
+
+    def scan_downloads(self) -> list:
+        """Audio files already present in the downloads directory (of this shard)"""
+        files = []
+        for genre_dir in self.paths['downloads_dir'].iterdir():
+            if genre_dir.is_dir():
+                for audio_file in genre_dir.rglob("*.mp3"):
+                    files.append(audio_file)
+        return self.select_shard(files)
+
+    def in_shard(self, file_path: Path) -> bool:
+        """Whether a file is assigned to this shard (always true without sharding)"""
+        if self.shard is None:
+            return True
+        digest = self.pipeline_manager.get_file_hash(file_path)
+        return shard_of(digest, self.shard[1]) == self.shard[0]
+
+    def select_shard(self, files: list) -> list:
+        """Files assigned to this shard, by content hash"""
+        if self.shard is None:
+            return files
+        self.pipeline_manager.fingerprints.prefetch(files)
+        selected = [file_path for file_path in files if self.in_shard(file_path)]
+        print(f"Shard {self.shard[0]}/{self.shard[1]}: {len(selected)} of {len(files)} files")
+        return selected
+
+    def finalize(self):
+        """Record final statistics and clean up"""
+        self.stats["total_duration"] = time.time() - self.stats["start_time"]
+        self.stats["final_state"] = self.pipeline_manager.get_processing_stats()
+        self.stats["audio_store"] = self.audio_store.get_stats()
+        self.stats["feature_cache"] = self.feature_cache.get_stats()
+        self.stats["feature_store"] = {"tracks": len(self.feature_store)}
+        self.stats["throughput"] = self.pipeline_manager.phase_stats
+        
+        # Save pipeline statistics
+        with open(self.stats_file, 'w') as f:
+            json.dump(self.stats, f, indent=4)
+        
+        # Cleanup if needed; parallel instances share the temp directory
+        if not self.config['processing']['keep_temp_files'] and self.instance is None:
+            self.pipeline_manager.clean_temp_files()
+        
+        print("\nPipeline completed successfully!")
+        print(f"Total duration: {self.stats['total_duration']:.2f} seconds")
+        print(f"Files processed: {self.stats['final_state']['total_files']}")
+
+    def build_stage_graph(self, skip_phases: list) -> StageGraph:
+        """Validation, feature and metadata stages connected by bounded queues"""
+        processing = self.config.get('processing', {})
+        stage_workers = processing.get('stage_workers', {})
+        queue_size = processing.get('stage_queue_size', 32)
+        
+        def validate(file_path: Path) -> bool:
+            passed, _ = self.quality_validator.triage_files([file_path])
+            if not passed:
+                return False
+            self.pipeline_manager.process_file(
+                self.quality_validator, file_path, phase="validation"
+            )
+            return True
+        
+        def extract(file_path: Path) -> bool:
+            self.extract_file_features(file_path)
+            return True
+        
+        def metadata(file_path: Path) -> bool:
+            return self.pipeline_manager.process_file(
+                self.metadata_processor, file_path, phase="metadata"
+            )
+        
+        validation_stage = Stage(
+            "validation", validate, stage_workers.get('validation', 2), queue_size
+        )
+        stages = [validation_stage]
+        if "features" not in skip_phases:
+            stages.append(Stage(
+                "features", extract, stage_workers.get('features', 2), queue_size
+            ))
+        if "metadata" not in skip_phases:
+            stages.append(Stage(
+                "metadata", metadata, stage_workers.get('metadata', 2), queue_size
+            ))
+        validation_stage.connect(*stages[1:])
+        return StageGraph(stages)
+
+    def run_streaming(self, skip_phases: list = None):
+        """
+        Run the pipeline as a stage graph: each file moves on to validation,
+        features and metadata as soon as it is downloaded, with every stage
+        working concurrently on different files
+        """
+        skip_phases = skip_phases or []
+        
+        try:
+            graph = self.build_stage_graph(skip_phases)
+            graph.start()
+            try:
+                start_time = time.time()
+                if "download" not in skip_phases:
+                    download_pipeline = MusicDownloadPipeline(
+                        self.config_path,
+                        downloads_dir=self.paths['downloads_dir'],
+                        hash_service=self.hash_service
+                    )
+                    downloaded_files = download_pipeline.run(
+                        skip_existing=self.config['download_settings']['skip_existing'],
+                        check_modified=self.config['download_settings']['check_modified'],
+                        on_file=graph.submit
+                    )
+                    self.stats["phases"]["download"] = {
+                        "duration": time.time() - start_time,
+                        "files_processed": len(downloaded_files)
+                    }
+                    if not downloaded_files:
+                        downloaded_files = self.scan_downloads()
+                        print(f"Found {len(downloaded_files)} existing files")
+                        for file_path in downloaded_files:
+                            graph.submit(file_path)
+                else:
+                    for file_path in self.scan_downloads():
+                        graph.submit(file_path)
+            finally:
+                self.stats["stages"] = graph.close()
+            
+            if "features" not in skip_phases:
+                self.save_features()
+                print(f"Feature store holds {len(self.feature_store)} files")
+            
+            self.finalize()
+            
+        except Exception as e:
+            self.stats["errors"].append(f"Pipeline error: {str(e)}")
+            with open(self.stats_file, 'w') as f:
+                json.dump(self.stats, f, indent=4)
+            raise
+
+    def watch(self, skip_phases: list = None):
+        """
+        Run as a daemon: new or changed files in the downloads directory go
+        through validation, features and metadata as soon as they settle
+        """
+        skip_phases = skip_phases or []
+        processing = self.config.get('processing', {})
+        
+        graph = self.build_stage_graph(skip_phases)
+        graph.start()
+        
+        def submit(file_path: Path):
+            if self.in_shard(file_path):
+                graph.submit(file_path)
+        
+        watcher = LibraryWatcher(
+            self.paths['downloads_dir'],
+            self.pipeline_manager.state,
+            submit,
+            extensions=(f".{self.config['download_settings'].get('audio_codec', 'mp3')}",),
+            settle_seconds=processing.get('watch_settle_seconds', 5.0)
+        )
+        
+        print(f"\nWatching {self.paths['downloads_dir']} for new files (Ctrl+C to stop)...")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print("\nStopping watcher...")
+        finally:
+            self.stats["stages"] = graph.close()
+            if "features" not in skip_phases:
+                self.save_features()
+            self.finalize()
+
+    def open_work_queue(self) -> WorkQueue:
+        """Job queue shared by all workers"""
+        processing = self.config.get('processing', {})
+        return WorkQueue(
+            self.project_root / processing.get('queue_db', 'work_queue.db'),
+            lease_seconds=processing.get('lease_seconds', 60.0),
+            max_attempts=processing.get('max_attempts', 3)
+        )
+
+    def enqueue_jobs(self, skip_phases: list = None) -> Dict[str, int]:
+        """Queue validation, feature and metadata jobs for the downloaded files"""
+        skip_phases = skip_phases or []
+        files = self.scan_downloads()
+        files, _ = self.quality_validator.triage_files(files)
+        
+        queue = self.open_work_queue()
+        try:
+            for phase in ("validation", "features", "metadata"):
+                if phase not in skip_phases:
+                    queue.enqueue(files, phase)
+            counts = queue.counts()
+        finally:
+            queue.close()
+        print(f"\nQueued jobs for {len(files)} files: {counts}")
+        return counts
+
+    def run_worker(self, phases: Optional[list] = None):
+        """
+        Pull (file, phase) jobs from the work queue until it is drained
+        
+        A job's lease is renewed by heartbeats while it runs; if this
+        worker dies, the lease runs out and another worker takes the job.
+        """
+        queue = self.open_work_queue()
+        poll_seconds = self.config.get('processing', {}).get('worker_poll_seconds', 5.0)
+        
+        def extract(file_path: Path) -> bool:
+            self.extract_file_features(file_path)
+            return True
+        
+        handlers = {
+            "validation": lambda file_path: self.pipeline_manager.process_file(
+                self.quality_validator, file_path, phase="validation", raise_errors=True
+            ),
+            "features": extract,
+            "metadata": lambda file_path: self.pipeline_manager.process_file(
+                self.metadata_processor, file_path, phase="metadata", raise_errors=True
+            )
+        }
+        
+        print(f"\nWorker {self.worker_id} pulling jobs from {queue.db_path}")
+        worker_stats = {"completed": 0, "failed": 0, "lost": 0}
+        try:
+            while True:
+                job = queue.lease(self.worker_id, phases)
+                if job is None:
+                    if queue.counts()["leased"] == 0:
+                        break
+                    # Other workers hold leases that may still expire
+                    time.sleep(poll_seconds)
+                    continue
+                
+                error = None
+                with queue.keep_alive(job, self.worker_id) as heartbeat:
+                    try:
+                        if job.phase not in handlers:
+                            raise ValueError(f"Unknown phase: {job.phase}")
+                        handlers[job.phase](Path(job.path))
+                    except Exception as e:
+                        error = str(e)
+                
+                if heartbeat.lost:
+                    print(f"Lost lease on {job.phase} job for {Path(job.path).name}")
+                    worker_stats["lost"] += 1
+                elif error is None:
+                    queue.complete(job, self.worker_id)
+                    worker_stats["completed"] += 1
+                else:
+                    print(f"Error in {job.phase} job for {Path(job.path).name}: {error}")
+                    queue.fail(job, self.worker_id, error)
+                    worker_stats["failed"] += 1
+        except KeyboardInterrupt:
+            print("\nStopping worker...")
+        finally:
+            self.pipeline_manager._save_state()
+            self.save_features()
+            self.stats["worker"] = worker_stats
+            self.stats["queue"] = queue.counts()
+            queue.close()
+            self.finalize()
+
     def run(self, skip_phases: list = None):
         """Run the optimized pipeline"""
         skip_phases = skip_phases or []
@@ -168,11 +559,8 @@ class OptimizedPipeline:
                 downloaded_files = self.process_downloads()
             else:
                 # If skipping download, scan for existing files
-                downloaded_files = []
-                for genre_dir in self.paths['downloads_dir'].iterdir():
-                    if genre_dir.is_dir():
-                        for audio_file in genre_dir.rglob("*.mp3"):
-                            downloaded_files.append(audio_file)
+                downloaded_files = self.scan_downloads()
+                downloaded_files, _ = self.quality_validator.triage_files(downloaded_files)
             
             if not downloaded_files:
                 print("No files to process")
@@ -192,31 +580,22 @@ class OptimizedPipeline:
                 self.pipeline_manager.process_batch(
                     downloaded_files,
                     self.metadata_processor,
-                    phase="metadata"
+                    phase="metadata",
+                    executor=self.executor,
+                    max_workers=self.max_workers,
+                    min_workers=self.min_workers,
+                    autoscale=self.autoscale
                 )
                 self.stats["phases"]["metadata"] = {
                     "duration": time.time() - start_time
                 }
             
             # Final statistics
-            self.stats["total_duration"] = time.time() - self.stats["start_time"]
-            self.stats["final_state"] = self.pipeline_manager.get_processing_stats()
-            
-            # Save pipeline statistics
-            with open(self.project_root / "pipeline_stats.json", 'w') as f:
-                json.dump(self.stats, f, indent=4)
-            
-            # Cleanup if needed
-            if not self.config['processing']['keep_temp_files']:
-                self.pipeline_manager.clean_temp_files()
-            
-            print("\nPipeline completed successfully!")
-            print(f"Total duration: {self.stats['total_duration']:.2f} seconds")
-            print(f"Files processed: {self.stats['final_state']['total_files']}")
+            self.finalize()
             
         except Exception as e:
             self.stats["errors"].append(f"Pipeline error: {str(e)}")
-            with open(self.project_root / "pipeline_stats.json", 'w') as f:
+            with open(self.stats_file, 'w') as f:
                 json.dump(self.stats, f, indent=4)
             raise
 
@@ -226,6 +605,26 @@ def main():
     parser.add_argument("--project-dir", required=True, help="Project root directory")
     parser.add_argument("--skip", nargs="+", choices=["download", "features", "metadata"],
                       help="Skip specified phases")
+    parser.add_argument("--streaming", action="store_true",
+                      help="Stream files through all phases concurrently instead of phase by phase")
+    parser.add_argument("--watch", action="store_true",
+                      help="Keep running and process new or changed downloads as they appear")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                      help="Process only shard i of N (0-based), assigned by content hash")
+    parser.add_argument("--merge-shards", action="store_true",
+                      help="Combine shard and worker outputs into the canonical state and features")
+    parser.add_argument("--enqueue", action="store_true",
+                      help="Queue jobs for all downloaded files in the work queue and exit")
+    parser.add_argument("--worker", nargs="?", const=f"{socket.gethostname()}-{os.getpid()}",
+                      metavar="ID", help="Run as a queue worker until the queue is drained")
+    parser.add_argument("--phases", nargs="+", choices=["validation", "features", "metadata"],
+                      help="Phases a queue worker takes jobs for (default: all)")
+    parser.add_argument("--similar", metavar="TRACK",
+                      help="List the tracks most similar to an audio file or content hash and exit")
+    parser.add_argument("--top-k", type=int, default=10,
+                      help="Number of similar tracks to list (default: 10)")
+    parser.add_argument("--index-mode", choices=["exact", "tree"], default="exact",
+                      help="Exact scan or k-d tree similarity search (default: exact)")
     
     args = parser.parse_args()
     
@@ -240,10 +639,52 @@ def main():
         
         pipeline = OptimizedPipeline(
             config_path=str(config_path),
-            project_root=project_dir
+            project_root=project_dir,
+            shard=args.shard,
+            worker_id=args.worker
         )
         
-        pipeline.run(skip_phases=args.skip or [])
+        if args.merge_shards:
+            summary = merge_shards(
+                project_dir, pipeline.paths['features_dir'],
+                pipeline.metadata_processor.metadata_dir
+            )
+            print(f"\nMerged {summary['state_files']} shard states ({summary['total_files']} files), "
+                  f"{summary['feature_files']} feature files ({summary['features']} entries) "
+                  f"and {summary['metadata_files']} metadata indexes ({summary['tracks']} tracks)")
+            pipeline.update_similarity_index(
+                FeatureStore(pipeline.paths['features_dir'] / "features.h5")
+            )
+            return
+        
+        if args.similar:
+            start_time = time.time()
+            results = pipeline.find_similar(args.similar, k=args.top_k, mode=args.index_mode)
+            print(f"\nTracks most similar to {args.similar} "
+                  f"({(time.time() - start_time) * 1000:.1f} ms):")
+            for key, path, distance in results:
+                print(f"{distance:8.3f}  {path or key}")
+            return
+        
+        skip_phases = args.skip or []
+        if args.enqueue:
+            pipeline.enqueue_jobs(skip_phases=skip_phases)
+            return
+        if args.worker:
+            pipeline.run_worker(phases=args.phases)
+            return
+        
+        if args.shard and "download" not in skip_phases:
+            # Shards share storage, so downloading stays a separate single run
+            print("Sharded runs skip the download phase")
+            skip_phases.append("download")
+        
+        if args.watch:
+            pipeline.watch(skip_phases=skip_phases)
+        elif args.streaming or pipeline.config.get('processing', {}).get('streaming', False):
+            pipeline.run_streaming(skip_phases=skip_phases)
+        else:
+            pipeline.run(skip_phases=skip_phases)
         
     except Exception as e:
         print(f"\nError: {str(e)}")